@@ -0,0 +1,100 @@
+"""Benchmark : chemin d'un hit du cache de réponses de l'API.
+
+Sur un catalogue synthétique, mesure la latence des requêtes servies
+depuis le cache (``/stats``, ``/books``) via ``TestClient`` :
+
+- version des données relue dans SQLite à chaque requête
+  (``VersionPoller`` avec ``interval=0``, ancien comportement) ;
+- version relue au plus une fois par seconde (défaut de l'API).
+
+Mesure aussi la lecture de la version seule (aller-retour au pool de
+threads SQLite contre valeur gardée en mémoire).
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_cache.py --books 10000 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter la racine du projet au path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic import build_catalogue
+
+PATHS = ["/stats", "/books?limit=50"]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def measure_hits(client, main, interval: float, requests: int):
+    """p50 / p95 (ms) des hits, et lectures SQLite de la version par requête."""
+    main.version_poller.interval = interval
+    results = {}
+    for path in PATHS:
+        client.get(path).raise_for_status()  # remplit le cache
+        polls = main.version_poller.stats()["polls"]
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[path] = (*percentiles(latencies), (main.version_poller.stats()["polls"] - polls) / requests)
+    return results
+
+
+def measure_version_lookup(main, requests: int):
+    """Durée moyenne (µs) d'une lecture de version : SQLite contre poller en mémoire."""
+    async def run(getter):
+        await getter()
+        start = time.perf_counter()
+        for _ in range(requests):
+            await getter()
+        return (time.perf_counter() - start) / requests * 1e6
+
+    main.version_poller.interval = 60
+    return asyncio.run(run(main.repository.get_data_version)), asyncio.run(run(main.version_poller))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        build_catalogue(db_path, args.books, n_crawls=3)
+        os.environ["BOOKS_DB_PATH"] = db_path
+        from fastapi.testclient import TestClient
+
+        from src.api import main as api
+
+        with TestClient(api.app) as client:
+            per_request = measure_hits(client, api, 0, args.requests)
+            polled = measure_hits(client, api, 1.0, args.requests)
+        sqlite_us, memory_us = measure_version_lookup(api, args.requests)
+
+    print(f"{args.books} livres, {args.requests} hits par route\n")
+    print(f"{'Route':<18} {'version':<18} {'p50 (ms)':>9} {'p95 (ms)':>9} {'lectures/req':>13}")
+    print("-" * 71)
+    for path in PATHS:
+        for label, results in (("à chaque requête", per_request), ("toutes les 1 s", polled)):
+            p50, p95, reads = results[path]
+            print(f"{path:<18} {label:<18} {p50:>9.3f} {p95:>9.3f} {reads:>13.3f}")
+    print(f"\nLecture de la version seule : {sqlite_us:.0f} µs (SQLite, pool de threads) "
+          f"contre {memory_us:.1f} µs (en mémoire)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark : détection de doublons par ``set`` Python contre filtre de Bloom.
+
+Insère ``--entries`` UPC distincts (16 caractères hexadécimaux, comme sur
+le site), puis ``--duplicates`` UPC déjà vus, dans :
+
+- un ``set`` Python (l'ancien ``DuplicatesPipeline``) ;
+- un ``ScalableBloomFilter`` seul (mémoire du filtre) ;
+- un ``BloomSeenSet`` (filtre + ensemble exact SQLite sur disque), ce
+  qu'utilise le pipeline.
+
+Mémoire Python mesurée avec ``tracemalloc`` (le cache de pages SQLite,
+borné à 2 Mo par défaut, n'y figure pas) ; débit en insertions par seconde.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_dedup.py --entries 1000000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+project_root = Path(__file__).parent.parent
+scrapy_project = project_root / "src" / "scraper" / "bookstoscrape_Scraper"
+sys.path.insert(0, str(scrapy_project))
+
+from bookstoscrape_Scraper.bloom import BloomSeenSet, ScalableBloomFilter
+from bookstoscrape_Scraper.frontier import FrontierStore, SQLiteSeenSet
+
+
+def insert(seen, upcs, duplicates):
+    new = sum(1 for upc in upcs if seen.add(upc))
+    dropped = sum(1 for upc in duplicates if not seen.add(upc))
+    return new, dropped
+
+
+def run(label, make, upcs, duplicates):
+    # Mémoire et débit mesurés séparément : tracemalloc ralentit chaque allocation
+    tracemalloc.start()
+    seen, cleanup = make()
+    insert(seen, upcs, duplicates)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cleanup()
+
+    seen, cleanup = make()
+    start = time.perf_counter()
+    new, dropped = insert(seen, upcs, duplicates)
+    duration = time.perf_counter() - start
+    cleanup()
+    return {
+        "label": label,
+        "memory": peak,
+        "rate": (len(upcs) + len(duplicates)) / duration,
+        "new": new,
+        "dropped": dropped,
+    }
+
+
+class PythonSet(set):
+    """``set`` dont ``add`` indique si la clé était nouvelle."""
+
+    def add(self, key) -> bool:
+        if key in self:
+            return False
+        super().add(key)
+        return True
+
+
+def make_set():
+    return PythonSet(), lambda: None
+
+
+def make_bloom(max_bytes, error_rate):
+    def make():
+        return ScalableBloomFilter(error_rate=error_rate, max_bytes=max_bytes), lambda: None
+    return make
+
+
+def make_bloom_seen_set(max_bytes, error_rate):
+    def make():
+        tmp = tempfile.TemporaryDirectory()
+        store = FrontierStore.open(tmp.name)
+        seen = BloomSeenSet(
+            ScalableBloomFilter(error_rate=error_rate, max_bytes=max_bytes),
+            SQLiteSeenSet(store, "seen_upcs")
+        )
+
+        def cleanup():
+            store.release()
+            tmp.cleanup()
+        return seen, cleanup
+    return make
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--duplicates", type=int, default=100_000)
+    parser.add_argument("--memory-limit", type=int, default=8 * 1024 * 1024, help="octets (filtre)")
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    upcs = list({f"{rng.getrandbits(64):016x}" for _ in range(args.entries)})
+    duplicates = [rng.choice(upcs) for _ in range(args.duplicates)]
+    print(f"{len(upcs)} UPC distincts, {len(duplicates)} doublons, "
+          f"filtre plafonné à {args.memory_limit / 1024 / 1024:.0f} Mo, taux visé {args.error_rate}\n")
+
+    results = [
+        run("set Python", make_set, upcs, duplicates),
+        run("ScalableBloomFilter seul",
+            make_bloom(args.memory_limit, args.error_rate), upcs, duplicates),
+        run("BloomSeenSet (+ SQLite)",
+            make_bloom_seen_set(args.memory_limit, args.error_rate), upcs, duplicates),
+    ]
+
+    print(f"{'Structure':<26} {'mémoire (Mo)':>13} {'octets/UPC':>11} {'ajouts/s':>10} "
+          f"{'nouveaux':>9} {'écartés':>8}")
+    print("-" * 82)
+    for r in results:
+        print(f"{r['label']:<26} {r['memory'] / 1024 / 1024:>13.1f} {r['memory'] / len(upcs):>11.1f} "
+              f"{r['rate']:>10.0f} {r['new']:>9} {r['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
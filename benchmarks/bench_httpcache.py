@@ -0,0 +1,157 @@
+"""Benchmark : cache HTTP SQLite compressé contre FilesystemCacheStorage.
+
+Écrit ``--entries`` réponses dans chacun des deux stockages, puis mesure
+l'empreinte disque (octets alloués, nombre d'inodes) et la latence de
+``retrieve_response`` sur des empreintes tirées au hasard.
+
+Les corps sont repris du cache existant du projet
+(``src/scraper/bookstoscrape_Scraper/.scrapy/httpcache``, format
+répertoires ou SQLite) quand il existe, sinon générés.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_httpcache.py --entries 20000
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ajouter la racine du projet et le projet Scrapy au path
+project_root = Path(__file__).parent.parent
+scrapy_project = project_root / "src" / "scraper" / "bookstoscrape_Scraper"
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(scrapy_project))
+
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.utils.request import RequestFingerprinter
+
+from benchmarks.synthetic import _text
+from bookstoscrape_Scraper.httpcache import SQLiteCacheStorage, iter_filesystem_cache
+
+PROJECT_CACHE = scrapy_project / ".scrapy" / "httpcache"
+SPIDER_NAME = "booktoscrape_Scraper"
+
+
+def sample_bodies(limit: int = 500):
+    """Corps réels du cache du projet, ou pages générées à défaut."""
+    bodies = []
+    fs_dir = PROJECT_CACHE / SPIDER_NAME
+    sqlite_path = PROJECT_CACHE / f"{SPIDER_NAME}.sqlite"
+    if fs_dir.is_dir():
+        for _, _, _, body in iter_filesystem_cache(fs_dir):
+            bodies.append(body)
+            if len(bodies) >= limit:
+                break
+    elif sqlite_path.exists():
+        storage = SQLiteCacheStorage(Settings())
+        conn = sqlite3.connect(str(sqlite_path))
+        for codec, body in conn.execute("SELECT codec, body FROM responses LIMIT ?", (limit,)):
+            bodies.append(storage.codec.decompress(codec, body))
+        conn.close()
+    if bodies:
+        return bodies, "cache du projet"
+
+    rng = random.Random(0)
+    template = "<html><head><title>{}</title></head><body>{}<p>{}</p>{}</body></html>"
+    navigation = "".join(f'<li><a href="/catalogue/category/books/cat_{i}/index.html">{i}</a></li>'
+                         for i in range(50))
+    for _ in range(limit):
+        bodies.append(template.format(
+            _text(rng, 4), navigation, _text(rng, 200), navigation
+        ).encode())
+    return bodies, "pages générées"
+
+
+def make_spider(cache_dir: str):
+    settings = Settings({"HTTPCACHE_DIR": cache_dir, "HTTPCACHE_EXPIRATION_SECS": 0})
+    crawler = SimpleNamespace(request_fingerprinter=RequestFingerprinter())
+    spider = SimpleNamespace(name=SPIDER_NAME, crawler=crawler, logger=logging.getLogger(SPIDER_NAME))
+    return settings, spider
+
+
+def disk_usage(path: Path):
+    """Octets alloués et nombre d'inodes (fichiers + répertoires) sous ``path``."""
+    allocated, inodes = 0, 0
+    for root, dirs, files in os.walk(path):
+        inodes += len(dirs) + len(files)
+        for name in files:
+            allocated += os.stat(os.path.join(root, name)).st_blocks * 512
+    return allocated, inodes
+
+
+def run(storage_cls, label, requests, bodies, lookups):
+    with tempfile.TemporaryDirectory() as tmp:
+        settings, spider = make_spider(tmp)
+        storage = storage_cls(settings)
+        storage.open_spider(spider)
+
+        start = time.perf_counter()
+        for i, request in enumerate(requests):
+            body = bodies[i % len(bodies)]
+            storage.store_response(spider, request, HtmlResponse(request.url, body=body))
+        write_s = time.perf_counter() - start
+        storage.close_spider(spider)
+
+        storage = storage_cls(settings)
+        storage.open_spider(spider)
+        timings = []
+        for request in lookups:
+            start = time.perf_counter()
+            response = storage.retrieve_response(spider, request)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response is not None
+        storage.close_spider(spider)
+
+        allocated, inodes = disk_usage(Path(tmp))
+
+    timings.sort()
+    return {
+        "label": label,
+        "write_s": write_s,
+        "allocated": allocated,
+        "inodes": inodes,
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+
+    bodies, source = sample_bodies()
+    raw_bytes = sum(len(bodies[i % len(bodies)]) for i in range(args.entries))
+    print(f"{args.entries} réponses ({source}, {raw_bytes / 1024 / 1024:.0f} Mo de corps)\n")
+
+    requests = [Request(f"https://books.toscrape.com/catalogue/book_{i}/index.html")
+                for i in range(args.entries)]
+    rng = random.Random(1)
+    lookups = [rng.choice(requests) for _ in range(args.lookups)]
+
+    results = [
+        run(FilesystemCacheStorage, "FilesystemCacheStorage", requests, bodies, lookups),
+        run(SQLiteCacheStorage, "SQLiteCacheStorage (zlib)", requests, bodies, lookups),
+    ]
+
+    print(f"{'Stockage':<28} {'disque (Mo)':>12} {'inodes':>8} {'écriture (s)':>13} "
+          f"{'lookup p50 (ms)':>16} {'p95 (ms)':>9}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['label']:<28} {r['allocated'] / 1024 / 1024:>12.1f} {r['inodes']:>8} "
+              f"{r['write_s']:>13.2f} {r['p50']:>16.3f} {r['p95']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark : latence des requêtes du repository, index puis historique réduit.
+
+Construit une base synthétique sans index secondaires (schéma v1) et
+mesure les requêtes de ``BookRepository`` en trois étapes, pour séparer
+les deux gains :
+
+- ``v1`` : schéma d'origine, historique complet, sans index ;
+- ``index`` : migrations 2 à 6 (index, ANALYZE), historique toujours complet ;
+- ``changements`` : migrations 7 à 9 (historique réduit aux changements,
+  ``price_summary``, ``crawl_runs``), avec les index équivalents.
+
+``get_price_changes`` lit ``price_summary`` (migration 8) : avant, c'est la
+requête d'origine, un ``GROUP BY`` sur tout l'historique.
+``get_scraping_dates`` lit ``crawl_runs`` (migration 7) : pas de mesure
+avant pour elle.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_indexes.py --books 10000 --crawls 100
+"""
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter la racine du projet au path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic import build_catalogue, CATEGORIES
+from src.database.book_repository import BookRepository
+from src.database.connection import DatabaseConnection
+from src.database.migrations import apply_migrations
+
+QUERIES = {
+    "search_books (catégorie + prix + note)": lambda repo: repo.search_books(
+        category=CATEGORIES[3], min_price=20, max_price=40, min_rating=3, limit=50),
+    "search_books (prix seul, sélectif)": lambda repo: repo.search_books(min_price=59.5, limit=50),
+    "get_books_by_category": lambda repo: repo.get_books_by_category(CATEGORIES[7]),
+    "get_price_evolution": lambda repo: repo.get_price_evolution("00000000000004d2"),
+    "get_price_changes": lambda repo: repo.get_price_changes(5.0),
+    "get_scraping_dates": lambda repo: repo.get_scraping_dates(),
+}
+
+# Requête d'origine, avant la table price_summary
+PRICE_CHANGES_V1_SQL = """
+    SELECT
+        upc,
+        titre,
+        MIN(prix) as prix_min,
+        MAX(prix) as prix_max,
+        MAX(prix) - MIN(prix) as variation
+    FROM scraping_history
+    GROUP BY upc, titre
+    HAVING variation >= ?
+    ORDER BY variation DESC
+"""
+
+
+def _price_changes_v1(repo: BookRepository):
+    with repo.db.connection() as conn:
+        return conn.execute(PRICE_CHANGES_V1_SQL, (5.0,)).fetchall()
+
+
+# Dernière migration avant l'historique par changements
+INDEX_VERSION = 6
+
+# Équivalents en schéma v1 des requêtes qui lisent une table créée par migration
+V1_QUERIES = {
+    "get_price_changes": _price_changes_v1,
+}
+
+
+def time_queries(repo: BookRepository, repeat: int, overrides: dict = None) -> dict:
+    """Médiane (ms) de chaque requête sur ``repeat`` exécutions."""
+    results = {}
+    for name, query in QUERIES.items():
+        query = (overrides or {}).get(name, query)
+        try:
+            query(repo)  # échauffement du cache de pages
+        except sqlite3.OperationalError:
+            results[name] = None  # table absente de ce schéma
+            continue
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query(repo)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--crawls", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        print(f"Construction : {args.books} livres, {args.books * args.crawls} lignes d'historique (schéma v1)...")
+        build_catalogue(db_path, args.books, args.crawls, schema_version=1)
+
+        v1 = time_queries(BookRepository(db_path), args.repeat, V1_QUERIES)
+
+        start = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        apply_migrations(conn, target=INDEX_VERSION)
+        conn.close()
+        index_s = time.perf_counter() - start
+        indexed = time_queries(BookRepository(db_path), args.repeat, V1_QUERIES)
+
+        start = time.perf_counter()
+        DatabaseConnection(db_path, migrate=True)
+        history_s = time.perf_counter() - start
+        changes = time_queries(BookRepository(db_path), args.repeat)
+
+    def gain(before, after):
+        if before is None or after is None:
+            return f"{'-':>8}"
+        return f"{before / after if after else float('inf'):>7.1f}x"
+
+    def ms(value):
+        return f"{'-':>10}" if value is None else f"{value:>10.2f}"
+
+    print(f"Migrations 2-{INDEX_VERSION} (index, ANALYZE) : {index_s:.1f} s")
+    print(f"Migrations {INDEX_VERSION + 1}+ (historique par changements) : {history_s:.1f} s\n")
+    print(f"{'Requête':<42} {'v1 (ms)':>10} {'index':>10} {'changem.':>10} {'gain idx':>8} {'gain hist':>9}")
+    print("-" * 94)
+    for name in QUERIES:
+        print(f"{name:<42} {ms(v1[name])} {ms(indexed[name])} {ms(changes[name])} "
+              f"{gain(v1[name], indexed[name])} {gain(indexed[name], changes[name]):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark : chaîne des trois pipelines de nettoyage contre NormalizePipeline.
+
+Construit des items bruts (``prix_original``, ``notation_originale``,
+``disponibilite_texte``) à partir de l'échantillon
+``src/scraper/bookstoscrape_Scraper/resultats/livres.csv``, puis mesure le
+débit (items par seconde) :
+
+- de ``CleanPricePipeline`` → ``ConvertRatingPipeline`` →
+  ``ExtractAvailabilityPipeline`` (trois ``ItemAdapter``, regex non compilées) ;
+- de ``NormalizePipeline`` (un passage, regex précompilées).
+
+Les deux étages doivent produire exactement les mêmes valeurs : le script
+le vérifie avant de chronométrer.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_normalization.py --repeat 50
+"""
+import argparse
+import csv
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+project_root = Path(__file__).parent.parent
+scrapy_project = project_root / "src" / "scraper" / "bookstoscrape_Scraper"
+sys.path.insert(0, str(scrapy_project))
+
+import scrapy
+
+from bookstoscrape_Scraper.items import BookItem
+from bookstoscrape_Scraper.pipelines import (
+    CleanPricePipeline,
+    ConvertRatingPipeline,
+    ExtractAvailabilityPipeline,
+    NormalizePipeline,
+)
+
+SAMPLE = scrapy_project / "resultats" / "livres.csv"
+FIELDS = ("prix", "notation", "disponibilite")
+
+
+def load_items(path: Path):
+    """Items bruts, tels que le spider les produit."""
+    items = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            items.append(BookItem(
+                titre=row["titre"],
+                upc=row["upc"],
+                prix_original=row["prix"],
+                notation_originale=row["notation"],
+                disponibilite_texte=row["disponibilite"],
+            ))
+    return items
+
+
+def fresh(items):
+    return [item.copy() for item in items]
+
+
+def run_chain(stages, items, spider):
+    for item in items:
+        for stage in stages:
+            item = stage.process_item(item, spider)
+
+
+def check_equivalence(chain, fused, items, spider):
+    old, new = fresh(items), fresh(items)
+    run_chain(chain, old, spider)
+    run_chain(fused, new, spider)
+    for a, b in zip(old, new):
+        assert all(a.get(field) == b.get(field) for field in FIELDS), (dict(a), dict(b))
+
+
+def measure(stages, items, spider, repeat):
+    """Meilleur et médian débit sur ``repeat`` passages (copie des items hors chrono)."""
+    rates = []
+    for _ in range(repeat):
+        batch = fresh(items)
+        start = time.perf_counter()
+        run_chain(stages, batch, spider)
+        rates.append(len(batch) / (time.perf_counter() - start))
+    return max(rates), statistics.median(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample", type=Path, default=SAMPLE)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    spider = scrapy.Spider(name="bench_normalization")
+    spider.logger.logger.setLevel(logging.ERROR)
+    items = load_items(args.sample)
+    chain = [CleanPricePipeline(), ConvertRatingPipeline(), ExtractAvailabilityPipeline()]
+    fused = [NormalizePipeline()]
+    check_equivalence(chain, fused, items, spider)
+    print(f"{len(items)} items ({args.sample.name}), {args.repeat} passages, résultats identiques\n")
+
+    results = [
+        ("3 pipelines (chaîne)", *measure(chain, items, spider, args.repeat)),
+        ("NormalizePipeline", *measure(fused, items, spider, args.repeat)),
+    ]
+    print(f"{'Étage':<22} {'items/s (max)':>14} {'items/s (médian)':>17}")
+    print("-" * 55)
+    for label, best, median in results:
+        print(f"{label:<22} {best:>14.0f} {median:>17.0f}")
+    print(f"\nAccélération (médiane) : x{results[1][2] / results[0][2]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark : statistiques de distribution NumPy contre SQL équivalent.
+
+Construit un catalogue synthétique (1 000 000 de livres par défaut) puis
+compare, par catégorie :
+
+- percentiles (25, 50, 75, 90), moyenne, écart-type, min/max et prix
+  moyen pondéré par la note : fonctions de fenêtre SQLite (``ROW_NUMBER``
+  sur chaque catégorie) contre ``PriceStatsEngine.distribution`` ;
+- histogramme en 20 classes : ``GROUP BY`` SQLite contre un ``bincount``.
+
+Côté NumPy, le chargement des colonnes (une fois par version des données)
+est mesuré à part du calcul.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_stats.py --books 1000000
+    python benchmarks/bench_stats.py --db /tmp/bench.db   # base déjà construite
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter la racine du projet au path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic import build_catalogue
+from src.database.book_repository import BookRepository
+from src.database.price_stats import PriceStatsEngine, require_numpy
+
+PERCENTILES = (25, 50, 75, 90)
+BINS = 20
+
+# Percentile au rang inférieur (pas d'interpolation en SQL pur)
+DISTRIBUTION_SQL = """
+    WITH ranked AS (
+        SELECT
+            category, prix, notation,
+            ROW_NUMBER() OVER (PARTITION BY category ORDER BY prix) - 1 AS rang,
+            COUNT(*) OVER (PARTITION BY category) AS n
+        FROM books
+        WHERE prix IS NOT NULL
+    )
+    SELECT
+        category,
+        COUNT(*) AS nb_livres,
+        AVG(prix) AS prix_moyen,
+        AVG(prix * prix) - AVG(prix) * AVG(prix) AS variance,
+        MIN(prix) AS prix_min,
+        {percentiles},
+        MAX(prix) AS prix_max,
+        SUM(prix * notation) / SUM(notation) AS prix_moyen_pondere_note
+    FROM ranked
+    GROUP BY category
+""".format(percentiles=",\n        ".join(
+    f"MAX(CASE WHEN rang = CAST({p / 100} * (n - 1) AS INTEGER) THEN prix END) AS p{p}"
+    for p in PERCENTILES
+))
+
+HISTOGRAM_SQL = """
+    SELECT category, MIN(CAST((prix - :low) / :width AS INTEGER), :bins - 1) AS classe, COUNT(*)
+    FROM books
+    WHERE prix IS NOT NULL
+    GROUP BY category, classe
+"""
+
+
+def measure(func, repeat: int):
+    """Médiane et maximum (ms) sur ``repeat`` exécutions, après échauffement."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def run(db_path: str, repeat: int):
+    repo = BookRepository(db_path, migrate=False)
+    with repo.db.connection() as conn:
+        n_books = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        low, high = conn.execute("SELECT MIN(prix), MAX(prix) FROM books").fetchone()
+
+    def sql_distribution():
+        with repo.db.connection() as conn:
+            return conn.execute(DISTRIBUTION_SQL).fetchall()
+
+    def sql_histogram():
+        with repo.db.connection() as conn:
+            return conn.execute(
+                HISTOGRAM_SQL, {'low': low, 'width': (high - low) / BINS, 'bins': BINS}
+            ).fetchall()
+
+    def cold_load():
+        # Nouveau moteur : colonnes relues depuis SQLite
+        return PriceStatsEngine(repo.db).distribution(PERCENTILES)
+
+    engine = PriceStatsEngine(repo.db)
+    print(f"{n_books} livres, {len(sql_distribution())} catégories\n")
+    print(f"{'Calcul':<44} {'médiane':>10} {'max':>10}")
+    print("-" * 66)
+    results = [
+        ("SQL : distribution (fenêtres)", sql_distribution, max(3, repeat // 2)),
+        ("NumPy : chargement + distribution", cold_load, max(3, repeat // 2)),
+        ("NumPy : distribution (colonnes en mémoire)", lambda: engine.distribution(PERCENTILES), repeat),
+        ("SQL : histogramme (GROUP BY)", sql_histogram, max(3, repeat // 2)),
+        ("NumPy : histogramme (colonnes en mémoire)", lambda: engine.histogram(BINS), repeat),
+    ]
+    for label, func, count in results:
+        median, worst = measure(func, count)
+        print(f"{label:<44} {median:>9.1f}  {worst:>9.1f}")
+
+    print("\nDurées en millisecondes. Le chargement n'a lieu qu'une fois par version "
+          "des données (fin de crawl) ;\nles requêtes suivantes ne paient que le calcul.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--db", help="base existante (pas de construction)")
+    args = parser.parse_args()
+    require_numpy()
+
+    if args.db:
+        run(args.db, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        print(f"Construction : {args.books} livres...")
+        start = time.perf_counter()
+        build_catalogue(db_path, args.books)
+        print(f"Construction : {time.perf_counter() - start:.1f} s\n")
+        run(db_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
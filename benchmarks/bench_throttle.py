@@ -0,0 +1,189 @@
+"""Benchmark : délai fixe, AutoThrottle et AdaptiveThrottle face à un serveur limité.
+
+Lance un serveur HTTP local qui imite le site (pages de liste de 20 livres,
+pages produit) avec une capacité limitée : la latence croît au-delà de
+``--capacity`` requêtes simultanées, le serveur répond 503 au-delà du
+double et 429 au-delà de ``--rate-limit`` requêtes par seconde. Chaque
+réglage crawle le site dans un processus séparé (le reactor Twisted ne
+redémarre pas) ; le tableau donne la durée, le débit et les refus.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/bench_throttle.py --pages 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+project_root = Path(__file__).parent.parent
+scrapy_project = project_root / "src" / "scraper" / "bookstoscrape_Scraper"
+sys.path.insert(0, str(scrapy_project))
+
+BOOKS_PER_PAGE = 20
+
+CONFIG_NAMES = ("fixe", "autothrottle", "adaptive")
+
+
+def config_settings(config: str, min_delay: float, max_concurrency: int) -> dict:
+    """Settings d'un réglage ; AutoThrottle et AdaptiveThrottle ont le même plafond."""
+    if config == "fixe":
+        return {"CONCURRENT_REQUESTS_PER_DOMAIN": 1, "DOWNLOAD_DELAY": 1}
+    if config == "autothrottle":
+        return {
+            "CONCURRENT_REQUESTS_PER_DOMAIN": max_concurrency,
+            "DOWNLOAD_DELAY": min_delay,
+            "AUTOTHROTTLE_ENABLED": True,
+            "AUTOTHROTTLE_START_DELAY": 1,
+        }
+    return {
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 1,
+        "DOWNLOAD_DELAY": 1,
+        "EXTENSIONS": {"bookstoscrape_Scraper.extensions.AdaptiveThrottle": 500},
+        "ADAPTIVE_THROTTLE_ENABLED": True,
+        "ADAPTIVE_THROTTLE_MAX_CONCURRENCY": max_concurrency,
+        "ADAPTIVE_THROTTLE_MIN_DELAY": min_delay,
+    }
+
+
+class LimitedServer(ThreadingHTTPServer):
+    """Serveur dont la latence et les refus dépendent de la charge."""
+
+    daemon_threads = True
+
+    def __init__(self, address, pages, capacity, rate_limit, latency):
+        super().__init__(address, Handler)
+        self.pages = pages
+        self.capacity = capacity
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.recent = []
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        now = time.monotonic()
+        with server.lock:
+            server.recent = [t for t in server.recent if now - t < 1.0]
+            server.recent.append(now)
+            server.in_flight += 1
+            in_flight, rate = server.in_flight, len(server.recent)
+        try:
+            if rate > server.rate_limit:
+                return self.reply(429, b"too many requests", {"Retry-After": "1"})
+            if in_flight > 2 * server.capacity:
+                return self.reply(503, b"overloaded", {"Retry-After": "2"})
+            time.sleep(server.latency * max(1.0, in_flight / server.capacity))
+            self.reply(200, self.page())
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def page(self) -> bytes:
+        if self.path.startswith("/page-"):
+            number = int(self.path[len("/page-"):-len(".html")])
+            links = "".join(
+                f'<a href="/book-{(number - 1) * BOOKS_PER_PAGE + i}.html">livre</a>'
+                for i in range(BOOKS_PER_PAGE)
+            )
+            if number < self.server.pages:
+                links += f'<a class="next" href="/page-{number + 1}.html">suivant</a>'
+            return f"<html><body>{links}</body></html>".encode()
+        return f"<html><body><h1>{self.path}</h1>{'<p>description</p>' * 50}</body></html>".encode()
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def crawl(config: str, port: int, min_delay: float, max_concurrency: int):
+    """Crawle le site local avec un réglage ; affiche les stats en JSON."""
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+
+    class SiteSpider(scrapy.Spider):
+        name = "bench_throttle"
+        start_urls = [f"http://127.0.0.1:{port}/page-1.html"]
+
+        def parse(self, response):
+            yield from response.follow_all(css="a")
+
+    settings = {
+        "LOG_LEVEL": "WARNING",
+        "ROBOTSTXT_OBEY": False,
+        "TELNETCONSOLE_ENABLED": False,
+        "RETRY_TIMES": 10,
+        **config_settings(config, min_delay, max_concurrency),
+    }
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(SiteSpider)
+    process.crawl(crawler)
+    start = time.perf_counter()
+    process.start()
+    stats = crawler.stats.get_stats()
+    print(json.dumps({
+        "duration": time.perf_counter() - start,
+        "responses": stats.get("response_received_count", 0),
+        "pages": stats.get("downloader/response_status_count/200", 0),
+        "429": stats.get("downloader/response_status_count/429", 0),
+        "503": stats.get("downloader/response_status_count/503", 0),
+        "max_concurrency": stats.get("adaptive_throttle/max_concurrency"),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5, help="pages de liste (20 livres chacune)")
+    parser.add_argument("--capacity", type=int, default=4, help="requêtes simultanées sans ralentir")
+    parser.add_argument("--rate-limit", type=int, default=15, help="requêtes par seconde avant 429")
+    parser.add_argument("--latency", type=float, default=0.1, help="latence à vide (s)")
+    parser.add_argument("--min-delay", type=float, default=0.05, help="plancher de délai commun (s)")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="plafond de concurrence commun")
+    parser.add_argument("--configs", nargs="+", choices=CONFIG_NAMES, default=list(CONFIG_NAMES))
+    parser.add_argument("--run", choices=CONFIG_NAMES, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    if args.run:
+        crawl(args.run, args.port, args.min_delay, args.max_concurrency)
+        return
+
+    server = LimitedServer(("127.0.0.1", args.port), args.pages, args.capacity, args.rate_limit, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"{args.pages} pages de liste ({args.pages * (BOOKS_PER_PAGE + 1)} pages), capacité "
+          f"{args.capacity}, limite {args.rate_limit} req/s, latence à vide {args.latency * 1000:.0f} ms\n")
+
+    print(f"{'Réglage':<14} {'durée (s)':>10} {'pages/s':>8} {'réponses':>9} {'429':>5} {'503':>5} {'conc. max':>10}")
+    print("-" * 68)
+    try:
+        for config in args.configs:
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", config, "--port", str(args.port),
+                 "--min-delay", str(args.min_delay), "--max-concurrency", str(args.max_concurrency)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(f"{config:<14} {r['duration']:>10.1f} {r['pages'] / r['duration']:>8.1f} "
+                  f"{r['responses']:>9} {r['429']:>5} {r['503']:>5} {str(r['max_concurrency'] or '-'):>10}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Test de charge de l'API : mode sync contre mode async.
+
+Lance un serveur uvicorn par mode (``BOOKS_API_MODE=sync`` puis
+``async``) sur la base ``data/books.db``, ouvre ``--concurrency``
+connexions keep-alive et envoie des requêtes en boucle pendant
+``--duration`` secondes. Affiche les requêtes par seconde et les
+percentiles de latence (p50, p95, p99).
+
+Le client n'utilise que la bibliothèque standard (HTTP/1.1 minimal sur
+asyncio) pour ne pas devenir lui-même le goulot d'étranglement.
+
+Usage (depuis la racine du projet, après un crawl) ::
+
+    python benchmarks/load_test.py --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+# Ajouter la racine du projet au path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+MODES = ("sync", "async")
+
+
+def default_paths() -> List[str]:
+    """Mélange de routes de lecture (pages, détails, recherches, stats)."""
+    paths = [f"/books/{book_id}" for book_id in range(1, 301)]
+    paths += [f"/books?limit={limit}" for limit in (10, 20, 50, 100)]
+    paths += [f"/books/search?min_rating={rating}&limit=20" for rating in range(6)]
+    paths += [f"/books/search?q={word}&limit=10" for word in ("love", "mystery", "war", "house", "secret")]
+    paths += ["/stats", "/categories", "/categories/Travel/books?limit=20"]
+    return paths
+
+
+async def client(host: str, port: int, paths: List[str], deadline: float,
+                 latencies: List[float], errors: Dict[str, int]):
+    """Une connexion keep-alive qui enchaîne les requêtes jusqu'à ``deadline``."""
+    rng = random.Random()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n"
+            start = time.perf_counter()
+            writer.write(request.encode())
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+
+            status = status_line.split(b" ", 2)[1].decode() if status_line else "EOF"
+            if not status.startswith(("2", "3")) and status != "404":
+                errors[status] = errors.get(status, 0) + 1
+                if status == "EOF":
+                    break
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, paths: List[str], concurrency: int, duration: float) -> Dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        client(host, port, paths, deadline, latencies, errors) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    """Démarre uvicorn (un worker) et attend que /health réponde."""
+    env = dict(os.environ, BOOKS_API_MODE=mode)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=str(project_root),
+        env=env
+    )
+    for _ in range(100):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Le serveur ({mode}) n'a pas démarré sur le port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100, help="connexions simultanées")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée par mode (s)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="échauffement par mode (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    paths = default_paths()
+    results = {}
+    for mode in args.modes:
+        print(f"Mode {mode} : {args.concurrency} connexions, {args.duration:.0f} s...")
+        server = start_server(mode, args.port)
+        try:
+            asyncio.run(run_load("127.0.0.1", args.port, paths, args.concurrency, args.warmup))
+            results[mode] = asyncio.run(
+                run_load("127.0.0.1", args.port, paths, args.concurrency, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{'Mode':<8} {'requêtes':>10} {'req/s':>10} {'p50 (ms)':>10} "
+          f"{'p95 (ms)':>10} {'p99 (ms)':>10} {'erreurs':>8}")
+    print("-" * 72)
+    for mode, result in results.items():
+        latencies = sorted(result["latencies"])
+        if not latencies:
+            print(f"{mode:<8} aucune réponse ({result['errors']})")
+            continue
+        rps = len(latencies) / result["elapsed"]
+        print(f"{mode:<8} {len(latencies):>10} {rps:>10.0f} "
+              f"{percentile(latencies, 50) * 1000:>10.2f} "
+              f"{percentile(latencies, 95) * 1000:>10.2f} "
+              f"{percentile(latencies, 99) * 1000:>10.2f} "
+              f"{sum(result['errors'].values()):>8}")
+        if result["errors"]:
+            print(f"         détail des erreurs : {result['errors']}")
+        print(f"         latence moyenne : {statistics.mean(latencies) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""Suite de benchmarks hors ligne : scraping, pipelines, stockage et API.
+
+Rejoue le cache HTTP versionné du projet (``.scrapy/httpcache``, format
+répertoires de ``FilesystemCacheStorage``) et des catalogues synthétiques,
+sans accès réseau, puis écrit un rapport JSON :
+
+- ``spider_parse`` : callbacks du spider (``parse``, ``parse_product``) sur
+  les pages du cache, sans moteur Scrapy (pages par seconde) ;
+- ``crawl`` : crawl complet (moteur, middlewares, pipelines, base SQLite
+  temporaire) contre un serveur HTTP local qui sert les pages du cache
+  (404 pour les pages absentes du cache, non comptées) ;
+- ``pipelines`` : ``NormalizePipeline`` puis ``DuplicatesPipeline`` sur
+  ``--items`` items bruts (items par seconde) ;
+- ``sqlite_insert`` : ``SaveToSQLitePipeline`` sur les mêmes items, écriture
+  par lots et finalisation comprises ;
+- ``api`` : latence p50/p95 de chaque route, via ``TestClient``, sur un
+  catalogue synthétique par taille de ``--sizes`` (cache de réponses vidé
+  avant chaque requête : latence à froid).
+
+Chaque mesure est une entrée de ``metrics`` (valeur et unité). Avec
+``--compare ANCIEN.json``, une mesure moins bonne de plus de
+``--tolerance`` (20 % par défaut) est signalée et le script sort en erreur :
+les débits (``/s``) doivent rester hauts, les latences (``ms``) basses.
+
+Usage (depuis la racine du projet) ::
+
+    python benchmarks/suite.py --sizes 10000 100000 --output rapport.json
+    python benchmarks/suite.py --compare rapport.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+# Ajouter la racine du projet et le projet Scrapy au path
+project_root = Path(__file__).parent.parent
+scrapy_project = project_root / "src" / "scraper" / "bookstoscrape_Scraper"
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(scrapy_project))
+
+# Cache FilesystemCacheStorage versionné avec le projet (crawl de référence)
+CACHE_DIR = scrapy_project / ".scrapy" / "httpcache" / "booktoscrape_Scraper"
+# Cache SQLite d'un crawl local (SQLiteCacheStorage), utilisé à défaut
+CACHE_PATH = CACHE_DIR.with_suffix(".sqlite")
+
+
+def load_cached_pages(
+    cache_dir: Path = CACHE_DIR,
+    sqlite_path: Path = CACHE_PATH
+) -> Dict[str, Tuple[str, int, bytes]]:
+    """Pages du cache HTTP, indexées par chemin : ``{chemin: (url, statut, corps)}``."""
+    from scrapy.settings import Settings
+
+    from bookstoscrape_Scraper.httpcache import SQLiteCacheStorage, iter_filesystem_cache
+
+    pages = {}
+    if cache_dir.is_dir():
+        for _, metadata, _, body in iter_filesystem_cache(cache_dir):
+            url = metadata["url"]
+            pages[urlparse(url).path or "/"] = (url, metadata["status"], body)
+        return pages
+
+    if not sqlite_path.exists():
+        raise SystemExit(f"Cache HTTP introuvable ({cache_dir}, {sqlite_path})")
+    codec = SQLiteCacheStorage(Settings()).codec
+    conn = sqlite3.connect(str(sqlite_path))
+    for url, status, encoding, body in conn.execute("SELECT url, status, codec, body FROM responses"):
+        pages[urlparse(url).path or "/"] = (url, status, codec.decompress(encoding, body))
+    conn.close()
+    return pages
+
+
+def is_listing(path: str) -> bool:
+    """Page de liste (accueil ou ``catalogue/page-N.html``) plutôt que page produit."""
+    return not path.endswith("/index.html")
+
+
+# --- Spider ---------------------------------------------------------------
+
+def bench_spider_parse(pages, repeat: int):
+    """Débit des callbacks ; retourne aussi les items bruts produits."""
+    from scrapy.http import HtmlResponse
+
+    from bookstoscrape_Scraper.spiders.booktoscrape_Scraper import BooktoscrapeScraperSpider
+
+    spider = BooktoscrapeScraperSpider()
+    responses = [
+        (HtmlResponse(url=url, status=status, body=body, encoding="utf-8"), is_listing(path))
+        for path, (url, status, body) in pages.items() if status == 200
+    ]
+    items = []
+    rates = []
+    for _ in range(repeat):
+        items = []
+        start = time.perf_counter()
+        for response, listing in responses:
+            output = spider.parse(response) if listing else spider.parse_product(response)
+            items.extend(obj for obj in output if not hasattr(obj, "callback"))
+        rates.append(len(responses) / (time.perf_counter() - start))
+    return statistics.median(rates), items
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Sert les pages du cache HTTP sous leur chemin d'origine."""
+
+    daemon_threads = True
+
+    def __init__(self, address, pages):
+        super().__init__(address, ReplayHandler)
+        self.pages = pages
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        status, body = (page[1], page[2]) if page else (404, b"not found")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def crawl(port: int, db_path: str):
+    """Crawle le serveur local avec les settings du projet ; affiche les stats en JSON."""
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "bookstoscrape_Scraper.settings")
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    from bookstoscrape_Scraper.spiders.booktoscrape_Scraper import BooktoscrapeScraperSpider
+
+    class ReplaySpider(BooktoscrapeScraperSpider):
+        allowed_domains = ["127.0.0.1"]
+        start_urls = [f"http://127.0.0.1:{port}/"]
+
+    settings = get_project_settings()
+    settings.setdict({
+        "LOG_LEVEL": "WARNING",
+        "ROBOTSTXT_OBEY": False,
+        "TELNETCONSOLE_ENABLED": False,
+        # Pas de délai ni de cache : on mesure le traitement, pas la politesse
+        "HTTPCACHE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16,
+        "ADAPTIVE_THROTTLE_ENABLED": False,
+        "SQLITE_DB_PATH": db_path,
+    }, priority="cmdline")
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(ReplaySpider)
+    process.crawl(crawler)
+    start = time.perf_counter()
+    process.start()
+    stats = crawler.stats.get_stats()
+    print(json.dumps({
+        "duration": time.perf_counter() - start,
+        "responses": stats.get("response_received_count", 0),
+        "pages": stats.get("downloader/response_status_count/200", 0),
+        "items": stats.get("item_scraped_count", 0),
+    }))
+
+
+def bench_crawl(pages, port: int) -> Dict:
+    server = ReplayServer(("127.0.0.1", port), pages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-crawl-") as tmp:
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", "crawl", "--port", str(port),
+                 "--db", os.path.join(tmp, "books.db")],
+                capture_output=True, text=True, check=True, cwd=str(scrapy_project)
+            ).stdout
+    finally:
+        server.shutdown()
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# --- Pipelines et stockage ------------------------------------------------
+
+def scale_items(items, n: int):
+    """``n`` items bruts distincts, recopiés des items du cache (UPC renumérotés)."""
+    products = [item for item in items if item.get("upc")]
+    scaled = []
+    for i in range(n):
+        item = products[i % len(products)].copy()
+        item["upc"] = f"{i:016x}"
+        item["url"] = f"{item['url']}#{i}"
+        scaled.append(item)
+    return scaled
+
+
+def bench_pipelines(items, spider) -> Tuple[float, list]:
+    from bookstoscrape_Scraper.pipelines import DuplicatesPipeline, NormalizePipeline
+
+    normalize, duplicates = NormalizePipeline(), DuplicatesPipeline()
+    batch = [item.copy() for item in items]
+    duplicates.open_spider(spider)
+    start = time.perf_counter()
+    out = [duplicates.process_item(normalize.process_item(item, spider), spider) for item in batch]
+    duration = time.perf_counter() - start
+    duplicates.close_spider(spider)
+    return len(batch) / duration, out
+
+
+def bench_sqlite_insert(items, spider) -> float:
+    from bookstoscrape_Scraper.pipelines import SaveToSQLitePipeline
+
+    with tempfile.TemporaryDirectory(prefix="bench-sqlite-") as tmp:
+        pipeline = SaveToSQLitePipeline(db_path=os.path.join(tmp, "books.db"), batch_size=500)
+        pipeline.open_spider(spider)
+        start = time.perf_counter()
+        for item in items:
+            pipeline.process_item(item, spider)
+        pipeline.close_spider(spider)
+        return len(items) / (time.perf_counter() - start)
+
+
+# --- API ------------------------------------------------------------------
+
+def api_paths(db_path: str) -> List[str]:
+    """Une requête représentative par route, avec des paramètres tirés de la base."""
+    conn = sqlite3.connect(db_path)
+    book_id, upc, category = conn.execute(
+        "SELECT id, upc, category FROM books ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM books)"
+    ).fetchone()
+    conn.close()
+    from src.database import price_stats
+
+    # Statistiques de distribution : seulement si numpy est installé (503 sinon)
+    distribution = ["/stats/distribution", "/stats/distribution/history"] if price_stats.numpy is not None else []
+    return [
+        "/",
+        "/books?limit=50",
+        "/books/search?q=love&limit=20",
+        "/books/search?category=Travel&min_rating=3&limit=20",
+        f"/books/{book_id}",
+        "/categories",
+        f"/categories/{category}/books?limit=50",
+        "/stats",
+        *distribution,
+        "/history/dates",
+        f"/history/book/{upc}",
+        "/history/price-changes",
+        f"/export/books?category={category}",
+        "/health",
+    ]
+
+
+def bench_api(db_path: str, repeat: int):
+    """Latences par route ; affiche le résultat en JSON (processus dédié à une base)."""
+    os.environ["BOOKS_DB_PATH"] = db_path
+    from fastapi.testclient import TestClient
+
+    from src.api.main import app, response_cache
+
+    results = {}
+    with TestClient(app) as client:
+        for path in api_paths(db_path):
+            client.get(path)  # connexions et plans de requêtes
+            latencies = []
+            for _ in range(repeat):
+                response_cache.clear()
+                start = time.perf_counter()
+                response = client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            latencies.sort()
+            results[path] = {
+                "p50_ms": statistics.median(latencies),
+                "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            }
+    print(json.dumps(results))
+
+
+def run_api(size: int, crawls: int, repeat: int, workdir: str) -> Dict:
+    from benchmarks.synthetic import build_catalogue
+
+    db_path = os.path.join(workdir, f"books_{size}.db")
+    build_catalogue(db_path, n_books=size, n_crawls=crawls)
+    output = subprocess.run(
+        [sys.executable, __file__, "--run", "api", "--db", db_path, "--repeat", str(repeat)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# --- Rapport --------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(project_root),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def compare(metrics: Dict, previous: Dict, tolerance: float) -> List[str]:
+    """Mesures moins bonnes qu'avant de plus de ``tolerance`` (fraction)."""
+    regressions = []
+    for name, old in previous.get("metrics", {}).items():
+        new = metrics.get(name)
+        if new is None or not old["value"]:
+            continue
+        ratio = new["value"] / old["value"]
+        worse = ratio < 1 - tolerance if new["unit"].endswith("/s") else ratio > 1 + tolerance
+        if worse:
+            regressions.append(f"{name} : {old['value']:.1f} -> {new['value']:.1f} {new['unit']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000],
+                        help="tailles des catalogues synthétiques (API), jusqu'à 1000000")
+    parser.add_argument("--crawls", type=int, default=5, help="passages d'historique par catalogue")
+    parser.add_argument("--items", type=int, default=20_000, help="items pour les pipelines et SQLite")
+    parser.add_argument("--repeat", type=int, default=20, help="requêtes par route, passages du spider")
+    parser.add_argument("--skip", nargs="+", default=[],
+                        choices=("spider_parse", "crawl", "pipelines", "sqlite_insert", "api"))
+    parser.add_argument("--output", type=Path, default=Path("benchmark_report.json"))
+    parser.add_argument("--compare", type=Path, help="rapport précédent")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--run", choices=("crawl", "api"), help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    if args.run == "crawl":
+        crawl(args.port, args.db)
+        return
+    if args.run == "api":
+        bench_api(args.db, args.repeat)
+        return
+
+    import scrapy
+
+    spider = scrapy.Spider(name="bench_suite")
+    spider.logger.logger.setLevel(logging.ERROR)
+    metrics = {}
+
+    def record(name: str, value: float, unit: str):
+        metrics[name] = {"value": value, "unit": unit}
+        print(f"{name:<58} {value:>12.1f} {unit}")
+
+    pages = load_cached_pages()
+    print(f"{len(pages)} pages dans le cache HTTP, catalogues de {args.sizes} livres\n")
+
+    rate, raw_items = bench_spider_parse(pages, max(1, args.repeat // 4))
+    if "spider_parse" not in args.skip:
+        record("spider_parse", rate, "pages/s")
+    if "crawl" not in args.skip:
+        result = bench_crawl(pages, args.port)
+        record("crawl", result["pages"] / result["duration"], "pages/s")
+        record("crawl items", result["items"] / result["duration"], "items/s")
+
+    items = scale_items(raw_items, args.items)
+    normalized = items
+    if "pipelines" not in args.skip or "sqlite_insert" not in args.skip:
+        rate, normalized = bench_pipelines(items, spider)
+        if "pipelines" not in args.skip:
+            record("pipelines", rate, "items/s")
+    if "sqlite_insert" not in args.skip:
+        record("sqlite_insert", bench_sqlite_insert(normalized, spider), "items/s")
+
+    if "api" not in args.skip:
+        with tempfile.TemporaryDirectory(prefix="bench-api-") as workdir:
+            for size in args.sizes:
+                for path, latency in run_api(size, args.crawls, args.repeat, workdir).items():
+                    record(f"api[{size}] {path} p50", latency["p50_ms"], "ms")
+                    record(f"api[{size}] {path} p95", latency["p95_ms"], "ms")
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": {"sizes": args.sizes, "crawls": args.crawls, "items": args.items, "repeat": args.repeat},
+        },
+        "metrics": metrics,
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nRapport écrit dans {args.output}")
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(metrics, previous, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.tolerance:.0%} "
+                  f"(référence {previous['meta']['commit']}) :")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nAucune régression au-delà de {args.tolerance:.0%} (référence {previous['meta']['commit']})")
+
+
+if __name__ == "__main__":
+    main()
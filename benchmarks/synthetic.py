@@ -0,0 +1,166 @@
+"""Génération de catalogues synthétiques pour les benchmarks.
+
+Les bases produites ont le même schéma que celle du scraper : un livre
+par ligne dans ``books``, un ``crawl_runs`` par crawl et une ligne
+``price_history`` par changement de prix (avant la migration 7 : une ligne
+par livre et par crawl dans la table ``scraping_history``).
+"""
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Ajouter la racine du projet au path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.aggregates import refresh_category_stats
+from src.database.migrations import apply_migrations, get_schema_version
+from src.database.price_summary import refresh_price_summary
+
+CATEGORIES = [
+    "Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics",
+    "Philosophy", "Romance", "Womens Fiction", "Fiction", "Childrens",
+    "Religion", "Nonfiction", "Music", "Default", "Science Fiction",
+    "Sports and Games", "Add a comment", "Fantasy", "New Adult", "Young Adult",
+    "Science", "Poetry", "Paranormal", "Art", "Psychology",
+    "Autobiography", "Parenting", "Adult Fiction", "Humor", "Horror",
+    "History", "Food and Drink", "Christian Fiction", "Business", "Biography",
+    "Thriller", "Contemporary", "Spirituality", "Academic", "Self Help",
+    "Historical", "Christian", "Suspense", "Short Stories", "Novels",
+    "Health", "Politics", "Cultural", "Erotica", "Crime",
+]
+
+WORDS = (
+    "the of and a to in is you that it he was for on are as with his they at be "
+    "this have from or one had by word but not what all were we when your can said "
+    "there use an each which she do how their if will up other about out many then "
+    "them these so some her would make like him into time has look two more write go "
+    "see number no way could people my than first water been call who oil its now "
+    "find long down day did get come made may part light night dream river secret "
+    "garden shadow war love house city heart stone winter summer king queen murder"
+).split()
+
+# Mots rares générés à partir de syllabes : avec WORDS en tête et des
+# fréquences en loi de Zipf, le texte ressemble à une vraie distribution
+# (quelques mots très fréquents, une longue traîne de mots rares), ce qui
+# compte pour les benchmarks de recherche plein texte.
+SYLLABLES = "ka lo mi ra te su vo ni pa de ro shi an el or ux ba fi".split()
+VOCABULARY = WORDS + [
+    a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES
+]
+_CUM_WEIGHTS = list(accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+START_DATE = datetime(2025, 1, 1)
+
+
+def _upc(i: int) -> str:
+    return f"{i:016x}"
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, cum_weights=_CUM_WEIGHTS, k=n_words))
+
+
+def _books(rng: random.Random, n_books: int) -> Iterator[tuple]:
+    date = START_DATE.isoformat()
+    for i in range(n_books):
+        yield (
+            _text(rng, rng.randint(2, 6)).title(),
+            round(rng.uniform(10, 60), 2),
+            rng.randint(0, 5),
+            rng.randint(0, 22),
+            _text(rng, rng.randint(40, 120)),
+            _upc(i),
+            rng.choice(CATEGORIES),
+            f"https://books.toscrape.com/catalogue/book_{i}/index.html",
+            f"https://books.toscrape.com/media/cache/{i:04x}.jpg",
+            date,
+        )
+
+
+def build_catalogue(
+    db_path: str,
+    n_books: int,
+    n_crawls: int = 1,
+    change_rate: float = 0.05,
+    seed: int = 42,
+    schema_version: Optional[int] = None
+) -> None:
+    """Crée une base de ``n_books`` livres suivis pendant ``n_crawls`` crawls.
+
+    À chaque crawl, une fraction ``change_rate`` des livres change de prix.
+    ``schema_version`` limite les migrations appliquées (par exemple 1 pour
+    une base sans index secondaires).
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    # Gros cache : l'index FTS5 alimenté ligne à ligne par trigger relit
+    # sans cesse ses segments, et le coût devient quadratique s'ils sortent du cache
+    conn.execute("PRAGMA cache_size = -262144")
+    apply_migrations(conn, target=schema_version)
+
+    with conn:
+        conn.executemany("""
+            INSERT INTO books
+            (titre, prix, notation, disponibilite, description, upc, category, url, image, date_scraping)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _books(rng, n_books))
+
+    state = conn.execute(
+        "SELECT upc, titre, prix, notation, disponibilite, category FROM books ORDER BY id"
+    ).fetchall()
+    state = [list(row) for row in state]
+    deltas = get_schema_version(conn) >= 7
+    if deltas:
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO titles (titre) VALUES (?)", [(b[1],) for b in state])
+            conn.executemany("INSERT OR IGNORE INTO categories (category) VALUES (?)", [(b[5],) for b in state])
+        title_ids = dict(conn.execute("SELECT titre, id FROM titles"))
+        category_ids = dict(conn.execute("SELECT category, id FROM categories"))
+
+    for crawl in range(n_crawls):
+        date = (START_DATE + timedelta(days=crawl)).isoformat()
+        rows = []
+        for book in state:
+            changed = crawl and rng.random() < change_rate
+            if changed:
+                book[2] = round(max(1.0, book[2] * rng.uniform(0.7, 1.3)), 2)
+            if not deltas:
+                rows.append((*book, date))
+            elif changed or not crawl:
+                upc, titre, prix, notation, disponibilite, category = book
+                rows.append((upc, title_ids[titre], category_ids[category], prix, notation, disponibilite, date))
+        with conn:
+            if not deltas:
+                conn.executemany("""
+                    INSERT INTO scraping_history
+                    (upc, titre, prix, notation, disponibilite, category, date_scraping)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                continue
+            run_id = conn.execute(
+                "INSERT INTO crawl_runs (started_at, finished_at) VALUES (?, ?)", (date, date)
+            ).lastrowid
+            conn.executemany("""
+                INSERT INTO price_history
+                (run_id, upc, titre_id, category_id, prix, notation, disponibilite, date_scraping)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(run_id, *row) for row in rows])
+
+    with conn:
+        conn.executemany(
+            "UPDATE books SET prix = ?, date_scraping = ? WHERE upc = ?",
+            [(book[2], date, book[0]) for book in state] if n_crawls else []
+        )
+    # Catégories notées par les triggers de la migration 9
+    if get_schema_version(conn) >= 9:
+        refresh_category_stats(conn)
+    if get_schema_version(conn) >= 8:
+        refresh_price_summary(conn)
+    conn.close()
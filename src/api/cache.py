@@ -0,0 +1,216 @@
+"""Cache des réponses de l'API, invalidé par la version des données.
+
+Les réponses JSON déjà sérialisées sont gardées dans un LRU borné avec
+TTL. Chaque entrée est marquée de la version des données au moment du
+calcul : dès que le scraper publie une nouvelle version, tout le cache
+est vidé au premier accès.
+
+La version elle-même n'est relue dans SQLite qu'une fois par intervalle
+(``VersionPoller``) : un hit ne fait alors aucun accès à la base. Une
+nouvelle version est vue au plus ``interval`` secondes après la fin du
+crawl.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.database.async_repository import run_inline
+
+
+def make_key(route: str, params: Dict) -> str:
+    """Clé normalisée : nom de la route et paramètres validés, triés."""
+    return route + "?" + json.dumps(params, sort_keys=True, default=str, separators=(',', ':'))
+
+
+def make_etag(key: str, version: int) -> str:
+    """ETag fort : une réponse ne change que si la version des données change."""
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def http_date(iso_date: Optional[str]) -> Optional[str]:
+    """Convertit une date ISO locale en date HTTP (Last-Modified)."""
+    if not iso_date:
+        return None
+    moment = datetime.fromisoformat(iso_date).astimezone(timezone.utc)
+    return format_datetime(moment.replace(microsecond=0), usegmt=True)
+
+
+def not_modified(headers, etag: str, last_modified: Optional[str]) -> bool:
+    """Vrai si la requête conditionnelle correspond à la réponse actuelle."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ResponseCache:
+    """LRU thread-safe de réponses sérialisées, avec TTL et version."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[int, float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        """Réponse en cache pour ``key``, si calculée sur cette version."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def set(self, key: str, version: int, body: bytes):
+        """Ajoute une réponse calculée sur ``version``."""
+        with self._lock:
+            self._check_version(version)
+            if version != self._version:
+                return  # calculée sur une version déjà remplacée
+            self._entries[key] = (version, time.monotonic(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Compteurs d'utilisation du cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "data_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
+
+    def _check_version(self, version: int):
+        # Appelé sous verrou : une version plus récente invalide tout le cache
+        if self._version is None or version > self._version:
+            if self._version is not None:
+                self._invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+
+class VersionPoller:
+    """Version des données, relue au plus une fois par ``interval`` secondes.
+
+    S'utilise à la place de ``get_version`` dans ``cached_route`` ; avec
+    ``interval=0``, chaque appel relit la base.
+    """
+
+    def __init__(self, get_version: Callable[[], Awaitable[Dict]], interval: float = 1.0):
+        self.get_version = get_version
+        self.interval = interval
+        # (instant de la lecture, version) : remplacé d'un bloc, sans verrou
+        self._last: Optional[Tuple[float, Dict]] = None
+        self._polls = 0
+
+    async def __call__(self) -> Dict:
+        last = self._last
+        if last is not None and time.monotonic() - last[0] < self.interval:
+            return last[1]
+        version = await self.get_version()
+        self._last = (time.monotonic(), version)
+        self._polls += 1
+        return version
+
+    def stats(self) -> Dict:
+        return {"interval": self.interval, "polls": self._polls}
+
+
+def cached_route(
+    cache: ResponseCache,
+    get_version: Callable[[], Awaitable[Dict]],
+    blocking: bool = False
+):
+    """Décorateur de route FastAPI : cache versionné, ETag/Last-Modified et 304.
+
+    La route décorée est une coroutine ; ``get_version`` aussi, et retourne
+    la version des données (``version``, ``updated_at``). La route reçoit
+    ses paramètres validés comme d'habitude ; ils forment la clé du cache.
+
+    Avec ``blocking=True``, la route exposée à FastAPI est une fonction
+    synchrone (exécutée dans le pool de threads de Starlette) qui déroule
+    la coroutine avec ``run_inline`` : le repository doit alors être en
+    mode ``inline``.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        async def respond(request: Request, kwargs: Dict) -> Response:
+            data_version = await get_version()
+            version = data_version['version']
+            key = make_key(func.__name__, kwargs)
+            etag = make_etag(key, version)
+            last_modified = http_date(data_version['updated_at'])
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if last_modified:
+                headers["Last-Modified"] = last_modified
+
+            if not_modified(request.headers, etag, last_modified):
+                return Response(status_code=304, headers=headers)
+
+            body = cache.get(key, version)
+            if body is None:
+                body = JSONResponse(jsonable_encoder(await func(**kwargs))).body
+                cache.set(key, version, body)
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        if blocking:
+            @functools.wraps(func)
+            def wrapper(request: Request, **kwargs):
+                return run_inline(respond(request, kwargs))
+        else:
+            @functools.wraps(func)
+            async def wrapper(request: Request, **kwargs):
+                return await respond(request, kwargs)
+
+        # FastAPI lit la signature : on expose la requête en plus des paramètres
+        parameters = [
+            inspect.Parameter('request', inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+        ] + [p.replace(kind=inspect.Parameter.KEYWORD_ONLY) for p in signature.parameters.values()]
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
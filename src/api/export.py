@@ -0,0 +1,58 @@
+"""Sérialisation en flux (NDJSON, CSV, gzip) pour les endpoints d'export."""
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, List
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def ndjson_chunks(batches: Iterable[List[Dict]]) -> Iterator[bytes]:
+    """Une ligne JSON par enregistrement, un morceau par lot."""
+    for batch in batches:
+        if not batch:
+            continue
+        lines = [json.dumps(row, ensure_ascii=False) for row in batch]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv_text(rows: List[Dict], columns: List[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def csv_chunks(batches: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    """CSV : en-tête tiré de ``columns`` (même sans ligne), puis un morceau par lot."""
+    yield _csv_text([], columns, header=True)
+    for batch in batches:
+        if batch:
+            yield _csv_text(batch, columns)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compresse un flux de morceaux au format gzip."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(
+    batches: Iterable[List[Dict]],
+    fmt: str,
+    columns: List[str],
+    gzip: bool = False
+) -> Iterator[bytes]:
+    """Flux d'octets prêt pour une ``StreamingResponse``."""
+    chunks = csv_chunks(batches, columns) if fmt == "csv" else ndjson_chunks(batches)
+    return gzip_chunks(chunks) if gzip else chunks
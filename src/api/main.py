@@ -1,13 +1,22 @@
 """API REST pour accéder aux données des livres scrapés."""
 from fastapi import FastAPI, HTTPException, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import functools
+import os
 import sys
 from pathlib import Path
 
 # Ajouter le dossier racine au path Python
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from src.api import export
+from src.api.cache import ResponseCache, VersionPoller, cached_route
+from src.database.async_repository import AsyncBookRepository, run_inline
 from src.database.book_repository import BookRepository
+from src.database.pagination import decode_cursor, paginate
 
 # Créer l'application FastAPI
 app = FastAPI(
@@ -16,12 +25,78 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Mode d'exécution des routes (variable d'environnement BOOKS_API_MODE) :
+# - "async" (défaut) : routes async, requêtes SQLite dans un pool de threads dédié
+# - "sync" : chaque route tourne entière dans le pool de threads de Starlette
+#   et interroge SQLite directement (comportement des routes def classiques)
+API_MODE = os.environ.get("BOOKS_API_MODE", "async")
+if API_MODE not in ("async", "sync"):
+    raise ValueError(f"BOOKS_API_MODE invalide: {API_MODE} (async ou sync)")
+SYNC_MODE = API_MODE == "sync"
+
 # Instance unique du repository (Singleton pattern)
-repository = BookRepository()
+repository = AsyncBookRepository(inline=SYNC_MODE)
+# Les routes lisent les tables des dernières migrations (category_stats,
+# metadata, price_summary...) : une base plus ancienne est refusée au
+# démarrage plutôt que de répondre 500 sur chaque route.
+repository.db.check_schema()
+
+# Cache des réponses, vidé dès qu'un crawl publie une nouvelle version des données.
+# La version est relue au plus une fois par BOOKS_API_VERSION_POLL secondes (défaut 1).
+response_cache = ResponseCache(max_entries=1024, ttl=300)
+version_poller = VersionPoller(
+    repository.get_data_version,
+    interval=float(os.environ.get("BOOKS_API_VERSION_POLL", "1.0"))
+)
+cached = cached_route(response_cache, version_poller, blocking=SYNC_MODE)
+
+
+def endpoint(func):
+    """Route non mise en cache : exposée en synchrone en mode ``sync``."""
+    if not SYNC_MODE:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return run_inline(func(*args, **kwargs))
+    return wrapper
+
+
+# Nombre maximum d'IDs ou d'UPC par appel aux routes /batch
+BATCH_MAX_ITEMS = 1000
+
+
+class BookIdsRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="IDs des livres")
+
+
+class UpcsRequest(BaseModel):
+    upcs: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="UPC des livres")
+
+
+def _cursor_id(cursor: Optional[str]) -> Optional[int]:
+    """Décode le paramètre ``cursor`` en ID de reprise (400 si invalide)."""
+    if cursor is None:
+        return None
+    try:
+        return int(decode_cursor(cursor)['id'])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def _search_cursor(cursor: Optional[str]) -> Tuple[Optional[int], Optional[float]]:
+    """Décode le curseur d'une recherche plein texte en (ID, score)."""
+    if cursor is None:
+        return None, None
+    try:
+        key = decode_cursor(cursor)
+        return int(key['id']), float(key['score'])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
 
 
 @app.get("/", tags=["Root"])
-def root():
+async def root():
     """Point d'entrée de l'API."""
     return {
         "message": "Bienvenue sur l'API Books Scraper",
@@ -31,70 +106,102 @@ def root():
             "Détail d'un livre": "/books/{id}",
             "Recherche": "/books/search",
             "Catégories": "/categories",
-            "Statistiques": "/stats"
+            "Statistiques": "/stats",
+            "Distribution des prix": "/stats/distribution"
         }
     }
 
 
 @app.get("/books", tags=["Books"])
-def list_books(
+@cached
+async def list_books(
     limit: int = Query(50, ge=1, le=200, description="Nombre de résultats"),
-    offset: int = Query(0, ge=0, description="Pagination offset")
+    offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente (next_cursor)")
 ):
     """
-    Liste tous les livres avec pagination.
+    Liste tous les livres avec pagination, triés par ID.
     
     - **limit**: Nombre maximum de résultats (1-200)
     - **offset**: Point de départ pour la pagination
+    - **cursor**: Reprend après la page précédente (ignore `offset`) ;
+      `next_cursor` vaut `null` sur la dernière page
     """
-    books = repository.get_all_books(limit=limit, offset=offset)
+    books, next_cursor = paginate(
+        await repository.get_all_books(limit=limit + 1, offset=offset, after_id=_cursor_id(cursor)),
+        limit
+    )
     return {
         "count": len(books),
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
         "books": books
     }
 
 
 @app.get("/books/search", tags=["Books"])
-def search_books(
+@cached
+async def search_books(
     category: Optional[str] = Query(None, description="Filtrer par catégorie"),
     min_price: Optional[float] = Query(None, ge=0, description="Prix minimum"),
     max_price: Optional[float] = Query(None, ge=0, description="Prix maximum"),
     min_rating: Optional[int] = Query(None, ge=0, le=5, description="Note minimum (0-5)"),
-    limit: int = Query(50, ge=1, le=200, description="Nombre de résultats")
+    q: Optional[str] = Query(None, min_length=1, max_length=200, description="Recherche plein texte (titre, description), par préfixe"),
+    limit: int = Query(50, ge=1, le=200, description="Nombre de résultats"),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente (next_cursor)")
 ):
     """
     Recherche de livres avec filtres multiples.
     
     Tous les paramètres sont optionnels et peuvent être combinés.
+    Avec `q`, les résultats sont triés par pertinence (BM25, `score`
+    croissant) et contiennent un `extrait` où les termes trouvés sont
+    entourés de `<mark>`.
     """
-    books = repository.search_books(
-        category=category,
-        min_price=min_price,
-        max_price=max_price,
-        min_rating=min_rating,
-        limit=limit
+    if q is not None:
+        after_id, after_score = _search_cursor(cursor)
+        keys = ('score', 'id')
+    else:
+        after_id, after_score = _cursor_id(cursor), None
+        keys = ('id',)
+
+    books, next_cursor = paginate(
+        await repository.search_books(
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            limit=limit + 1,
+            after_id=after_id,
+            q=q,
+            after_score=after_score
+        ),
+        limit,
+        keys
     )
     
     return {
         "count": len(books),
         "filters": {
+            "q": q,
             "category": category,
             "min_price": min_price,
             "max_price": max_price,
             "min_rating": min_rating
         },
+        "next_cursor": next_cursor,
         "books": books
     }
 
 
 @app.get("/books/{book_id}", tags=["Books"])
-def get_book(book_id: int):
+@cached
+async def get_book(book_id: int):
     """
     Récupère les détails d'un livre spécifique par son ID.
     """
-    book = repository.get_book_by_id(book_id)
+    book = await repository.get_book_by_id(book_id)
     
     if not book:
         raise HTTPException(
@@ -105,29 +212,60 @@ def get_book(book_id: int):
     return book
 
 
+@app.post("/books/batch", tags=["Books"])
+@endpoint
+async def get_books_batch(request: BookIdsRequest):
+    """
+    Récupère plusieurs livres par leurs IDs, en une seule requête SQL.
+
+    Retourne les livres indexés par ID et la liste des IDs introuvables.
+    """
+    books = await repository.get_books_by_ids(request.ids)
+    return {
+        "count": len(books),
+        "books": books,
+        "not_found": [book_id for book_id in dict.fromkeys(request.ids) if book_id not in books]
+    }
+
+
 @app.get("/categories", tags=["Categories"])
-def list_categories():
+@cached
+async def list_categories():
     """
     Liste toutes les catégories disponibles.
     """
-    categories = repository.get_all_categories()
-    top_categories = repository.get_top_categories(limit=10)
+    categories = await repository.get_all_categories()
+    top_categories = await repository.get_top_categories(limit=10)
     
     return {
         "total": len(categories),
         "categories": categories,
-        "top_10": top_categories
+        "top_10": top_categories,
+        "mis_a_jour": await repository.get_stats_freshness()
     }
 
 
 @app.get("/categories/{category}/books", tags=["Categories"])
-def get_books_by_category(category: str):
+@cached
+async def get_books_by_category(
+    category: str,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Nombre de résultats (tous par défaut)"),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente (next_cursor)")
+):
     """
-    Récupère tous les livres d'une catégorie spécifique.
+    Récupère les livres d'une catégorie spécifique, triés par ID.
     """
-    books = repository.get_books_by_category(category)
+    after_id = _cursor_id(cursor)
+    books = await repository.get_books_by_category(
+        category,
+        limit=None if limit is None else limit + 1,
+        after_id=after_id
+    )
+    next_cursor = None
+    if limit is not None:
+        books, next_cursor = paginate(books, limit)
     
-    if not books:
+    if not books and after_id is None:
         raise HTTPException(
             status_code=404,
             detail=f"Aucun livre trouvé pour la catégorie '{category}'"
@@ -136,12 +274,14 @@ def get_books_by_category(category: str):
     return {
         "category": category,
         "count": len(books),
+        "next_cursor": next_cursor,
         "books": books
     }
 
 
 @app.get("/stats", tags=["Statistics"])
-def get_statistics():
+@cached
+async def get_statistics():
     """
     Statistiques globales sur l'ensemble des livres.
     
@@ -149,51 +289,255 @@ def get_statistics():
     - Statistiques générales (total, moyenne, etc.)
     - Prix moyens par catégorie
     - Top catégories
+    - Date de calcul des agrégats (`mis_a_jour`, fin du dernier crawl)
     """
-    global_stats = repository.get_statistics()
-    price_by_category = repository.get_price_stats_by_category()
-    top_cats = repository.get_top_categories(limit=10)
+    global_stats = await repository.get_statistics()
+    price_by_category = await repository.get_price_stats_by_category()
+    top_cats = await repository.get_top_categories(limit=10)
     
     return {
         "global": global_stats,
         "prix_par_categorie": price_by_category,
-        "top_categories": top_cats
+        "top_categories": top_cats,
+        "mis_a_jour": await repository.get_stats_freshness()
     }
 
 
+def _percentiles(text: str) -> Tuple[float, ...]:
+    """Liste ``25,50,75`` → tuple de percentiles entre 0 et 100 (400 si invalide)."""
+    try:
+        values = tuple(float(value) for value in text.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles attend des nombres séparés par des virgules")
+    if len(values) > 20 or any(not 0 <= value <= 100 for value in values):
+        raise HTTPException(status_code=400, detail="percentiles : au plus 20 valeurs entre 0 et 100")
+    return values
+
+
+async def _distribution(call):
+    """Statistiques NumPy : 503 si numpy n'est pas installé."""
+    try:
+        return await call
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/stats/distribution", tags=["Statistics"])
+@cached
+async def get_price_distribution(
+    percentiles: str = Query("25,50,75,90", description="Percentiles séparés par des virgules")
+):
+    """
+    Distribution des prix actuels, globale et par catégorie.
+
+    Nombre de livres, moyenne, écart-type, min, percentiles, médiane, max
+    et prix moyen pondéré par la note. Calcul vectorisé (NumPy) sur des
+    colonnes chargées une fois par version des données.
+    """
+    return await _distribution(repository.get_price_distribution(_percentiles(percentiles)))
+
+
+@app.get("/stats/distribution/histogram", tags=["Statistics"])
+@cached
+async def get_price_histogram(
+    bins: int = Query(20, ge=1, le=200, description="Nombre de classes"),
+    category: Optional[str] = Query(None, description="Catégorie (toutes par défaut)")
+):
+    """
+    Histogramme des prix actuels.
+
+    Les classes couvrent la plage de prix de tout le catalogue, quelle que
+    soit la catégorie : deux histogrammes se comparent classe à classe.
+    """
+    histogram = await _distribution(repository.get_price_histogram(bins, category))
+    if category is not None and histogram["nb_livres"] == 0:
+        raise HTTPException(status_code=404, detail=f"Aucun livre trouvé pour la catégorie '{category}'")
+    return {"category": category, **histogram}
+
+
+@app.get("/stats/distribution/history", tags=["Statistics"])
+@cached
+async def get_price_distribution_history(
+    category: Optional[str] = Query(None, description="Catégorie (toutes par défaut)"),
+    percentiles: str = Query("25,50,75,90", description="Percentiles séparés par des virgules")
+):
+    """
+    Distribution des prix à chaque date de crawl.
+
+    Reconstruit l'état du catalogue à chaque date depuis l'historique des
+    changements : un livre compte à chaque date avec son dernier prix connu.
+    """
+    dates = await _distribution(
+        repository.get_price_distribution_history(category, _percentiles(percentiles))
+    )
+    return {"category": category, "count": len(dates), "dates": dates}
+
+
 @app.get("/history/dates", tags=["History"])
-def get_scraping_dates():
+@cached
+async def get_scraping_dates():
     """Liste toutes les dates de scraping."""
-    dates = repository.get_scraping_dates()
+    dates = await repository.get_scraping_dates()
     return {"count": len(dates), "dates": dates}
 
 
 @app.get("/history/book/{upc}", tags=["History"])
-def get_book_price_evolution(upc: str):
+@cached
+async def get_book_price_evolution(upc: str):
     """Évolution du prix d'un livre dans le temps."""
-    evolution = repository.get_price_evolution(upc)
+    evolution = await repository.get_price_evolution(upc)
     if not evolution:
         raise HTTPException(status_code=404, detail="Aucun historique trouvé pour ce livre")
     return {"upc": upc, "count": len(evolution), "  evolution": evolution}
 
 
+@app.post("/history/batch", tags=["History"])
+@endpoint
+async def get_price_evolutions_batch(request: UpcsRequest):
+    """
+    Évolution du prix de plusieurs livres, en une seule requête SQL.
+
+    Retourne les évolutions indexées par UPC et la liste des UPC sans historique.
+    """
+    evolutions = await repository.get_price_evolutions(request.upcs)
+    return {
+        "count": len(evolutions),
+        "evolutions": evolutions,
+        "not_found": [upc for upc in dict.fromkeys(request.upcs) if upc not in evolutions]
+    }
+
+
+def _price_window(since: Optional[str], between: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Fenêtre ``[début, fin)`` de ``since`` ou ``between`` (400 si invalide).
+
+    Une borne de fin réduite à une date inclut toute la journée.
+    """
+    if since is not None and between is not None:
+        raise HTTPException(status_code=400, detail="since et between sont exclusifs")
+    if between is not None:
+        bounds = between.split(",")
+        if len(bounds) != 2:
+            raise HTTPException(status_code=400, detail="between attend deux dates : DEBUT,FIN")
+        start, end = (bound.strip() for bound in bounds)
+    else:
+        start, end = since, None
+    try:
+        for bound in (start, end):
+            if bound is not None:
+                datetime.fromisoformat(bound)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (format ISO 8601 attendu)")
+    if end is not None and len(end) == 10:
+        end = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+    return start, end
+
+
 @app.get("/history/price-changes", tags=["History"])
-def get_price_changes(min_variation: float = Query(5.0, description="Variation minimale en £")):
-    """Livres avec variation de prix significative entre scrapings."""
-    changes = repository.get_price_changes(min_variation)
+@cached
+async def get_price_changes(
+    min_variation: float = Query(5.0, ge=0, description="Variation minimale en £"),
+    min_percent: Optional[float] = Query(None, ge=0, description="Variation minimale en %"),
+    since: Optional[str] = Query(None, description="Dernier changement à partir de cette date (ISO 8601)"),
+    between: Optional[str] = Query(None, description="Dernier changement entre deux dates : DEBUT,FIN"),
+    sort: str = Query("variation", pattern="^(variation|percent|date|changes)$",
+                      description="variation, percent, date ou changes"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="asc ou desc"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Nombre maximum de livres")
+):
+    """
+    Livres avec variation de prix significative entre scrapings.
+
+    Lit le résumé par livre `price_summary`, mis à jour en fin de crawl.
+    Sans fenêtre, les seuils portent sur l'amplitude historique
+    (max - min) ; avec `since` ou `between`, sur le dernier changement,
+    s'il a eu lieu dans la fenêtre (`derniere_variation` donne son sens).
+    """
+    start, end = _price_window(since, between)
+    changes = await repository.get_price_changes(
+        min_variation, min_percent, start, end, sort, order == "desc", limit
+    )
     return {"count": len(changes), "changes": changes}
 
 
+# Lignes lues par lot pendant un export
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_response(batches, fmt: str, gzip: bool, name: str, columns: List[str]) -> StreamingResponse:
+    """Réponse en flux : les lignes sont envoyées au fil de la lecture."""
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.stream(batches, fmt, columns, gzip=gzip),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers=headers
+    )
+
+
+@app.get("/export/books", tags=["Export"])
+@endpoint
+async def export_books(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Compresser la réponse (Content-Encoding: gzip)"),
+    category: Optional[str] = Query(None, description="Filtrer par catégorie"),
+    min_price: Optional[float] = Query(None, ge=0, description="Prix minimum"),
+    max_price: Optional[float] = Query(None, ge=0, description="Prix maximum"),
+    min_rating: Optional[int] = Query(None, ge=0, le=5, description="Note minimum (0-5)")
+):
+    """
+    Export complet des livres en flux NDJSON ou CSV.
+    
+    Mêmes filtres que `/books/search`, sans limite : la base est lue par
+    lots et la mémoire reste constante quelle que soit la taille du catalogue.
+    """
+    batches = repository.iter_books(
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        batch_size=EXPORT_BATCH_SIZE
+    )
+    return _export_response(batches, fmt, gzip, "books", BookRepository.BOOK_EXPORT_COLUMNS)
+
+
+@app.get("/export/history", tags=["Export"])
+@endpoint
+async def export_history(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    gzip: bool = Query(False, description="Compresser la réponse (Content-Encoding: gzip)"),
+    category: Optional[str] = Query(None, description="Filtrer par catégorie"),
+    min_price: Optional[float] = Query(None, ge=0, description="Prix minimum"),
+    max_price: Optional[float] = Query(None, ge=0, description="Prix maximum"),
+    min_rating: Optional[int] = Query(None, ge=0, le=5, description="Note minimum (0-5)")
+):
+    """Export de l'historique de scraping en flux NDJSON ou CSV."""
+    batches = repository.iter_history(
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        batch_size=EXPORT_BATCH_SIZE
+    )
+    return _export_response(
+        batches, fmt, gzip, "scraping_history", BookRepository.HISTORY_EXPORT_COLUMNS
+    )
+
+
 @app.get("/health", tags=["Health"])
-def health_check():
+@endpoint
+async def health_check():
     """Endpoint pour vérifier que l'API fonctionne."""
     try:
         # Test de connexion à la base
-        stats = repository.get_statistics()
+        stats = await repository.get_statistics()
         return {
             "status": "healthy",
             "database": "connected",
-            "total_books": stats['total_livres']
+            "total_books": stats['total_livres'],
+            "mode": API_MODE,
+            "pool": repository.db.pool_metrics(),
+            "cache": {**response_cache.stats(), "version_polls": version_poller.stats()}
         }
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,63 @@
+"""Agrégats matérialisés par catégorie.
+
+La table ``category_stats`` résume ``books`` (une ligne par catégorie) :
+les endpoints de statistiques lisent ce résumé en O(catégories) au lieu
+d'agréger tout le catalogue à chaque requête.
+
+La mise à jour est incrémentale : des triggers sur ``books`` (migration 9)
+notent dans ``category_stats_pending`` chaque catégorie dont un livre a
+été ajouté, supprimé ou a changé de prix, de note, de disponibilité ou de
+catégorie. En fin de crawl, seules ces catégories sont recalculées.
+"""
+import sqlite3
+from datetime import datetime
+from typing import Optional
+
+
+def refresh_category_stats(conn: sqlite3.Connection) -> int:
+    """Recalcule les catégories modifiées depuis le dernier appel (une transaction).
+
+    Retourne le nombre de catégories recalculées ; une catégorie qui n'a
+    plus de livre disparaît de ``category_stats``.
+    """
+    with conn:
+        pending = [row[0] for row in conn.execute("SELECT category FROM category_stats_pending")]
+        if not pending:
+            return 0
+        # « IS » plutôt que « IN » : la catégorie NULL est comprise
+        conn.execute("""
+            DELETE FROM category_stats
+            WHERE EXISTS (
+                SELECT 1 FROM category_stats_pending p WHERE p.category IS category_stats.category
+            )
+        """)
+        updated_at = datetime.now().isoformat()
+        for category in pending:
+            # Une requête par catégorie : l'index (category) limite la lecture à ses livres
+            conn.execute("""
+                INSERT INTO category_stats
+                (category, nb_livres, nb_prix, prix_total, prix_min, prix_max,
+                 nb_notes, notes_total, stock_total, updated_at)
+                SELECT
+                    category,
+                    COUNT(*),
+                    COUNT(prix),
+                    TOTAL(prix),
+                    MIN(prix),
+                    MAX(prix),
+                    COUNT(notation),
+                    TOTAL(notation),
+                    TOTAL(disponibilite),
+                    ?
+                FROM books
+                WHERE category IS ?
+                GROUP BY category
+            """, (updated_at, category))
+        conn.execute("DELETE FROM category_stats_pending")
+    return len(pending)
+
+
+def get_refreshed_at(conn: sqlite3.Connection) -> Optional[str]:
+    """Date du dernier recalcul (None si jamais calculée)."""
+    row = conn.execute("SELECT MAX(updated_at) FROM category_stats").fetchone()
+    return row[0]
@@ -0,0 +1,190 @@
+"""Repository asynchrone : mêmes méthodes que ``BookRepository``, awaitables.
+
+``sqlite3`` est bloquant ; chaque appel est donc exécuté dans un pool de
+threads dédié, dimensionné comme le pool de connexions. Les routes
+``async def`` attendent le résultat sans bloquer la boucle d'événements :
+une requête en attente ne coûte qu'une coroutine, et non plus un thread, et un
+worker uvicorn n'est plus limité par le pool de threads de Starlette.
+
+Avec ``inline=True``, les méthodes s'exécutent directement dans le thread
+appelant, sans jamais suspendre la coroutine : c'est le mode synchrone de
+l'API, où le gestionnaire complet tourne déjà dans un thread (voir
+``run_inline``).
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from .book_repository import BookRepository
+from .price_stats import DEFAULT_PERCENTILES
+
+T = TypeVar('T')
+
+
+def run_inline(awaitable: Awaitable[T]) -> T:
+    """Exécute jusqu'au bout une coroutine qui ne se suspend jamais.
+
+    Permet d'appeler le code ``async`` de l'API depuis un thread, quand le
+    repository est en mode ``inline``. Lève ``RuntimeError`` si la coroutine
+    attend réellement quelque chose (elle aurait besoin d'une boucle).
+    """
+    coroutine = awaitable.__await__()
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("La coroutine s'est suspendue : impossible de l'exécuter hors boucle")
+
+
+class AsyncBookRepository:
+    """Variante asynchrone de ``BookRepository``."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        migrate: bool = False,
+        max_workers: Optional[int] = None,
+        inline: bool = False,
+        repository: Optional[BookRepository] = None
+    ):
+        self.repository = repository or BookRepository(db_path, migrate=migrate)
+        self.db = self.repository.db
+        self.inline = inline
+        # Un thread par connexion du pool : un appel lancé n'attend jamais de connexion
+        self.max_workers = max_workers or self.db.pool.max_size
+        self._executor = None if inline else ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="sqlite-read"
+        )
+
+    async def _run(self, method, *args, **kwargs):
+        if self._executor is None:
+            return method(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def get_all_books(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        after_id: Optional[int] = None
+    ) -> List[Dict]:
+        return await self._run(self.repository.get_all_books, limit, offset, after_id)
+
+    async def get_book_by_id(self, book_id: int) -> Optional[Dict]:
+        return await self._run(self.repository.get_book_by_id, book_id)
+
+    async def get_books_by_ids(self, book_ids: List[int]) -> Dict[int, Dict]:
+        return await self._run(self.repository.get_books_by_ids, book_ids)
+
+    async def get_books_by_category(
+        self,
+        category: str,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict]:
+        return await self._run(self.repository.get_books_by_category, category, limit, after_id)
+
+    async def search_books(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        q: Optional[str] = None,
+        after_score: Optional[float] = None
+    ) -> List[Dict]:
+        return await self._run(
+            self.repository.search_books,
+            category, min_price, max_price, min_rating, limit, after_id, q, after_score
+        )
+
+    def iter_books(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """Itérateur synchrone et paresseux, comme ``BookRepository.iter_books``.
+
+        ``StreamingResponse`` consomme les itérateurs synchrones dans son
+        pool de threads : aucune lecture n'a lieu sur la boucle d'événements.
+        """
+        return self.repository.iter_books(category, min_price, max_price, min_rating, batch_size)
+
+    def iter_history(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """Itérateur synchrone et paresseux (voir ``iter_books``)."""
+        return self.repository.iter_history(category, min_price, max_price, min_rating, batch_size)
+
+    async def get_statistics(self) -> Dict:
+        return await self._run(self.repository.get_statistics)
+
+    async def get_price_stats_by_category(self) -> List[Dict]:
+        return await self._run(self.repository.get_price_stats_by_category)
+
+    async def get_top_categories(self, limit: int = 10) -> List[Dict]:
+        return await self._run(self.repository.get_top_categories, limit)
+
+    async def get_all_categories(self) -> List[str]:
+        return await self._run(self.repository.get_all_categories)
+
+    async def get_price_distribution(self, percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES) -> Dict:
+        return await self._run(self.repository.get_price_distribution, percentiles)
+
+    async def get_price_histogram(self, bins: int = 20, category: Optional[str] = None) -> Dict:
+        return await self._run(self.repository.get_price_histogram, bins, category)
+
+    async def get_price_distribution_history(
+        self,
+        category: Optional[str] = None,
+        percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> List[Dict]:
+        return await self._run(self.repository.get_price_distribution_history, category, percentiles)
+
+    async def get_stats_freshness(self) -> Optional[str]:
+        return await self._run(self.repository.get_stats_freshness)
+
+    async def get_data_version(self) -> Dict:
+        return await self._run(self.repository.get_data_version)
+
+    async def get_price_evolution(self, upc: str) -> List[Dict]:
+        return await self._run(self.repository.get_price_evolution, upc)
+
+    async def get_price_evolutions(self, upcs: List[str]) -> Dict[str, List[Dict]]:
+        return await self._run(self.repository.get_price_evolutions, upcs)
+
+    async def get_price_changes(
+        self,
+        min_variation: float = 5.0,
+        min_percent: Optional[float] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        sort: str = 'variation',
+        descending: bool = True,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        return await self._run(
+            self.repository.get_price_changes,
+            min_variation, min_percent, since, until, sort, descending, limit
+        )
+
+    async def get_scraping_dates(self) -> List[str]:
+        return await self._run(self.repository.get_scraping_dates)
+
+    def close(self):
+        """Arrête le pool de threads (les appels en cours se terminent)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -1,189 +1,463 @@
 """Repository pour gérer les opérations sur les livres."""
-from typing import List, Optional, Dict
+import json
+from typing import Iterator, List, Optional, Dict, Tuple
+from .aggregates import get_refreshed_at
 from .connection import DatabaseConnection
+from .data_version import get_data_version
+from .fulltext import DESCRIPTION_WEIGHT, TITLE_WEIGHT, fts_query
+from .price_stats import DEFAULT_PERCENTILES, PriceStatsEngine
 
 
 class BookRepository:
     """Classe pour accéder aux données des livres."""
-    
-    def __init__(self):
-        self.db = DatabaseConnection()
-    
-    def get_all_books(self, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Récupère tous les livres avec pagination."""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
-            "SELECT * FROM books LIMIT ? OFFSET ?",
-            (limit, offset)
-        )
-        books = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return books
-    
+
+    # Colonnes des exports, dans l'ordre (en-tête CSV connu même sans ligne)
+    BOOK_EXPORT_COLUMNS = [
+        'id', 'titre', 'prix', 'notation', 'disponibilite', 'description',
+        'upc', 'category', 'url', 'image', 'date_scraping',
+    ]
+    HISTORY_EXPORT_COLUMNS = [
+        'id', 'upc', 'titre', 'prix', 'notation', 'disponibilite', 'category', 'date_scraping', 'run_id',
+    ]
+
+    def __init__(self, db_path: Optional[str] = None, migrate: bool = False):
+        self.db = DatabaseConnection(db_path, migrate=migrate)
+        self.price_stats = PriceStatsEngine(self.db)
+
+    def get_all_books(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        after_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Récupère tous les livres, triés par ID.
+
+        ``after_id`` (pagination par clé) reprend après le dernier ID déjà
+        lu et ignore ``offset`` ; le coût ne dépend plus de la profondeur.
+        """
+        with self.db.connection() as conn:
+            if after_id is not None:
+                cursor = conn.execute(
+                    "SELECT * FROM books WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, limit)
+                )
+            else:
+                cursor = conn.execute(
+                    "SELECT * FROM books ORDER BY id LIMIT ? OFFSET ?",
+                    (limit, offset)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_book_by_id(self, book_id: int) -> Optional[Dict]:
         """Récupère un livre par son ID."""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
-            "SELECT * FROM books WHERE id = ?",
-            (book_id,)
-        )
-        book = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.execute(
+                "SELECT * FROM books WHERE id = ?",
+                (book_id,)
+            )
+            book = cursor.fetchone()
         return dict(book) if book else None
-    
-    def get_books_by_category(self, category: str) -> List[Dict]:
-        """Récupère les livres d'une catégorie."""
-        conn = self.db.get_connection()
-        cursor = conn.execute(
-            "SELECT * FROM books WHERE category = ?",
-            (category,)
-        )
-        books = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return books
-    
-    def search_books(
+
+    def get_books_by_ids(self, book_ids: List[int]) -> Dict[int, Dict]:
+        """Récupère plusieurs livres en une requête, indexés par ID.
+
+        Les IDs sont passés en un seul paramètre JSON (``json_each``) : une
+        seule requête préparée, quel que soit leur nombre. Les IDs absents
+        de la base n'apparaissent pas dans le résultat.
+        """
+        if not book_ids:
+            return {}
+        with self.db.connection() as conn:
+            cursor = conn.execute(
+                "SELECT b.* FROM json_each(?) AS j JOIN books b ON b.id = j.value",
+                (json.dumps(list(dict.fromkeys(book_ids))),)
+            )
+            return {row['id']: dict(row) for row in cursor.fetchall()}
+
+    def get_books_by_category(
         self,
+        category: str,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Récupère les livres d'une catégorie, triés par ID."""
+        query = "SELECT * FROM books WHERE category = ?"
+        params: List = [category]
+
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+
+        query += " ORDER BY id LIMIT ?"
+        params.append(-1 if limit is None else limit)
+
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _search_filters(
         category: Optional[str] = None,
         min_price: Optional[float] = None,
         max_price: Optional[float] = None,
-        min_rating: Optional[int] = None,
-        limit: int = 100
-    ) -> List[Dict]:
-        """Recherche de livres avec filtres."""
-        conn = self.db.get_connection()
-        
-        query = "SELECT * FROM books WHERE 1=1"
-        params = []
-        
+        min_rating: Optional[int] = None
+    ) -> Tuple[str, List]:
+        """Clause WHERE (et paramètres) commune à la recherche et à l'export."""
+        clause = "1=1"
+        params: List = []
+
         if category:
-            query += " AND category = ?"
+            clause += " AND category = ?"
             params.append(category)
-        
+
         if min_price is not None:
-            query += " AND prix >= ?"
+            clause += " AND prix >= ?"
             params.append(min_price)
-        
+
         if max_price is not None:
-            query += " AND prix <= ?"
+            clause += " AND prix <= ?"
             params.append(max_price)
-        
+
         if min_rating is not None:
-            query += " AND notation >= ?"
+            clause += " AND notation >= ?"
             params.append(min_rating)
-        
-        query += f" LIMIT {limit}"
-        
-        cursor = conn.execute(query, params)
-        books = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return books
-    
+
+        return clause, params
+
+    def search_books(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        q: Optional[str] = None,
+        after_score: Optional[float] = None
+    ) -> List[Dict]:
+        """Recherche de livres avec filtres, triés par ID.
+
+        Avec ``q`` (recherche plein texte sur titre et description), les
+        résultats sont triés par pertinence BM25 (``score``, plus petit =
+        plus pertinent) puis par ID, et portent un ``extrait`` surligné.
+        La pagination reprend alors après le couple (``after_score``,
+        ``after_id``).
+        """
+        if q is not None:
+            return self._search_fulltext(
+                q, category, min_price, max_price, min_rating, limit, after_id, after_score
+            )
+
+        clause, params = self._search_filters(category, min_price, max_price, min_rating)
+        query = f"SELECT * FROM books WHERE {clause}"
+
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+
+        # LIMIT paramétré : le texte SQL reste identique d'un appel à l'autre
+        # et la requête préparée est réutilisée par la connexion.
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def _search_fulltext(
+        self,
+        q: str,
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        min_rating: Optional[int],
+        limit: int,
+        after_id: Optional[int],
+        after_score: Optional[float]
+    ) -> List[Dict]:
+        match = fts_query(q)
+        if match is None:
+            return []
+
+        clause, filter_params = self._search_filters(category, min_price, max_price, min_rating)
+        query = f"""
+            SELECT * FROM (
+                SELECT
+                    b.*,
+                    bm25(books_fts, ?, ?) AS score,
+                    snippet(books_fts, -1, '<mark>', '</mark>', '…', 16) AS extrait
+                FROM books_fts
+                JOIN books b ON b.id = books_fts.rowid
+                WHERE books_fts MATCH ? AND {clause}
+            )
+        """
+        params: List = [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match] + filter_params
+
+        if after_id is not None and after_score is not None:
+            query += " WHERE score > ? OR (score = ? AND id > ?)"
+            params.extend([after_score, after_score, after_id])
+
+        query += " ORDER BY score, id LIMIT ?"
+        params.append(limit)
+
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def iter_books(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """Parcourt les livres filtrés par lots de ``batch_size`` (export).
+
+        Chaque lot est une requête par clé (``id > dernier ID``) sur une
+        connexion empruntée le temps de ce lot seulement : un client lent
+        ou abandonné ne bloque pas le pool. La mémoire ne dépend que de
+        ``batch_size`` ; une écriture concurrente peut apparaître entre
+        deux lots.
+        """
+        clause, params = self._search_filters(category, min_price, max_price, min_rating)
+        columns = ", ".join(self.BOOK_EXPORT_COLUMNS)
+        query = f"SELECT {columns} FROM books WHERE {clause} AND id > ? ORDER BY id LIMIT ?"
+        return self._iter_batches(query, params, batch_size)
+
+    def iter_history(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """Parcourt l'historique de scraping filtré par lots (export)."""
+        clause, params = self._search_filters(category, min_price, max_price, min_rating)
+        columns = ", ".join(self.HISTORY_EXPORT_COLUMNS)
+        query = f"SELECT {columns} FROM scraping_history WHERE {clause} AND id > ? ORDER BY id LIMIT ?"
+        return self._iter_batches(query, params, batch_size)
+
+    def _iter_batches(self, query: str, params: List, batch_size: int) -> Iterator[List[Dict]]:
+        """Lots de ``query`` (paramètres finaux : dernier ID lu, taille du lot)."""
+        last_id = -1
+        while True:
+            with self.db.connection() as conn:
+                rows = [dict(row) for row in conn.execute(query, [*params, last_id, batch_size])]
+            if not rows:
+                break
+            yield rows
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]['id']
+
     def get_statistics(self) -> Dict:
-        """Calcule les statistiques globales."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT 
-                COUNT(*) as total_livres,
-                COUNT(DISTINCT category) as nb_categories,
-                ROUND(AVG(prix), 2) as prix_moyen,
-                ROUND(AVG(notation), 2) as note_moyenne,
-                SUM(disponibilite) as stock_total
-            FROM books
-        """)
-        stats = dict(cursor.fetchone())
-        conn.close()
-        return stats
-    
+        """Calcule les statistiques globales (depuis les agrégats par catégorie)."""
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    COALESCE(SUM(nb_livres), 0) as total_livres,
+                    COUNT(category) as nb_categories,
+                    ROUND(SUM(prix_total) / SUM(nb_prix), 2) as prix_moyen,
+                    ROUND(SUM(notes_total) / SUM(nb_notes), 2) as note_moyenne,
+                    SUM(stock_total) as stock_total
+                FROM category_stats
+            """)
+            return dict(cursor.fetchone())
+
     def get_price_stats_by_category(self) -> List[Dict]:
         """Prix moyen, min, max par catégorie."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT 
-                category,
-                COUNT(*) as nb_livres,
-                ROUND(AVG(prix), 2) as prix_moyen,
-                ROUND(MIN(prix), 2) as prix_min,
-                ROUND(MAX(prix), 2) as prix_max
-            FROM books
-            WHERE category IS NOT NULL
-            GROUP BY category
-            ORDER BY prix_moyen DESC
-        """)
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
-    
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    category,
+                    nb_livres,
+                    ROUND(prix_total / nb_prix, 2) as prix_moyen,
+                    ROUND(prix_min, 2) as prix_min,
+                    ROUND(prix_max, 2) as prix_max
+                FROM category_stats
+                WHERE category IS NOT NULL
+                ORDER BY prix_moyen DESC
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_top_categories(self, limit: int = 10) -> List[Dict]:
         """Top catégories avec le plus de livres."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT 
-                category,
-                COUNT(*) as nb_livres
-            FROM books
-            WHERE category IS NOT NULL
-            GROUP BY category
-            ORDER BY nb_livres DESC
-            LIMIT ?
-        """, (limit,))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
-    
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT
+                    category,
+                    nb_livres
+                FROM category_stats
+                WHERE category IS NOT NULL
+                ORDER BY nb_livres DESC
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_all_categories(self) -> List[str]:
         """Liste toutes les catégories."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT DISTINCT category 
-            FROM books 
-            WHERE category IS NOT NULL
-            ORDER BY category
-        """)
-        categories = [row['category'] for row in cursor.fetchall()]
-        conn.close()
-        return categories
-    
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT category
+                FROM category_stats
+                WHERE category IS NOT NULL
+                ORDER BY category
+            """)
+            return [row['category'] for row in cursor.fetchall()]
+
+    def get_price_distribution(self, percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES) -> Dict:
+        """Médiane, percentiles, écart-type et moyenne pondérée par la note, global et par catégorie.
+
+        Calcul NumPy sur les colonnes en mémoire (voir ``price_stats.py``) ;
+        lève ``ValueError`` sans numpy.
+        """
+        return self.price_stats.distribution(percentiles)
+
+    def get_price_histogram(self, bins: int = 20, category: Optional[str] = None) -> Dict:
+        """Histogramme des prix actuels (classes communes à toutes les catégories)."""
+        return self.price_stats.histogram(bins, category)
+
+    def get_price_distribution_history(
+        self,
+        category: Optional[str] = None,
+        percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> List[Dict]:
+        """Distribution des prix à chaque date de crawl, depuis l'historique."""
+        return self.price_stats.history(category, percentiles)
+
+    def get_stats_freshness(self) -> Optional[str]:
+        """Date de calcul des agrégats utilisés par les statistiques."""
+        with self.db.connection() as conn:
+            return get_refreshed_at(conn)
+
+    def get_data_version(self) -> Dict:
+        """Version des données (incrémentée à chaque fin de crawl)."""
+        with self.db.connection() as conn:
+            return get_data_version(conn)
+
     def get_price_evolution(self, upc: str) -> List[Dict]:
-        """Évolution du prix d'un livre dans le temps."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT titre, prix, date_scraping
-            FROM scraping_history
-            WHERE upc = ?
-            ORDER BY date_scraping ASC
-        """, (upc,))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
-
-    def get_price_changes(self, min_variation: float = 5.0) -> List[Dict]:
-        """Livres dont le prix a varié significativement."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT 
-                h1.upc,
-                h1.titre,
-                MIN(h1.prix) as prix_min,
-                MAX(h1.prix) as prix_max,
-                MAX(h1.prix) - MIN(h1.prix) as variation
-            FROM scraping_history h1
-            GROUP BY h1.upc, h1.titre
-            HAVING variation >= ?
-            ORDER BY variation DESC
-        """, (min_variation,))
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return results
+        """Évolution du prix d'un livre dans le temps.
+
+        Une entrée par changement de prix, de note ou de disponibilité,
+        datée de sa première observation.
+        """
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT titre, prix, date_scraping
+                FROM scraping_history
+                WHERE upc = ?
+                ORDER BY date_scraping ASC
+            """, (upc,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_price_evolutions(self, upcs: List[str]) -> Dict[str, List[Dict]]:
+        """Évolution du prix de plusieurs livres en une requête, indexée par UPC.
+
+        Même contenu que ``get_price_evolution`` pour chaque UPC ; les UPC
+        sans historique n'apparaissent pas dans le résultat.
+        """
+        if not upcs:
+            return {}
+        evolutions: Dict[str, List[Dict]] = {}
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT h.upc, h.titre, h.prix, h.date_scraping
+                FROM json_each(?) AS j
+                JOIN scraping_history h ON h.upc = j.value
+                ORDER BY h.upc, h.date_scraping ASC
+            """, (json.dumps(list(dict.fromkeys(upcs))),))
+            for upc, titre, prix, date_scraping in cursor.fetchall():
+                evolutions.setdefault(upc, []).append(
+                    {'titre': titre, 'prix': prix, 'date_scraping': date_scraping}
+                )
+        return evolutions
+
+    PRICE_CHANGE_SORTS = ('variation', 'percent', 'date', 'changes')
+
+    def get_price_changes(
+        self,
+        min_variation: float = 5.0,
+        min_percent: Optional[float] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        sort: str = 'variation',
+        descending: bool = True,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Livres dont le prix a varié significativement (depuis ``price_summary``).
+
+        Sans fenêtre, les seuils portent sur l'amplitude historique
+        (``prix_max - prix_min``, en £ et en % du minimum). Avec ``since``
+        et/ou ``until`` (dates ISO, ``until`` exclue), seuls les livres dont
+        le dernier changement tombe dans la fenêtre sont retenus, et les
+        seuils portent sur ce dernier changement (en valeur absolue, en £ et
+        en % du prix précédent). ``sort`` : ``variation``, ``percent``,
+        ``date`` (dernier changement) ou ``changes`` (nombre de changements).
+        """
+        if sort not in self.PRICE_CHANGE_SORTS:
+            raise ValueError(f"Tri inconnu: {sort} ({', '.join(self.PRICE_CHANGE_SORTS)})")
+
+        windowed = since is not None or until is not None
+        if windowed:
+            variation = "ABS(prix_actuel - prix_precedent)"
+            percent = f"{variation} * 100.0 / prix_precedent"
+        else:
+            variation = "prix_max - prix_min"
+            percent = f"({variation}) * 100.0 / prix_min"
+
+        conditions = [f"{variation} >= ?"]
+        params: List = [min_variation]
+        if min_percent is not None:
+            conditions.append(f"{percent} >= ?")
+            params.append(min_percent)
+        if since is not None:
+            conditions.append("dernier_changement >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("dernier_changement < ?")
+            params.append(until)
+
+        order_by = {
+            'variation': variation,
+            'percent': percent,
+            'date': "dernier_changement",
+            'changes': "nb_changements",
+        }[sort]
+        direction = "DESC" if descending else "ASC"
+        query = f"""
+            SELECT
+                upc,
+                titre,
+                category,
+                prix_min,
+                prix_max,
+                prix_max - prix_min as variation,
+                prix_actuel,
+                prix_precedent,
+                prix_actuel - prix_precedent as derniere_variation,
+                ROUND((prix_actuel - prix_precedent) * 100.0 / prix_precedent, 2) as derniere_variation_pct,
+                nb_changements,
+                dernier_changement
+            FROM price_summary
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order_by} {direction}, upc
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self.db.connection() as conn:
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
 
     def get_scraping_dates(self) -> List[str]:
-        """Liste toutes les dates de scraping."""
-        conn = self.db.get_connection()
-        cursor = conn.execute("""
-            SELECT DISTINCT date_scraping
-            FROM scraping_history
-            ORDER BY date_scraping DESC
-        """)
-        dates = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return dates
\ No newline at end of file
+        """Liste les dates de scraping (début de chaque crawl, du plus récent au plus ancien)."""
+        with self.db.connection() as conn:
+            cursor = conn.execute("""
+                SELECT DISTINCT started_at
+                FROM crawl_runs
+                ORDER BY started_at DESC
+            """)
+            return [row[0] for row in cursor.fetchall()]
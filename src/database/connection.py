@@ -1,21 +1,160 @@
-"""Gestion de la connexion à la base de données."""
+"""Gestion de la connexion à la base de données.
+
+Base par défaut : variable d'environnement ``BOOKS_DB_PATH`` si elle est
+définie, sinon ``data/books.db`` à la racine du projet.
+"""
+import os
+import queue
 import sqlite3
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
 from pathlib import Path
 
+from .migrations import LATEST_VERSION, SchemaOutdatedError, apply_migrations, read_schema_version
+
+
+class ConnectionPool:
+    """Pool de connexions SQLite en lecture seule, partagé entre threads.
+
+    Les connexions sont ouvertes à la demande (au plus ``max_size``), les
+    PRAGMA sont appliqués une seule fois à l'ouverture, et chaque connexion
+    garde son cache de requêtes préparées d'un emprunt à l'autre.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 256 * 1024 * 1024,
+        cached_statements: int = 256
+    ):
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._hits = 0
+        self._waits = 0
+        self._acquired = 0
+
+    def _open(self) -> sqlite3.Connection:
+        """Ouvre une nouvelle connexion configurée pour la lecture."""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Emprunte une connexion (réutilisée, ouverte ou attendue)."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+
+        with self._lock:
+            self._acquired += 1
+            if conn is not None:
+                self._hits += 1
+                return conn
+            can_open = self._opened < self.max_size
+            if can_open:
+                self._opened += 1
+            else:
+                self._waits += 1
+
+        if can_open:
+            try:
+                return self._open()
+            except sqlite3.Error:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"Aucune connexion disponible après {self.timeout}s "
+                f"(pool de {self.max_size} connexions)"
+            )
+
+    def release(self, conn: sqlite3.Connection):
+        """Rend une connexion au pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Emprunte une connexion le temps d'un bloc ``with``."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def metrics(self) -> Dict:
+        """Compteurs d'utilisation du pool."""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "opened": self._opened,
+                "idle": self._idle.qsize(),
+                "acquired": self._acquired,
+                "hits": self._hits,
+                "waits": self._waits
+            }
+
+    def close(self):
+        """Ferme les connexions inactives."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
 
 class DatabaseConnection:
-    """Classe pour gérer la connexion SQLite."""
-    
-    def __init__(self, db_path: Optional[str] = None):
+    """Classe pour gérer la connexion SQLite.
+
+    Les lectures ne modifient jamais le schéma : les migrations sont
+    appliquées par le pipeline SQLite à l'ouverture du crawl, ou par
+    ``python -m src.database.migrations``. ``migrate=True`` les applique
+    aussi à la construction (outils et benchmarks) ; ``check_schema``
+    refuse une base restée à une version antérieure (API).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, pool_size: int = 8, migrate: bool = False):
+        if db_path is None:
+            db_path = os.environ.get('BOOKS_DB_PATH')
         if db_path is None:
             # Remonte à la racine du projet
             project_root = Path(__file__).parent.parent.parent
             db_path = str(project_root / 'data' / 'books.db')
-        
+
         self.db_path = db_path
         self._ensure_db_exists()
-    
+        if migrate:
+            self._migrate()
+        self.pool = ConnectionPool(self.db_path, max_size=pool_size)
+
     def _ensure_db_exists(self):
         """Vérifie que la base existe."""
         if not Path(self.db_path).exists():
@@ -23,9 +162,40 @@ class DatabaseConnection:
                 f"Base de données introuvable: {self.db_path}\n"
                 "Lancez d'abord le scraper pour créer la base."
             )
-    
+
+    def _migrate(self):
+        """Met le schéma à jour (index, tables dérivées) ; sur demande uniquement."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
+
+    def schema_version(self) -> int:
+        """Version du schéma de la base (lecture seule)."""
+        with self.pool.connection() as conn:
+            return read_schema_version(conn)
+
+    def check_schema(self):
+        """Lève ``SchemaOutdatedError`` si des migrations restent à appliquer."""
+        version = self.schema_version()
+        if version < LATEST_VERSION:
+            raise SchemaOutdatedError(
+                f"Schéma de {self.db_path} en version {version}, version {LATEST_VERSION} attendue : "
+                f"lancez les migrations (python -m src.database.migrations {self.db_path}) "
+                "ou un crawl, qui les applique à l'ouverture."
+            )
+
     def get_connection(self):
-        """Retourne une connexion à la base."""
+        """Retourne une nouvelle connexion à la base (à fermer par l'appelant)."""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
-        return conn
\ No newline at end of file
+        return conn
+
+    def connection(self):
+        """Context manager : connexion en lecture seule empruntée au pool."""
+        return self.pool.connection()
+
+    def pool_metrics(self) -> Dict:
+        """Compteurs du pool de connexions."""
+        return self.pool.metrics()
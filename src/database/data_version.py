@@ -0,0 +1,34 @@
+"""Version des données, incrémentée à chaque fin de crawl.
+
+Les données de ``books.db`` ne changent qu'au passage du scraper : un
+compteur stocké dans la table ``metadata`` suffit aux lecteurs (cache de
+l'API, ETag) pour savoir si ce qu'ils ont déjà calculé est encore valable.
+"""
+import sqlite3
+from datetime import datetime
+from typing import Dict
+
+
+def bump_data_version(conn: sqlite3.Connection) -> int:
+    """Incrémente la version des données et retourne la nouvelle valeur."""
+    with conn:
+        conn.execute("""
+            UPDATE metadata SET value = CAST(value AS INTEGER) + 1
+            WHERE key = 'data_version'
+        """)
+        conn.execute(
+            "UPDATE metadata SET value = ? WHERE key = 'data_updated_at'",
+            (datetime.now().isoformat(),)
+        )
+    return get_data_version(conn)['version']
+
+
+def get_data_version(conn: sqlite3.Connection) -> Dict:
+    """Version courante des données et date de la dernière modification."""
+    rows = dict(conn.execute(
+        "SELECT key, value FROM metadata WHERE key IN ('data_version', 'data_updated_at')"
+    ).fetchall())
+    return {
+        "version": int(rows.get('data_version') or 0),
+        "updated_at": rows.get('data_updated_at')
+    }
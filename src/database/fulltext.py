@@ -0,0 +1,29 @@
+"""Recherche plein texte (FTS5) sur le titre et la description des livres.
+
+Le texte saisi par l'utilisateur n'est jamais passé tel quel à ``MATCH`` :
+la syntaxe FTS5 (guillemets, ``AND``/``OR``, ``*``, ``:``...) lèverait une
+erreur de syntaxe. Chaque mot devient un terme entre guillemets avec
+recherche par préfixe, et tous les termes doivent être présents.
+"""
+import re
+from typing import Optional
+
+# Poids BM25 par colonne (titre, description) : un mot du titre compte plus
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: Optional[str]) -> Optional[str]:
+    """Convertit une saisie libre en requête FTS5 sûre, par préfixe.
+
+    ``"harry pot"`` devient ``"harry"* "pot"*``. Retourne ``None`` si la
+    saisie ne contient aucun mot.
+    """
+    if not text:
+        return None
+    words = _WORD.findall(text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
@@ -0,0 +1,41 @@
+"""État connu des livres, lu par le spider en mode incrémental.
+
+Le spider compare ce que montre la page de liste (prix, disponibilité)
+avec la dernière version enregistrée ; seuls les livres nouveaux ou
+modifiés justifient une visite de la page produit.
+"""
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def load_known_books(db_path: str) -> Dict[str, Dict]:
+    """Livres déjà en base, indexés par URL de page produit.
+
+    Chaque entrée contient ``upc``, ``prix`` et ``en_stock``. Retourne un
+    dictionnaire vide si la base ou la table ``books`` n'existe pas encore
+    (premier crawl). La base est ouverte en lecture seule.
+    """
+    if not Path(db_path).exists():
+        return {}
+
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT url, upc, prix, disponibilite FROM books").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+    return {
+        url: {"upc": upc, "prix": prix, "en_stock": bool(disponibilite)}
+        for url, upc, prix, disponibilite in rows
+        if url
+    }
+
+
+def listing_changed(known: Optional[Dict], prix: Optional[float], en_stock: bool) -> bool:
+    """Vrai si la page de liste montre un livre nouveau ou modifié."""
+    if known is None or prix is None or known["prix"] is None:
+        return True
+    return round(known["prix"], 2) != round(prix, 2) or known["en_stock"] != en_stock
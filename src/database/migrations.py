@@ -0,0 +1,457 @@
+"""Migrations versionnées du schéma SQLite.
+
+Chaque migration porte un numéro de version croissant et une liste
+d'instructions SQL. Les versions appliquées sont enregistrées dans la
+table ``schema_migrations`` ; ``apply_migrations`` n'exécute que celles
+qui manquent, dans une transaction par migration.
+
+Usage en ligne de commande (depuis la racine du projet) ::
+
+    python -m src.database.migrations [chemin/vers/books.db]
+"""
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Tables books et scraping_history", [
+        """
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titre TEXT,
+            prix REAL,
+            notation INTEGER,
+            disponibilite INTEGER,
+            description TEXT,
+            upc TEXT UNIQUE,
+            category TEXT,
+            url TEXT,
+            image TEXT,
+            date_scraping TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scraping_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upc TEXT,
+            titre TEXT,
+            prix REAL,
+            notation INTEGER,
+            disponibilite INTEGER,
+            category TEXT,
+            date_scraping TEXT,
+            FOREIGN KEY (upc) REFERENCES books(upc)
+        )
+        """,
+    ]),
+    (2, "Index pour la recherche et l'historique des prix", [
+        # search_books / get_books_by_category : filtre catégorie + prix
+        "CREATE INDEX IF NOT EXISTS idx_books_category_prix ON books (category, prix)",
+        # search_books sans catégorie : filtres de prix ou de note seuls
+        "CREATE INDEX IF NOT EXISTS idx_books_prix ON books (prix)",
+        "CREATE INDEX IF NOT EXISTS idx_books_notation ON books (notation)",
+        # get_price_evolution : WHERE upc = ? ORDER BY date_scraping (couvrant)
+        """
+        CREATE INDEX IF NOT EXISTS idx_history_upc_date
+        ON scraping_history (upc, date_scraping, titre, prix)
+        """,
+        # get_price_changes : GROUP BY upc, titre avec MIN/MAX(prix) (couvrant)
+        """
+        CREATE INDEX IF NOT EXISTS idx_history_upc_titre_prix
+        ON scraping_history (upc, titre, prix)
+        """,
+        # get_scraping_dates : DISTINCT date_scraping ORDER BY date_scraping
+        """
+        CREATE INDEX IF NOT EXISTS idx_history_date
+        ON scraping_history (date_scraping)
+        """,
+    ]),
+    (3, "Index catégorie pour la pagination par ID", [
+        # get_books_by_category paginé : WHERE category = ? AND id > ? ORDER BY id
+        # (le rowid termine chaque entrée d'index, l'ordre par ID est donc gratuit)
+        "CREATE INDEX IF NOT EXISTS idx_books_category ON books (category)",
+    ]),
+    (4, "Agrégats matérialisés par catégorie", [
+        """
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category TEXT,
+            nb_livres INTEGER NOT NULL,
+            nb_prix INTEGER NOT NULL,
+            prix_total REAL NOT NULL,
+            prix_min REAL,
+            prix_max REAL,
+            nb_notes INTEGER NOT NULL,
+            notes_total REAL NOT NULL,
+            stock_total INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        INSERT INTO category_stats
+        SELECT
+            category, COUNT(*), COUNT(prix), TOTAL(prix), MIN(prix), MAX(prix),
+            COUNT(notation), TOTAL(notation), TOTAL(disponibilite),
+            strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+        FROM books
+        GROUP BY category
+        """,
+    ]),
+    (5, "Version des données pour l'invalidation des caches", [
+        """
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO metadata (key, value) VALUES
+            ('data_version', '1'),
+            ('data_updated_at', strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+        """,
+    ]),
+    (6, "Index plein texte FTS5 sur titre et description", [
+        # Table à contenu externe : l'index référence books.id sans dupliquer le texte
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            titre, description,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        # Synchronisation par triggers. INSERT OR REPLACE supprime l'ancienne
+        # ligne sans déclencher AFTER DELETE, sauf avec PRAGMA recursive_triggers
+        # (activé sur les connexions du pipeline).
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, titre, description)
+            VALUES (new.id, new.titre, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, titre, description)
+            VALUES ('delete', old.id, old.titre, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF titre, description ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, titre, description)
+            VALUES ('delete', old.id, old.titre, old.description);
+            INSERT INTO books_fts (rowid, titre, description)
+            VALUES (new.id, new.titre, new.description);
+        END
+        """,
+        "INSERT INTO books_fts (books_fts) VALUES ('rebuild')",
+    ]),
+    (7, "Historique par changements : crawl_runs, titles, categories, price_history", [
+        # Un passage du pipeline SQLite (un seul pour tous les workers de crawl_parallel)
+        """
+        CREATE TABLE IF NOT EXISTS crawl_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            finished_at TEXT
+        )
+        """,
+        "CREATE TABLE IF NOT EXISTS titles (id INTEGER PRIMARY KEY, titre TEXT NOT NULL UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, category TEXT NOT NULL UNIQUE)",
+        # Une ligne par changement de prix, de note ou de disponibilité ;
+        # date_scraping est la première observation de cet état
+        """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upc TEXT NOT NULL,
+            run_id INTEGER NOT NULL REFERENCES crawl_runs(id),
+            titre_id INTEGER REFERENCES titles(id),
+            category_id INTEGER REFERENCES categories(id),
+            prix REAL,
+            notation INTEGER,
+            disponibilite INTEGER,
+            date_scraping TEXT NOT NULL
+        )
+        """,
+        # Dernier état d'un livre (MAX(id) WHERE upc = ?) et évolution du prix
+        "CREATE INDEX IF NOT EXISTS idx_price_history_upc ON price_history (upc)",
+        # Reprise de l'ancien historique. Chaque item y porte sa propre date :
+        # un nouveau run commence après 15 minutes sans aucun item. Deux
+        # crawls séparés de moins de 15 minutes sont donc fusionnés.
+        """
+        CREATE TEMP TABLE migration_run_dates (
+            date_scraping TEXT PRIMARY KEY,
+            run_id INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT INTO migration_run_dates (date_scraping, run_id)
+        SELECT date_scraping, SUM(nouveau) OVER (ORDER BY date_scraping) + 1
+        FROM (
+            SELECT
+                date_scraping,
+                COALESCE(
+                    julianday(date_scraping) - julianday(LAG(date_scraping) OVER (ORDER BY date_scraping))
+                    > 15.0 / 1440,
+                    0
+                ) AS nouveau
+            FROM (SELECT DISTINCT date_scraping FROM scraping_history WHERE date_scraping IS NOT NULL)
+        )
+        """,
+        """
+        INSERT INTO crawl_runs (id, started_at, finished_at)
+        SELECT run_id, MIN(date_scraping), MAX(date_scraping)
+        FROM migration_run_dates
+        GROUP BY run_id
+        ORDER BY run_id
+        """,
+        """
+        INSERT OR IGNORE INTO titles (titre)
+        SELECT titre FROM scraping_history WHERE titre IS NOT NULL
+        UNION SELECT titre FROM books WHERE titre IS NOT NULL
+        """,
+        """
+        INSERT OR IGNORE INTO categories (category)
+        SELECT category FROM scraping_history WHERE category IS NOT NULL
+        UNION SELECT category FROM books WHERE category IS NOT NULL
+        """,
+        # Seules les lignes qui diffèrent de la précédente du même livre sont gardées
+        """
+        INSERT INTO price_history
+        (upc, run_id, titre_id, category_id, prix, notation, disponibilite, date_scraping)
+        SELECT h.upc, r.run_id, t.id, c.id, h.prix, h.notation, h.disponibilite, h.date_scraping
+        FROM (
+            SELECT
+                *,
+                LAG(id) OVER w AS prev_id,
+                LAG(prix) OVER w AS prev_prix,
+                LAG(notation) OVER w AS prev_notation,
+                LAG(disponibilite) OVER w AS prev_disponibilite
+            FROM scraping_history
+            WHERE upc IS NOT NULL AND date_scraping IS NOT NULL
+            WINDOW w AS (PARTITION BY upc ORDER BY date_scraping, id)
+        ) h
+        JOIN migration_run_dates r ON r.date_scraping = h.date_scraping
+        LEFT JOIN titles t ON t.titre = h.titre
+        LEFT JOIN categories c ON c.category = h.category
+        WHERE h.prev_id IS NULL
+           OR h.prix IS NOT h.prev_prix
+           OR h.notation IS NOT h.prev_notation
+           OR h.disponibilite IS NOT h.prev_disponibilite
+        ORDER BY h.date_scraping, h.id
+        """,
+        "DROP TABLE temp.migration_run_dates",
+        # Remplacent les index de la migration 2, supprimés avec scraping_history :
+        # get_price_evolution et tri de la vue par date, filtres de date de
+        # /history et de l'export, replis de get_price_changes
+        "CREATE INDEX IF NOT EXISTS idx_price_history_upc_date ON price_history (upc, date_scraping)",
+        "CREATE INDEX IF NOT EXISTS idx_price_history_date ON price_history (date_scraping)",
+        # Les lectures existantes (repository, export) passent par la vue
+        "DROP TABLE scraping_history",
+        """
+        CREATE VIEW scraping_history AS
+        SELECT
+            h.id, h.upc, t.titre, h.prix, h.notation, h.disponibilite,
+            c.category, h.date_scraping, h.run_id
+        FROM price_history h
+        LEFT JOIN titles t ON t.id = h.titre_id
+        LEFT JOIN categories c ON c.id = h.category_id
+        """,
+    ]),
+    (8, "Résumé des prix par livre (price_summary)", [
+        """
+        CREATE TABLE IF NOT EXISTS price_summary (
+            upc TEXT PRIMARY KEY,
+            titre TEXT,
+            category TEXT,
+            prix_actuel REAL,
+            prix_precedent REAL,
+            prix_min REAL,
+            prix_max REAL,
+            nb_changements INTEGER NOT NULL,
+            premier_releve TEXT,
+            dernier_changement TEXT,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        # Fenêtres since / between de /history/price-changes
+        """
+        CREATE INDEX IF NOT EXISTS idx_price_summary_dernier_changement
+        ON price_summary (dernier_changement)
+        """,
+        # Tri par amplitude (défaut) : les premiers livres sans trier toute la table
+        """
+        CREATE INDEX IF NOT EXISTS idx_price_summary_variation
+        ON price_summary ((prix_max - prix_min))
+        """,
+        # Premier calcul, sur tout l'historique. Copie figée de la requête de
+        # price_summary.py : une migration publiée ne doit plus changer
+        """
+        WITH
+        h AS (
+            SELECT
+                p.upc, p.id, p.prix, p.date_scraping, p.titre_id, p.category_id,
+                LAG(p.id) OVER w AS prev_id,
+                LAG(p.prix) OVER w AS prev_prix
+            FROM price_history p
+            WINDOW w AS (PARTITION BY p.upc ORDER BY p.id)
+        ),
+        moves AS (
+            SELECT * FROM h WHERE prev_id IS NULL OR prix IS NOT prev_prix
+        ),
+        totals AS (
+            SELECT
+                upc,
+                MAX(id) AS last_id,
+                MIN(prix) AS prix_min,
+                MAX(prix) AS prix_max,
+                SUM(prev_id IS NOT NULL) AS nb_changements,
+                MIN(date_scraping) AS premier_releve
+            FROM moves
+            GROUP BY upc
+        )
+        INSERT OR REPLACE INTO price_summary
+        (upc, titre, category, prix_actuel, prix_precedent, prix_min, prix_max,
+         nb_changements, premier_releve, dernier_changement, updated_at)
+        SELECT
+            m.upc, t.titre, c.category, m.prix,
+            CASE WHEN m.prev_id IS NOT NULL THEN m.prev_prix END,
+            s.prix_min, s.prix_max, s.nb_changements, s.premier_releve,
+            CASE WHEN m.prev_id IS NOT NULL THEN m.date_scraping END,
+            strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+        FROM totals s
+        JOIN moves m ON m.id = s.last_id
+        LEFT JOIN titles t ON t.id = m.titre_id
+        LEFT JOIN categories c ON c.id = m.category_id
+        """,
+        """
+        INSERT OR REPLACE INTO metadata (key, value)
+        SELECT 'price_summary_history_id', COALESCE(MAX(id), 0) FROM price_history
+        """,
+    ]),
+    (9, "Catégories à recalculer dans category_stats", [
+        # Une ligne par catégorie touchée depuis le dernier recalcul (NULL compris)
+        "CREATE TABLE IF NOT EXISTS category_stats_pending (category TEXT)",
+        # Comme pour books_fts, INSERT OR REPLACE ne marque l'ancienne catégorie
+        # (AFTER DELETE) qu'avec PRAGMA recursive_triggers
+        """
+        CREATE TRIGGER IF NOT EXISTS category_stats_insert AFTER INSERT ON books BEGIN
+            INSERT INTO category_stats_pending (category)
+            SELECT new.category
+            WHERE NOT EXISTS (SELECT 1 FROM category_stats_pending WHERE category IS new.category);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS category_stats_delete AFTER DELETE ON books BEGIN
+            INSERT INTO category_stats_pending (category)
+            SELECT old.category
+            WHERE NOT EXISTS (SELECT 1 FROM category_stats_pending WHERE category IS old.category);
+        END
+        """,
+        # Seules les valeurs agrégées comptent : les items « partiel » (mode
+        # fast) réécrivent prix et note même quand ils n'ont pas changé
+        """
+        CREATE TRIGGER IF NOT EXISTS category_stats_update
+        AFTER UPDATE OF prix, notation, disponibilite, category ON books
+        WHEN old.prix IS NOT new.prix OR old.notation IS NOT new.notation
+          OR old.disponibilite IS NOT new.disponibilite OR old.category IS NOT new.category
+        BEGIN
+            INSERT INTO category_stats_pending (category)
+            SELECT old.category
+            WHERE NOT EXISTS (SELECT 1 FROM category_stats_pending WHERE category IS old.category);
+            INSERT INTO category_stats_pending (category)
+            SELECT new.category
+            WHERE NOT EXISTS (SELECT 1 FROM category_stats_pending WHERE category IS new.category);
+        END
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+class SchemaOutdatedError(RuntimeError):
+    """Base dont le schéma n'est pas à la dernière version (migrations à lancer)."""
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Retourne la dernière version appliquée (0 pour une base vierge)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def read_schema_version(conn: sqlite3.Connection) -> int:
+    """Comme ``get_schema_version``, sans rien écrire (connexion en lecture seule)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+    ).fetchone()
+    if exists is None:
+        return 0
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection, target: Optional[int] = None) -> int:
+    """Applique les migrations manquantes jusqu'à ``target`` (incluse).
+
+    Retourne la version du schéma après exécution. Un ``ANALYZE`` est lancé
+    dès qu'au moins une migration a été appliquée, pour que le planificateur
+    dispose de statistiques à jour sur les nouveaux index.
+    """
+    if target is None:
+        target = LATEST_VERSION
+
+    version = get_schema_version(conn)
+    applied = False
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Relecture sous verrou : un autre processus a pu migrer entre-temps
+            if get_schema_version(conn) >= number:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                (number, description, datetime.now().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied = True
+
+    if applied:
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    return get_schema_version(conn)
+
+
+def main():
+    if len(sys.argv) > 1:
+        db_path = sys.argv[1]
+    else:
+        db_path = str(Path(__file__).parent.parent.parent / 'data' / 'books.db')
+
+    conn = sqlite3.connect(db_path)
+    before = get_schema_version(conn)
+    after = apply_migrations(conn)
+    conn.close()
+
+    print(f"Base : {db_path}")
+    print(f"Schéma : version {before} → {after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Curseurs opaques pour la pagination par clé (keyset pagination).
+
+Un curseur encode la clé de tri du dernier élément renvoyé (par défaut
+son ``id``) ; la page suivante reprend strictement après cette clé, ce qui
+coûte un parcours d'index au lieu d'un ``OFFSET`` linéaire.
+"""
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+def encode_cursor(**key) -> str:
+    """Encode une clé de pagination en jeton URL-safe."""
+    payload = json.dumps(key, separators=(',', ':'), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """Décode un jeton produit par ``encode_cursor``.
+
+    Lève ``ValueError`` si le jeton est malformé.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError(f"Curseur invalide: {cursor}")
+    if not isinstance(key, dict):
+        raise ValueError(f"Curseur invalide: {cursor}")
+    return key
+
+
+def paginate(
+    rows: List[Dict],
+    limit: int,
+    keys: Tuple[str, ...] = ('id',)
+) -> Tuple[List[Dict], Optional[str]]:
+    """Coupe ``limit + 1`` lignes en une page et le curseur de la suivante.
+
+    ``keys`` liste les colonnes de la clé de tri reprises dans le curseur.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(**{key: page[-1][key] for key in keys})
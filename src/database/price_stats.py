@@ -0,0 +1,327 @@
+"""Statistiques de distribution des prix, calculées en colonnes avec NumPy.
+
+SQLite ne sait calculer que des agrégats simples (AVG, MIN, MAX) ; une
+médiane ou un percentile par catégorie demandent des fonctions de fenêtre
+qui trient toute la table à chaque requête. Ici, les colonnes prix / note /
+catégorie sont chargées une fois par version des données (``data_version``,
+incrémentée en fin de crawl) dans des tableaux NumPy, puis :
+
+- les quantiles par groupe se lisent directement dans un tableau trié par
+  (groupe, prix), avec interpolation linéaire (méthode par défaut de
+  ``numpy.percentile``) ;
+- moyennes, écarts-types et moyennes pondérées par la note passent par
+  ``numpy.bincount`` ;
+- les histogrammes de tous les groupes sont un seul ``bincount`` sur
+  (groupe, classe).
+
+L'évolution dans le temps part de ``price_history``, qui ne stocke que les
+changements : chaque ligne est valable de sa date de crawl jusqu'au
+changement suivant du même livre. Les lignes sont répétées sur leur
+intervalle de validité, ce qui donne l'état complet du catalogue à chaque
+date de crawl, puis les dates sont traitées comme des groupes.
+
+``numpy`` est une dépendance optionnelle : sans lui, les méthodes lèvent
+``ValueError``.
+"""
+import math
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # dépendance optionnelle
+    numpy = None
+
+from .data_version import get_data_version
+
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+# Parcours de table : trier en NumPy coûte moins qu'un ORDER BY par l'index
+# (une recherche dans la table par ligne pour lire la note)
+CURRENT_SQL = """
+    SELECT category, prix, COALESCE(notation, 0)
+    FROM books
+    WHERE prix IS NOT NULL
+"""
+
+# Run de la ligne et run de la ligne suivante du même livre (0 : aucune)
+HISTORY_SQL = """
+    SELECT
+        run_id,
+        COALESCE(LEAD(run_id) OVER (PARTITION BY upc ORDER BY id), 0),
+        prix,
+        COALESCE(category_id, 0)
+    FROM price_history
+    WHERE prix IS NOT NULL
+"""
+
+RUN_DATES_SQL = "SELECT id, substr(started_at, 1, 10) FROM crawl_runs"
+
+
+def require_numpy():
+    if numpy is None:
+        raise ValueError("Les statistiques de distribution nécessitent le module numpy (pip install numpy)")
+
+
+def _category_labels(conn: sqlite3.Connection) -> List[Optional[str]]:
+    """Libellé de chaque ID de catégorie (indice 0 : sans catégorie)."""
+    names = dict(conn.execute("SELECT id, category FROM categories"))
+    return [names.get(i) for i in range(max(names, default=0) + 1)]
+
+
+def grouped_summary(
+    groups: 'numpy.ndarray',
+    values: 'numpy.ndarray',
+    n_groups: int,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    weights: Optional['numpy.ndarray'] = None,
+    presorted: bool = False
+) -> Dict[str, 'numpy.ndarray']:
+    """Effectif, moyenne, écart-type, min/max et percentiles de chaque groupe.
+
+    Args:
+        groups: Code du groupe de chaque valeur (0 .. n_groups - 1)
+        values: Valeurs
+        n_groups: Nombre de groupes (un groupe vide donne NaN)
+        percentiles: Percentiles entre 0 et 100
+        weights: Poids de la moyenne pondérée (``moyenne_ponderee``)
+        presorted: Valeurs déjà triées par (groupe, valeur)
+
+    Returns:
+        Un tableau de longueur ``n_groups`` par statistique
+    """
+    # La médiane est toujours calculée
+    percentiles = sorted(set(percentiles) | {50})
+    if not presorted:
+        order = numpy.lexsort((values, groups))
+        groups, values = groups[order], values[order]
+        if weights is not None:
+            weights = weights[order]
+
+    counts = numpy.bincount(groups, minlength=n_groups)
+    filled = counts > 0
+    safe_counts = numpy.where(filled, counts, 1)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    last = numpy.maximum(starts + counts - 1, starts)
+    nan = numpy.full(n_groups, numpy.nan)
+
+    def on_filled(array):
+        return numpy.where(filled, array, nan)
+
+    mean = numpy.bincount(groups, weights=values, minlength=n_groups) / safe_counts
+    deviation = values - mean[groups]
+    variance = numpy.bincount(groups, weights=deviation * deviation, minlength=n_groups) / safe_counts
+
+    size = len(values)
+    result = {
+        'nb': counts,
+        'moyenne': on_filled(mean),
+        'ecart_type': on_filled(numpy.sqrt(variance)),
+        'min': on_filled(values[numpy.minimum(starts, size - 1)]) if size else nan,
+        'max': on_filled(values[numpy.minimum(last, size - 1)]) if size else nan,
+    }
+    for p in percentiles:
+        # Interpolation linéaire entre les deux rangs encadrants
+        position = starts + (p / 100.0) * (counts - 1)
+        low = numpy.clip(numpy.floor(position).astype(numpy.int64), 0, max(size - 1, 0))
+        high = numpy.clip(numpy.minimum(low + 1, last), 0, max(size - 1, 0))
+        fraction = position - numpy.floor(position)
+        if size:
+            quantile = values[low] + (values[high] - values[low]) * fraction
+        else:
+            quantile = nan
+        result[f'p{p:g}'] = on_filled(quantile)
+
+    if weights is not None:
+        total = numpy.bincount(groups, weights=weights, minlength=n_groups)
+        weighted = numpy.bincount(groups, weights=values * weights, minlength=n_groups)
+        result['moyenne_ponderee'] = numpy.where(total > 0, weighted / numpy.where(total > 0, total, 1), nan)
+    return result
+
+
+def grouped_histogram(
+    groups: 'numpy.ndarray',
+    values: 'numpy.ndarray',
+    n_groups: int,
+    edges: 'numpy.ndarray'
+) -> 'numpy.ndarray':
+    """Histogramme de chaque groupe sur les mêmes classes : tableau (n_groups, len(edges) - 1).
+
+    Comme ``numpy.histogram``, la dernière classe inclut sa borne supérieure.
+    """
+    bins = len(edges) - 1
+    index = numpy.clip(numpy.searchsorted(edges, values, side='right') - 1, 0, bins - 1)
+    counts = numpy.bincount(groups * bins + index, minlength=n_groups * bins)
+    return counts.reshape(n_groups, bins)
+
+
+def _number(value, digits: int = 2) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+
+class PriceStatsEngine:
+    """Colonnes en mémoire, rechargées quand la version des données change."""
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._columns: Dict[str, Dict] = {}
+
+    def _load(self, name: str, loader) -> Dict:
+        """Colonnes ``name`` pour la version courante (chargées au plus une fois par version)."""
+        require_numpy()
+        with self.db.connection() as conn:
+            version = get_data_version(conn)['version']
+            cached = self._columns.get(name)
+            if cached is not None and cached['version'] == version:
+                return cached
+            # Un seul chargement à la fois ; les autres threads attendent le résultat
+            with self._lock:
+                cached = self._columns.get(name)
+                if cached is None or cached['version'] != version:
+                    cached = loader(conn)
+                    cached['version'] = version
+                    self._columns[name] = cached
+                return cached
+
+    @staticmethod
+    def _load_current(conn: sqlite3.Connection) -> Dict:
+        rows = conn.execute(CURRENT_SQL).fetchall()
+        index: Dict[Optional[str], int] = {}
+        groups = numpy.fromiter((index.setdefault(row[0], len(index)) for row in rows), numpy.int64, len(rows))
+        labels = list(index)
+        table = numpy.array([row[1:] for row in rows], dtype=numpy.float64).reshape(-1, 2)
+        prices = table[:, 0]
+        # Triées une fois par (catégorie, prix) : les requêtes lisent les rangs directement
+        order = numpy.lexsort((prices, groups))
+        return {
+            'groups': groups[order],
+            'labels': labels,
+            'prix': prices[order],
+            'notation': table[:, 1][order],
+            # Ordre des prix tous livres confondus (statistiques globales)
+            'ordre_global': numpy.argsort(prices[order], kind='stable'),
+        }
+
+    @staticmethod
+    def _load_history(conn: sqlite3.Connection) -> Dict:
+        table = numpy.array(conn.execute(HISTORY_SQL).fetchall(), dtype=numpy.float64).reshape(-1, 4)
+        run_dates = dict(conn.execute(RUN_DATES_SQL))
+        dates = sorted(set(run_dates.values()))
+        date_index = {day: i for i, day in enumerate(dates)}
+        # Indice de date de chaque run ; le run 0 (pas de ligne suivante) est « après la dernière date »
+        date_of_run = numpy.full(max(run_dates, default=0) + 1, len(dates), dtype=numpy.int64)
+        for run_id, day in run_dates.items():
+            date_of_run[run_id] = date_index[day]
+
+        start = date_of_run[table[:, 0].astype(numpy.int64)]
+        # Fin de validité : date de la ligne suivante du même livre
+        end = date_of_run[table[:, 1].astype(numpy.int64)]
+        prices = table[:, 2]
+        # Lignes rangées par prix : après expansion, un tri stable par date suffit
+        order = numpy.argsort(prices, kind='stable')
+        return {
+            'dates': dates,
+            'start': start[order],
+            'end': end[order],
+            'prix': prices[order],
+            'category': table[:, 3].astype(numpy.int64)[order],
+            'category_labels': _category_labels(conn),
+        }
+
+    def distribution(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        """Distribution des prix actuels : global et par catégorie."""
+        columns = self._load('current', self._load_current)
+        labels = columns['labels']
+        prices, ratings = columns['prix'], columns['notation']
+
+        overall_order = columns['ordre_global']
+        overall = grouped_summary(
+            numpy.zeros(len(prices), dtype=numpy.int64), prices[overall_order], 1, percentiles,
+            ratings[overall_order], presorted=True
+        )
+        by_category = grouped_summary(
+            columns['groups'], prices, len(labels), percentiles, ratings, presorted=True
+        )
+        categories = [
+            self._summary_row(by_category, i, percentiles, category=label)
+            for i, label in enumerate(labels) if label is not None and by_category['nb'][i]
+        ]
+        return {
+            'global': self._summary_row(overall, 0, percentiles),
+            'categories': sorted(categories, key=lambda row: row['category']),
+        }
+
+    def histogram(self, bins: int = 20, category: Optional[str] = None) -> Dict:
+        """Histogramme des prix actuels, global ou d'une catégorie.
+
+        Les classes couvrent la plage de prix de tout le catalogue : les
+        histogrammes de deux catégories sont directement comparables.
+        """
+        columns = self._load('current', self._load_current)
+        prices, groups = columns['prix'], columns['groups']
+        if len(prices) == 0:
+            return {'bornes': [], 'effectifs': [], 'nb_livres': 0}
+        edges = numpy.linspace(prices.min(), prices.max(), bins + 1)
+
+        if category is None:
+            counts = grouped_histogram(numpy.zeros(len(prices), dtype=numpy.int64), prices, 1, edges)[0]
+        else:
+            if category not in columns['labels']:
+                return {'bornes': [], 'effectifs': [], 'nb_livres': 0}
+            counts = grouped_histogram(groups, prices, len(columns['labels']), edges)[
+                columns['labels'].index(category)
+            ]
+        return {
+            'bornes': [round(float(e), 2) for e in edges],
+            'effectifs': counts.tolist(),
+            'nb_livres': int(counts.sum()),
+        }
+
+    def history(
+        self,
+        category: Optional[str] = None,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES
+    ) -> List[Dict]:
+        """Distribution des prix à chaque date de crawl (état du catalogue ce jour-là)."""
+        columns = self._load('history', self._load_history)
+        start, end, prices = columns['start'], columns['end'], columns['prix']
+        if category is not None:
+            if category not in columns['category_labels']:
+                return []
+            keep = columns['category'] == columns['category_labels'].index(category)
+            start, end, prices = start[keep], end[keep], prices[keep]
+
+        # Chaque ligne répétée sur ses dates de validité [start, end)
+        lengths = end - start
+        valid = lengths > 0
+        start, lengths, prices = start[valid], lengths[valid], prices[valid]
+        row = numpy.repeat(numpy.arange(len(start)), lengths)
+        offset = numpy.arange(len(row)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        dates = start[row] + offset
+        order = numpy.argsort(dates, kind='stable')
+
+        summary = grouped_summary(
+            dates[order], prices[row[order]], len(columns['dates']), percentiles, presorted=True
+        )
+        return [
+            self._summary_row(summary, i, percentiles, date=day)
+            for i, day in enumerate(columns['dates']) if summary['nb'][i]
+        ]
+
+    @staticmethod
+    def _summary_row(summary: Dict, i: int, percentiles: Sequence[float], **labels) -> Dict:
+        row = dict(labels)
+        row['nb_livres'] = int(summary['nb'][i])
+        row['prix_moyen'] = _number(summary['moyenne'][i])
+        row['ecart_type'] = _number(summary['ecart_type'][i])
+        row['prix_min'] = _number(summary['min'][i])
+        for p in percentiles:
+            row[f'p{p:g}'] = _number(summary[f'p{p:g}'][i])
+        row['mediane'] = _number(summary['p50'][i])
+        row['prix_max'] = _number(summary['max'][i])
+        if 'moyenne_ponderee' in summary:
+            row['prix_moyen_pondere_note'] = _number(summary['moyenne_ponderee'][i])
+        return row
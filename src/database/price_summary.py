@@ -0,0 +1,82 @@
+"""Résumé des prix par livre, tenu à jour en fin de crawl.
+
+La table ``price_summary`` garde une ligne par UPC : prix actuel, prix
+avant le dernier changement, min/max, nombre de changements, dates du
+premier relevé et du dernier changement. ``/history/price-changes`` lit
+ce résumé au lieu de regrouper tout l'historique à chaque requête.
+
+La mise à jour est incrémentale : seuls les livres ayant reçu une ligne
+``price_history`` depuis la précédente (repère ``price_summary_history_id``
+de la table ``metadata``) sont recalculés, à partir de leur propre
+historique. Son coût suit donc le nombre de changements du crawl, pas la
+taille du catalogue.
+"""
+import sqlite3
+
+# Livres ayant reçu une ligne d'historique depuis le dernier repère
+REFRESH_SQL = """
+    WITH
+    changed AS (
+        SELECT DISTINCT upc FROM price_history
+        WHERE id > COALESCE(
+            (SELECT CAST(value AS INTEGER) FROM metadata WHERE key = 'price_summary_history_id'), 0
+        )
+    ),
+    h AS (
+        SELECT
+            p.upc, p.id, p.prix, p.date_scraping, p.titre_id, p.category_id,
+            LAG(p.id) OVER w AS prev_id,
+            LAG(p.prix) OVER w AS prev_prix
+        FROM price_history p
+        WHERE p.upc IN (SELECT upc FROM changed)
+        WINDOW w AS (PARTITION BY p.upc ORDER BY p.id)
+    ),
+    -- Premier relevé puis chaque changement de prix (les autres lignes
+    -- de l'historique portent sur la note ou la disponibilité)
+    moves AS (
+        SELECT * FROM h WHERE prev_id IS NULL OR prix IS NOT prev_prix
+    ),
+    totals AS (
+        SELECT
+            upc,
+            MAX(id) AS last_id,
+            MIN(prix) AS prix_min,
+            MAX(prix) AS prix_max,
+            SUM(prev_id IS NOT NULL) AS nb_changements,
+            MIN(date_scraping) AS premier_releve
+        FROM moves
+        GROUP BY upc
+    )
+    INSERT OR REPLACE INTO price_summary
+    (upc, titre, category, prix_actuel, prix_precedent, prix_min, prix_max,
+     nb_changements, premier_releve, dernier_changement, updated_at)
+    SELECT
+        m.upc, t.titre, c.category, m.prix,
+        CASE WHEN m.prev_id IS NOT NULL THEN m.prev_prix END,
+        s.prix_min, s.prix_max, s.nb_changements, s.premier_releve,
+        CASE WHEN m.prev_id IS NOT NULL THEN m.date_scraping END,
+        strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+    FROM totals s
+    JOIN moves m ON m.id = s.last_id
+    LEFT JOIN titles t ON t.id = m.titre_id
+    LEFT JOIN categories c ON c.id = m.category_id
+"""
+
+WATERMARK_SQL = """
+    INSERT OR REPLACE INTO metadata (key, value)
+    SELECT 'price_summary_history_id', COALESCE(MAX(id), 0) FROM price_history
+"""
+
+
+def refresh_price_summary(conn: sqlite3.Connection) -> int:
+    """Recalcule le résumé des livres modifiés depuis le dernier appel.
+
+    Retourne le nombre de livres mis à jour (une transaction).
+    """
+    with conn:
+        # rowcount vaut -1 pour une requête qui commence par WITH
+        before = conn.total_changes
+        conn.execute(REFRESH_SQL)
+        updated = conn.total_changes - before
+        conn.execute(WATERMARK_SQL)
+    return updated
@@ -0,0 +1,144 @@
+"""Lecture des instantanés colonnaires (voir ``snapshots.py``).
+
+Les fichiers sont ouverts par memory-map : seules les pages des colonnes
+demandées sont lues, et un fichier Arrow IPC non compressé est utilisé
+sans copie. Les filtres sur la date de crawl élaguent les partitions
+``crawl_date=...`` avant toute lecture ; les agrégations se font en
+colonnes avec ``pyarrow.compute``, sans passer par SQLite.
+
+Exemple ::
+
+    repo = SnapshotRepository('data/snapshots')
+    history = repo.get_history(since='2025-01-01', columns=['upc', 'prix', 'date_scraping'])
+    changes = repo.get_price_changes(min_variation=5.0)
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .snapshots import FORMATS, HISTORY_COLUMNS, arrow_schema, require_pyarrow, pyarrow
+
+if pyarrow is not None:
+    import pyarrow.dataset
+    import pyarrow.fs
+
+
+class SnapshotRepository:
+    """Accès en lecture seule à un répertoire d'instantanés."""
+
+    def __init__(self, base_dir: str):
+        require_pyarrow()
+        self.base_dir = Path(base_dir)
+        self.format = next(
+            (fmt for fmt, ext in FORMATS.items() if (self.base_dir / f'current{ext}').exists()),
+            None
+        )
+        if self.format is None:
+            raise FileNotFoundError(f"Aucun instantané dans {self.base_dir}")
+        self.extension = FORMATS[self.format]
+        self.filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+
+    def get_current_books(self, columns: Optional[List[str]] = None) -> 'pyarrow.Table':
+        """Catalogue courant (une ligne par livre)."""
+        path = str(self.base_dir / f'current{self.extension}')
+        if self.format == 'parquet':
+            return pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+        table = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+        return table.select(columns) if columns else table
+
+    def _history_dataset(self) -> Optional['pyarrow.dataset.Dataset']:
+        history_dir = self.base_dir / 'history'
+        if not history_dir.exists():
+            return None
+        return pyarrow.dataset.dataset(
+            str(history_dir),
+            format='parquet' if self.format == 'parquet' else 'ipc',
+            filesystem=self.filesystem,
+            partitioning=pyarrow.dataset.partitioning(
+                pyarrow.schema([('crawl_date', pyarrow.string())]), flavor='hive'
+            ),
+        )
+
+    def get_crawl_dates(self) -> List[str]:
+        """Dates de crawl exportées (noms des partitions), triées."""
+        history_dir = self.base_dir / 'history'
+        if not history_dir.exists():
+            return []
+        return sorted(
+            path.name.split('=', 1)[1] for path in history_dir.iterdir() if path.name.startswith('crawl_date=')
+        )
+
+    def get_history(
+        self,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        columns: Optional[List[str]] = None
+    ) -> 'pyarrow.Table':
+        """Lignes d'historique des crawls entre ``since`` et ``until`` (dates YYYY-MM-DD incluses).
+
+        L'historique ne contient que les changements : un livre absent d'une
+        fenêtre n'a pas changé pendant celle-ci.
+        """
+        dataset = self._history_dataset()
+        if dataset is None:
+            table = arrow_schema(HISTORY_COLUMNS).empty_table()
+            return table.select(columns) if columns else table
+
+        crawl_date = pyarrow.dataset.field('crawl_date')
+        condition = None
+        if since is not None:
+            condition = crawl_date >= since[:10]
+        if until is not None:
+            bound = crawl_date <= until[:10]
+            condition = bound if condition is None else condition & bound
+
+        # La partition ne fait pas partie des colonnes par défaut
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name != 'crawl_date']
+        table = dataset.to_table(columns=columns, filter=condition)
+        # Tri stable : l'ordre des lignes d'un même run est conservé
+        if 'run_id' in table.column_names:
+            table = table.sort_by('run_id')
+        return table
+
+    def get_price_series(self, upc: str) -> 'pyarrow.Table':
+        """Changements successifs d'un livre, dans l'ordre des crawls."""
+        columns = ['run_id', 'date_scraping', 'prix', 'notation', 'disponibilite']
+        dataset = self._history_dataset()
+        if dataset is None:
+            return self.get_history(columns=columns)
+        table = dataset.to_table(columns=columns, filter=pyarrow.dataset.field('upc') == upc)
+        return table.sort_by('run_id')
+
+    def get_price_changes(
+        self,
+        min_variation: float = 5.0,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> List[Dict]:
+        """Livres dont le prix a varié d'au moins ``min_variation``, calcul en colonnes.
+
+        Sans fenêtre, mêmes livres, valeurs et ordre que
+        ``BookRepository.get_price_changes`` (champs upc, titre, category,
+        prix_min, prix_max, variation, prix_actuel) ; avec ``since`` /
+        ``until``, l'amplitude porte sur les relevés de la fenêtre.
+        """
+        history = self.get_history(since, until, columns=['run_id', 'upc', 'titre', 'category', 'prix'])
+        if history.num_rows == 0:
+            return []
+
+        # Agrégation ordonnée (« last ») : un seul thread, lignes triées par run
+        grouped = history.group_by('upc', use_threads=False).aggregate([
+            ('titre', 'last'), ('category', 'last'), ('prix', 'min'), ('prix', 'max'), ('prix', 'last'),
+        ])
+        variation = pyarrow.compute.subtract(grouped['prix_max'], grouped['prix_min'])
+        result = pyarrow.table({
+            'upc': grouped['upc'],
+            'titre': grouped['titre_last'],
+            'category': grouped['category_last'],
+            'prix_min': grouped['prix_min'],
+            'prix_max': grouped['prix_max'],
+            'variation': variation,
+            'prix_actuel': grouped['prix_last'],
+        })
+        result = result.filter(pyarrow.compute.greater_equal(result['variation'], min_variation))
+        return result.sort_by([('variation', 'descending'), ('upc', 'ascending')]).to_pylist()
@@ -0,0 +1,204 @@
+"""Instantanés colonnaires (Parquet ou Arrow IPC) pour l'analyse.
+
+Arborescence écrite dans le répertoire de sortie ::
+
+    history/crawl_date=2025-01-01/run-000001.parquet   # lignes d'historique d'un crawl
+    current.parquet                                    # table books compactée
+
+Un fichier par crawl (``crawl_runs``), partitionné par date de début :
+seuls les runs terminés et pas encore exportés sont écrits, un fichier
+existant n'est jamais réécrit. ``current`` est remplacé à chaque export
+(fichier temporaire puis ``os.replace``) : un lecteur ne voit jamais de
+fichier partiel. La lecture se fait par ``SnapshotRepository``.
+
+``pyarrow`` est une dépendance optionnelle : sans lui, l'export lève
+``ValueError``.
+
+Usage (depuis la racine du projet) ::
+
+    python -m src.database.snapshots data/books.db exports/
+    python -m src.database.snapshots data/books.db exports/ --format arrow --compression none
+"""
+import argparse
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # dépendance optionnelle
+    pyarrow = None
+
+from src.database.migrations import apply_migrations
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+BATCH_SIZE = 50_000
+
+# Colonnes exportées ; date_scraping est converti en timestamp
+HISTORY_COLUMNS = [
+    ('run_id', 'int64'), ('upc', 'string'), ('titre', 'string'), ('category', 'string'),
+    ('prix', 'float64'), ('notation', 'int8'), ('disponibilite', 'int32'),
+    ('date_scraping', 'timestamp'),
+]
+CURRENT_COLUMNS = [
+    ('upc', 'string'), ('titre', 'string'), ('category', 'string'), ('prix', 'float64'),
+    ('notation', 'int8'), ('disponibilite', 'int32'), ('url', 'string'), ('image', 'string'),
+    ('date_scraping', 'timestamp'),
+]
+
+PENDING_RUNS_SQL = """
+    SELECT id, substr(started_at, 1, 10) FROM crawl_runs
+    WHERE finished_at IS NOT NULL
+    ORDER BY id
+"""
+
+HISTORY_SQL = """
+    SELECT run_id, upc, titre, category, prix, notation, disponibilite, date_scraping
+    FROM scraping_history
+    WHERE run_id = ?
+    ORDER BY id
+"""
+
+CURRENT_SQL = """
+    SELECT upc, titre, category, prix, notation, disponibilite, url, image, date_scraping
+    FROM books
+    ORDER BY upc
+"""
+
+
+def require_pyarrow():
+    if pyarrow is None:
+        raise ValueError("L'export colonnaire nécessite le module pyarrow (pip install pyarrow)")
+
+
+def arrow_schema(columns) -> 'pyarrow.Schema':
+    types = {
+        'int64': pyarrow.int64(), 'int32': pyarrow.int32(), 'int8': pyarrow.int8(),
+        'float64': pyarrow.float64(), 'string': pyarrow.string(),
+        # Même représentation que les dates ISO de la base, sans fuseau
+        'timestamp': pyarrow.timestamp('us'),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _batch(rows, schema) -> 'pyarrow.RecordBatch':
+    """Lignes SQLite → RecordBatch (conversion colonne par colonne)."""
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pyarrow.types.is_timestamp(field.type):
+            arrays.append(pyarrow.compute.cast(pyarrow.array(values, pyarrow.string()), field.type))
+        else:
+            arrays.append(pyarrow.array(values, field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_query(
+    conn: sqlite3.Connection,
+    query: str,
+    params: tuple,
+    columns,
+    path: Path,
+    fmt: str,
+    compression: Optional[str]
+) -> int:
+    """Écrit le résultat d'une requête par lots, via un fichier temporaire.
+
+    Retourne le nombre de lignes écrites.
+    """
+    schema = arrow_schema(columns)
+    tmp = path.with_name(path.name + '.tmp')
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if fmt == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(str(tmp), schema, compression=compression or 'none')
+    else:
+        writer = pyarrow.ipc.new_file(
+            str(tmp), schema, options=pyarrow.ipc.IpcWriteOptions(compression=compression)
+        )
+
+    count = 0
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            writer.write_batch(_batch(rows, schema))
+            count += len(rows)
+    except BaseException:
+        writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    writer.close()
+    os.replace(tmp, path)
+    return count
+
+
+def export_snapshot(
+    conn: sqlite3.Connection,
+    out_dir: str,
+    fmt: str = 'parquet',
+    compression: Optional[str] = 'zstd'
+) -> Dict[str, int]:
+    """Exporte les crawls terminés pas encore exportés et le catalogue courant.
+
+    Args:
+        conn: Connexion à la base (schéma à jour)
+        out_dir: Répertoire de sortie (créé au besoin)
+        fmt: 'parquet' ou 'arrow' (Arrow IPC, lisible sans copie par memory-map
+            quand il n'est pas compressé)
+        compression: Codec ('zstd', 'lz4', 'snappy' pour Parquet...) ou None
+
+    Returns:
+        Nombre de runs exportés, de lignes d'historique et de livres
+    """
+    require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Format d'export invalide: {fmt} ({', '.join(FORMATS)})")
+    extension = FORMATS[fmt]
+    base = Path(out_dir)
+
+    runs = 0
+    history_rows = 0
+    for run_id, crawl_date in conn.execute(PENDING_RUNS_SQL).fetchall():
+        path = base / 'history' / f'crawl_date={crawl_date}' / f'run-{run_id:06d}{extension}'
+        if path.exists():
+            continue
+        history_rows += _write_query(
+            conn, HISTORY_SQL, (run_id,), HISTORY_COLUMNS, path, fmt, compression
+        )
+        runs += 1
+
+    books = _write_query(
+        conn, CURRENT_SQL, (), CURRENT_COLUMNS, base / f'current{extension}', fmt, compression
+    )
+    return {'runs': runs, 'history_rows': history_rows, 'books': books}
+
+
+def main(argv=None):
+    data_dir = Path(__file__).parent.parent.parent / 'data'
+    parser = argparse.ArgumentParser(description="Export colonnaire de la base (Parquet / Arrow)")
+    parser.add_argument('db_path', nargs='?', default=str(data_dir / 'books.db'))
+    parser.add_argument('out_dir', nargs='?', default=str(data_dir / 'snapshots'))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='parquet')
+    parser.add_argument('--compression', default='zstd', help="codec, ou 'none'")
+    args = parser.parse_args(argv)
+
+    compression = None if args.compression == 'none' else args.compression
+    conn = sqlite3.connect(args.db_path)
+    try:
+        apply_migrations(conn)
+        result = export_snapshot(conn, args.out_dir, args.format, compression)
+    finally:
+        conn.close()
+    print(f"{result['runs']} crawl(s) exporté(s) ({result['history_rows']} lignes d'historique), "
+          f"{result['books']} livres dans {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
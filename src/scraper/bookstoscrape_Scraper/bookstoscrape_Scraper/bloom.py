@@ -0,0 +1,165 @@
+"""Filtres de Bloom pour la détection de doublons à mémoire bornée.
+
+``BloomFilter`` : tableau de bits de taille fixe, ``k`` positions par clé
+(double hachage de Kirsch-Mitzenmacher sur un condensé BLAKE2b de 128
+bits). Pas de faux négatif ; les faux positifs suivent ``error_rate`` tant
+que le filtre ne dépasse pas sa capacité.
+
+``ScalableBloomFilter`` : suite de filtres (Almeida et al., 2007). Quand le
+dernier est plein, un filtre deux fois plus grand et deux fois plus strict
+est ajouté, ce qui garde le taux global sous ``error_rate``, tant que la
+mémoire totale reste sous ``max_bytes``. Au-delà, le dernier filtre se
+remplit au-delà de sa capacité : la mémoire reste bornée, le taux de faux
+positifs augmente.
+
+Un filtre seul ne suffit pas pour écarter un item : ``BloomSeenSet``
+confirme chaque réponse positive dans un ensemble exact sur disque
+(``SQLiteSeenSet``), consulté seulement dans ce cas.
+"""
+import hashlib
+import math
+from typing import Iterable, List, Tuple
+
+
+def key_hashes(key: str) -> Tuple[int, int]:
+    """Deux hachages 64 bits indépendants d'une clé (``h2`` impair)."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Filtre de Bloom de capacité fixe."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity < 1:
+            raise ValueError("capacity doit être au moins 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate doit être compris entre 0 et 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def bytes_for(capacity: int, error_rate: float) -> int:
+        """Taille du tableau de bits d'un filtre, sans le créer."""
+        return (max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)) + 7) // 8
+
+    def add(self, key: str) -> bool:
+        """Ajoute ``key`` ; ``True`` si au moins un bit était à 0 (clé forcément nouvelle)."""
+        return self.add_hashes(*key_hashes(key))
+
+    def __contains__(self, key: str) -> bool:
+        return self.contains_hashes(*key_hashes(key))
+
+    def add_hashes(self, h1: int, h2: int) -> bool:
+        bits, num_bits = self.bits, self.num_bits
+        added = False
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def contains_hashes(self, h1: int, h2: int) -> bool:
+        bits, num_bits = self.bits, self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+class ScalableBloomFilter:
+    """Filtres de Bloom chaînés, dans une enveloppe mémoire fixe."""
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity: int = 100_000, error_rate: float = 0.001, max_bytes: int = 8 * 1024 * 1024):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.max_bytes = max_bytes
+        self.filters: List[BloomFilter] = []
+        self.saturated = False
+        self._grow()
+
+    def _grow(self) -> bool:
+        """Ajoute un filtre si l'enveloppe mémoire le permet."""
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.GROWTH ** index
+        error_rate = self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** index
+        if not self.filters:
+            # Le premier filtre tient toujours dans l'enveloppe, quitte à être plus petit
+            capacity = min(capacity, max(1, int(self.max_bytes * 8 * math.log(2) ** 2 / -math.log(error_rate))))
+        elif self.nbytes + BloomFilter.bytes_for(capacity, error_rate) > self.max_bytes:
+            self.saturated = True
+            return False
+        self.filters.append(BloomFilter(capacity, error_rate))
+        return True
+
+    def add(self, key: str) -> bool:
+        """Ajoute ``key`` ; ``False`` si elle est peut-être déjà présente."""
+        hashes = key_hashes(key)
+        if any(f.contains_hashes(*hashes) for f in self.filters):
+            return False
+        current = self.filters[-1]
+        if current.count >= current.capacity and not self.saturated and self._grow():
+            current = self.filters[-1]
+        current.add_hashes(*hashes)
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        hashes = key_hashes(key)
+        return any(f.contains_hashes(*hashes) for f in self.filters)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(f.nbytes for f in self.filters)
+
+
+class BloomSeenSet:
+    """Ensemble exact à mémoire bornée : filtre en mémoire, vérité sur disque.
+
+    Une clé absente du filtre est nouvelle à coup sûr (une écriture sur
+    disque, aucune lecture) ; une réponse positive est confirmée par
+    ``exact`` (un ``SQLiteSeenSet``).
+    """
+
+    def __init__(self, bloom: ScalableBloomFilter, exact):
+        self.bloom = bloom
+        self.exact = exact
+        self.hits = 0
+        self.false_positives = 0
+
+    def load(self, keys: Iterable[str]):
+        """Recharge le filtre depuis les clés déjà présentes dans ``exact``."""
+        for key in keys:
+            self.bloom.add(key)
+
+    def add(self, key: str) -> bool:
+        """Ajoute ``key`` ; ``True`` si elle n'y était pas."""
+        if self.bloom.add(key):
+            self.exact.add(key)
+            return True
+        self.hits += 1
+        if self.exact.add(key):
+            self.false_positives += 1
+            return True
+        return False
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.bloom and key in self.exact
@@ -0,0 +1 @@
+# Commandes Scrapy du projet (setting COMMANDS_MODULE)
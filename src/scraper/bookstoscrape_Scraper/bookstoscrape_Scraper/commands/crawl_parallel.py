@@ -0,0 +1,392 @@
+"""Commande ``scrapy crawl_parallel`` : crawl complet réparti par catégorie.
+
+Le crawl standard suit une seule chaîne de pagination : la page N+1 n'est
+connue qu'après la page N. Le coordinateur lit une fois la barre latérale
+des catégories (page d'accueil, depuis le cache HTTP si possible), répartit
+les catégories entre N processus ``scrapy crawl ... -a categories=...``
+puis agrège leurs statistiques.
+
+- Écritures : chaque worker écrit directement dans la même base, en WAL ;
+  les lots attendent le verrou d'écriture (``SQLITE_BUSY_TIMEOUT``) au lieu
+  d'échouer. Les workers ne finalisent pas (``SQLITE_FINALIZE = False``) :
+  statistiques par catégorie et version des données sont recalculées une
+  seule fois, après le dernier worker. Le coordinateur ouvre un seul
+  ``crawl_runs`` pour tous les workers (``SQLITE_RUN_ID``) : un crawl
+  parallèle est une seule date d'historique et un seul instantané.
+- Politesse : les plafonds par domaine (``ADAPTIVE_THROTTLE_MAX_CONCURRENCY``,
+  ``ADAPTIVE_THROTTLE_MIN_DELAY``, ``DOWNLOAD_DELAY``) sont répartis entre
+  les workers ; ensemble, ils ne dépassent pas le budget d'un crawl seul.
+  Chaque worker garde au moins une requête en vol : ``--workers`` ne peut
+  donc pas dépasser le plafond de concurrence (voir ``concurrency_ceiling``),
+  et vaut par défaut ``DEFAULT_WORKERS`` ramené à ce plafond.
+- Répartition : les plus grosses catégories d'abord, chacune au worker le
+  moins chargé (tailles connues par ``books.db``).
+
+Logs et statistiques JSON des workers : ``.scrapy/crawl_parallel/<date>/``.
+
+Avec ``-s JOBDIR=...``, chaque worker a sa frontière reprenable
+(``<JOBDIR>/worker_<i>``) et la répartition est enregistrée dans
+``<JOBDIR>/shards.json`` : relancer la même commande reprend chaque
+worker sur ses catégories.
+
+Exemples (depuis ``src/scraper/bookstoscrape_Scraper``) ::
+
+    scrapy crawl_parallel --workers 4
+    scrapy crawl_parallel --workers 8 -a mode=fast --stats-output stats.json
+    scrapy crawl_parallel --workers 4 -s JOBDIR=crawls/parallel-1
+"""
+import heapq
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from parsel import Selector
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.conf import arglist_to_dict, closest_scrapy_cfg
+from scrapy.utils.project import data_path
+
+from bookstoscrape_Scraper.httpcache import cached_body
+from bookstoscrape_Scraper.pipelines import PROJECT_ROOT
+from src.database.aggregates import refresh_category_stats
+from src.database.data_version import bump_data_version
+from src.database.migrations import apply_migrations
+from src.database.price_summary import refresh_price_summary
+from src.database.snapshots import export_snapshot, require_pyarrow
+
+SPIDER_NAME = "booktoscrape_Scraper"
+HOMEPAGE = "https://books.toscrape.com/"
+DEFAULT_WORKERS = 4
+
+# Répartition d'un job reprenable : un worker repris doit retrouver ses catégories
+SHARDS_FILE = "shards.json"
+
+Category = Tuple[str, str]
+
+
+def parse_categories(html: str, base_url: str = HOMEPAGE) -> List[Category]:
+    """Catégories (nom, URL absolue) de la barre latérale de la page d'accueil."""
+    selector = Selector(text=html)
+    categories = []
+    for link in selector.css("div.side_categories ul li ul li a"):
+        name = " ".join(link.css("::text").get("").split())
+        href = link.attrib.get("href")
+        if name and href:
+            categories.append((name, urllib.request.urljoin(base_url, href)))
+    return categories
+
+
+def category_sizes(db_path: str) -> Dict[str, int]:
+    """Nombre de livres par catégorie dans la base (vide au premier crawl)."""
+    if not Path(db_path).exists():
+        return {}
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return dict(conn.execute("SELECT category, COUNT(*) FROM books GROUP BY category"))
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def assign_categories(
+    categories: List[Category],
+    workers: int,
+    sizes: Optional[Dict[str, int]] = None
+) -> List[List[Category]]:
+    """Répartit les catégories : la plus grosse d'abord, au worker le moins chargé.
+
+    Une catégorie de taille inconnue compte comme la taille moyenne connue.
+    Les workers sans catégorie sont retirés.
+    """
+    sizes = sizes or {}
+    default = sum(sizes.values()) / len(sizes) if sizes else 1
+    weighted = sorted(categories, key=lambda c: (-sizes.get(c[0], default), c[0]))
+
+    shards: List[List[Category]] = [[] for _ in range(max(1, workers))]
+    loads = [(0.0, index) for index in range(len(shards))]
+    for category in weighted:
+        load, index = heapq.heappop(loads)
+        shards[index].append(category)
+        heapq.heappush(loads, (load + sizes.get(category[0], default), index))
+    return [shard for shard in shards if shard]
+
+
+def load_shards(jobdir: str) -> Optional[List[List[Category]]]:
+    """Répartition enregistrée d'un job (``None`` au premier lancement)."""
+    path = Path(jobdir, SHARDS_FILE)
+    if not path.exists():
+        return None
+    return [[tuple(category) for category in shard] for shard in json.loads(path.read_text(encoding="utf-8"))]
+
+
+def save_shards(jobdir: str, shards: List[List[Category]]):
+    Path(jobdir).mkdir(parents=True, exist_ok=True)
+    Path(jobdir, SHARDS_FILE).write_text(json.dumps(shards, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def combine_stats(worker_stats: List[Dict]) -> Dict:
+    """Agrège les statistiques des workers.
+
+    Compteurs additionnés ; maxima (``max`` dans la clé), délais et durée
+    (``elapsed_time_seconds``) : valeur la plus haute ; ``start_time`` la plus
+    tôt, ``finish_time`` la plus tardive ; autres valeurs gardées si
+    identiques, listées sinon.
+    """
+    combined: Dict = {}
+    for stats in worker_stats:
+        for key, value in stats.items():
+            last = key.rsplit("/", 1)[-1]
+            if key not in combined:
+                combined[key] = value
+            elif key == "start_time":
+                combined[key] = min(combined[key], value)
+            elif key == "finish_time" or "max" in last or last in ("delay", "elapsed_time_seconds"):
+                combined[key] = max(combined[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                combined[key] += value
+            elif combined[key] != value:
+                values = combined[key] if isinstance(combined[key], list) else [combined[key]]
+                if value not in values:
+                    combined[key] = values + [value]
+
+    not_modified = combined.get("revalidation/not_modified", 0)
+    revalidated = not_modified + combined.get("revalidation/modified", 0)
+    if revalidated:
+        combined["revalidation/not_modified_ratio"] = round(not_modified / revalidated, 4)
+    return combined
+
+
+def concurrency_ceiling(settings) -> int:
+    """Requêtes simultanées autorisées sur le domaine, tous workers confondus.
+
+    ``ADAPTIVE_THROTTLE_MAX_CONCURRENCY`` avec le throttle adaptatif, sinon
+    ``CONCURRENT_REQUESTS_PER_DOMAIN``.
+    """
+    if settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+        return max(1, settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY", 8))
+    return max(1, settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"))
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [spider]"
+
+    def short_desc(self):
+        return "Crawl complet réparti par catégorie sur plusieurs processus"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("-w", "--workers", type=int,
+                            help=f"nombre de processus (défaut : {DEFAULT_WORKERS}, au plus le "
+                                 "plafond de concurrence par domaine)")
+        parser.add_argument("-a", dest="spargs", action="append", default=[], metavar="NAME=VALUE",
+                            help="argument transmis au spider de chaque worker (ex. mode=fast)")
+        parser.add_argument("--stats-output", metavar="FICHIER",
+                            help="écrit les statistiques agrégées en JSON")
+
+    def process_options(self, args, opts):
+        super().process_options(args, opts)
+        try:
+            opts.spargs = arglist_to_dict(opts.spargs)
+        except ValueError:
+            raise UsageError("Argument -a invalide, utiliser -a NAME=VALUE", print_help=False)
+        if "categories" in opts.spargs:
+            raise UsageError("categories est fixé par le coordinateur", print_help=False)
+        ceiling = concurrency_ceiling(self.settings)
+        if opts.workers is None:
+            opts.workers = min(DEFAULT_WORKERS, ceiling)
+            return
+        if opts.workers < 1:
+            raise UsageError("--workers doit être au moins 1", print_help=False)
+        if opts.workers > ceiling:
+            raise UsageError(
+                f"--workers {opts.workers} dépasse le plafond de {ceiling} requêtes simultanées "
+                f"par domaine : au plus {ceiling} workers",
+                print_help=False
+            )
+
+    def run(self, args, opts):
+        spider = args[0] if args else SPIDER_NAME
+        db_path = self.settings.get("SQLITE_DB_PATH") or os.path.join(PROJECT_ROOT, "data", "books.db")
+        if self.settings.get("SNAPSHOT_DIR"):
+            try:
+                require_pyarrow()
+            except ValueError as e:
+                raise UsageError(str(e), print_help=False)
+        self._prepare_database(db_path)
+        run_id = self._open_run(db_path)
+
+        jobdir = self.settings.get("JOBDIR")
+        shards = load_shards(jobdir) if jobdir else None
+        if shards is None:
+            categories = parse_categories(self._homepage(spider))
+            if not categories:
+                raise UsageError("Aucune catégorie trouvée sur la page d'accueil")
+            shards = assign_categories(categories, opts.workers, category_sizes(db_path))
+            if jobdir:
+                save_shards(jobdir, shards)
+        else:
+            categories = [category for shard in shards for category in shard]
+            print(f"Reprise du job {jobdir} : répartition conservée")
+
+        run_dir = Path(data_path("crawl_parallel")) / datetime.now().strftime("%Y%m%d-%H%M%S")
+        run_dir.mkdir(parents=True, exist_ok=True)
+        print(f"{len(categories)} catégories, {len(shards)} workers, base {db_path}")
+        print(f"Logs et statistiques des workers : {run_dir}")
+
+        start = time.perf_counter()
+        processes = [
+            self._start_worker(spider, index, shard, len(shards), db_path, run_id, run_dir, opts)
+            for index, shard in enumerate(shards)
+        ]
+        exit_codes = [process.wait() for process in processes]
+        wall_clock = time.perf_counter() - start
+        # Même si des workers ont échoué, leurs lots commités sont en base :
+        # tables dérivées et version des données sont recalculées dès qu'un lot a été écrit
+        if self._close_run(db_path, run_id):
+            self._finalize(db_path, self.settings.get("SNAPSHOT_DIR"),
+                           self.settings.get("SNAPSHOT_FORMAT", "parquet"))
+
+        worker_stats = []
+        print(f"\n{'worker':>6} {'catégories':>11} {'items':>7} {'requêtes':>9} {'durée (s)':>10} {'code':>5}")
+        for index, (shard, code) in enumerate(zip(shards, exit_codes)):
+            stats_path = run_dir / f"worker_{index}.json"
+            stats = json.loads(stats_path.read_text(encoding="utf-8")) if stats_path.exists() else {}
+            worker_stats.append(stats)
+            print(f"{index:>6} {len(shard):>11} {stats.get('item_scraped_count', 0):>7} "
+                  f"{stats.get('downloader/request_count', 0):>9} "
+                  f"{stats.get('elapsed_time_seconds', 0):>10.1f} {code:>5}")
+
+        combined = combine_stats(worker_stats)
+        combined["parallel/workers"] = len(shards)
+        combined["parallel/categories"] = len(categories)
+        combined["parallel/failed_workers"] = sum(1 for code in exit_codes if code != 0)
+        combined["parallel/wall_clock_seconds"] = round(wall_clock, 3)
+        items = combined.get("item_scraped_count", 0)
+        print(f"\nTotal : {items} items, {combined.get('downloader/request_count', 0)} requêtes "
+              f"en {wall_clock:.1f} s ({items / wall_clock:.1f} items/s)")
+
+        if opts.stats_output:
+            with open(opts.stats_output, "w", encoding="utf-8") as f:
+                json.dump(combined, f, default=str, indent=2, sort_keys=True)
+        if combined["parallel/failed_workers"]:
+            self.exitcode = 1
+
+    def _prepare_database(self, db_path: str):
+        """Schéma à jour et mode WAL avant que les workers n'ouvrent la base."""
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(f"PRAGMA journal_mode = {self.settings.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+            apply_migrations(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _open_run(db_path: str) -> int:
+        """Run unique du crawl parallèle, transmis aux workers (``SQLITE_RUN_ID``)."""
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                return conn.execute(
+                    "INSERT INTO crawl_runs (started_at) VALUES (?)", (datetime.now().isoformat(),)
+                ).lastrowid
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _close_run(db_path: str, run_id: int) -> bool:
+        """Clôt le run ; ``False`` (run supprimé) si aucun worker n'a écrit de lot.
+
+        Les workers datent le run à chaque lot écrit : ``finished_at`` vide
+        signifie qu'aucune écriture n'a abouti.
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                written = conn.execute(
+                    "UPDATE crawl_runs SET finished_at = ? WHERE id = ? AND finished_at IS NOT NULL",
+                    (datetime.now().isoformat(), run_id)
+                ).rowcount == 1
+                if not written:
+                    conn.execute("DELETE FROM crawl_runs WHERE id = ?", (run_id,))
+            return written
+        finally:
+            conn.close()
+
+    def _homepage(self, spider: str) -> str:
+        """Page d'accueil : cache HTTP du spider si l'entrée est valide, sinon téléchargement."""
+        body = None
+        if self.settings.getbool("HTTPCACHE_ENABLED"):
+            body = cached_body(self.settings, spider, HOMEPAGE)
+        if body is None:
+            request = urllib.request.Request(
+                HOMEPAGE, headers={"User-Agent": self.settings.get("USER_AGENT")}
+            )
+            with urllib.request.urlopen(request, timeout=self.settings.getfloat("DOWNLOAD_TIMEOUT", 180)) as f:
+                body = f.read()
+        return body.decode("utf-8", errors="replace")
+
+    def _worker_settings(self, workers: int, db_path: str, run_dir: Path, index: int,
+                         run_id: Optional[int] = None) -> Dict:
+        """Settings d'un worker : base et run partagés, budget de politesse divisé par N."""
+        settings = self.settings
+        worker_settings = {
+            "SQLITE_DB_PATH": db_path,
+            "SQLITE_FINALIZE": False,
+            "STATS_EXPORT_PATH": str(run_dir / f"worker_{index}.json"),
+            "LOG_FILE": str(run_dir / f"worker_{index}.log"),
+            "ADAPTIVE_THROTTLE_MAX_CONCURRENCY": max(
+                1, settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY", 8) // workers
+            ),
+            "ADAPTIVE_THROTTLE_MIN_DELAY": settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY", 0.1) * workers,
+            "DOWNLOAD_DELAY": settings.getfloat("DOWNLOAD_DELAY") * workers,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": max(
+                1, settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN") // workers
+            ),
+        }
+        if run_id is not None:
+            worker_settings["SQLITE_RUN_ID"] = run_id
+        if settings.get("JOBDIR"):
+            # Une frontière par worker, sous le JOBDIR du coordinateur
+            worker_settings["JOBDIR"] = str(Path(settings.get("JOBDIR"), f"worker_{index}"))
+        return worker_settings
+
+    def _start_worker(self, spider, index, shard, workers, db_path, run_id, run_dir, opts) -> subprocess.Popen:
+        command = [sys.executable, "-m", "scrapy", "crawl", spider,
+                   "-a", "categories=" + ",".join(url for _, url in shard)]
+        for name, value in opts.spargs.items():
+            command += ["-a", f"{name}={value}"]
+        # -s de la ligne de commande d'abord : les réglages du worker priment
+        worker_settings = {"LOG_LEVEL": "INFO"}
+        worker_settings.update(arglist_to_dict(opts.set))
+        worker_settings.update(self._worker_settings(workers, db_path, run_dir, index, run_id))
+        for name, value in worker_settings.items():
+            command += ["-s", f"{name}={value}"]
+        return subprocess.Popen(command, cwd=os.path.dirname(closest_scrapy_cfg()))
+
+    @staticmethod
+    def _finalize(db_path: str, snapshot_dir: Optional[str] = None, snapshot_format: str = "parquet"):
+        """Fin de crawl, une seule fois pour tous les workers."""
+        conn = sqlite3.connect(db_path)
+        try:
+            refresh_category_stats(conn)
+            refresh_price_summary(conn)
+            bump_data_version(conn)
+            if snapshot_dir:
+                result = export_snapshot(conn, snapshot_dir, snapshot_format)
+                print(f"Instantané {snapshot_format} : {result['runs']} crawl(s), "
+                      f"{result['books']} livres dans {snapshot_dir}")
+        finally:
+            conn.close()
@@ -0,0 +1,105 @@
+"""Commande ``scrapy httpcache`` : statistiques, éviction et compaction du
+cache HTTP SQLite (``bookstoscrape_Scraper.httpcache.SQLiteCacheStorage``).
+
+Exemples (depuis ``src/scraper/bookstoscrape_Scraper``) ::
+
+    scrapy httpcache                                   # statistiques
+    scrapy httpcache --max-age 604800 --compact        # > 7 jours, puis VACUUM
+    scrapy httpcache --max-size 200 --compact          # garde les 200 Mo les plus récents
+    scrapy httpcache --import-filesystem               # reprend l'ancien cache FilesystemCacheStorage
+"""
+from pathlib import Path
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.project import data_path
+
+from bookstoscrape_Scraper.httpcache import (
+    Codec,
+    cache_db_path,
+    cache_stats,
+    compact,
+    connect,
+    evict,
+    import_filesystem_cache,
+)
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} Mo"
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [spider ...]"
+
+    def short_desc(self):
+        return "Statistiques, éviction et compaction du cache HTTP SQLite"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--max-age", type=float, metavar="SECONDES",
+                            help="supprime les entrées plus anciennes")
+        parser.add_argument("--max-size", type=float, metavar="MO",
+                            help="supprime les entrées les plus anciennes au-delà de cette taille")
+        parser.add_argument("--compact", action="store_true",
+                            help="réécrit le fichier (VACUUM) pour rendre l'espace libéré")
+        parser.add_argument("--import-filesystem", action="store_true",
+                            help="importe le cache FilesystemCacheStorage existant du spider")
+
+    def run(self, args, opts):
+        spiders = args or self._cached_spiders()
+        if not spiders:
+            raise UsageError("Aucun cache SQLite trouvé ; préciser le nom du spider")
+
+        for name in spiders:
+            path = cache_db_path(self.settings, name)
+            if not path.exists() and not opts.import_filesystem:
+                print(f"{name} : pas de cache ({path})")
+                continue
+
+            conn = connect(path)
+            try:
+                if opts.import_filesystem:
+                    self._import(conn, name)
+                if opts.max_age is not None or opts.max_size is not None:
+                    max_bytes = int(opts.max_size * 1024 * 1024) if opts.max_size is not None else None
+                    removed = evict(conn, max_age=opts.max_age, max_bytes=max_bytes)
+                    print(f"{name} : {removed} entrées supprimées")
+                if opts.compact:
+                    before = cache_stats(conn)["file_bytes"]
+                    compact(conn)
+                    after = cache_stats(conn)["file_bytes"]
+                    print(f"{name} : compaction {_mb(before)} → {_mb(after)}")
+                self._print_stats(name, path, cache_stats(conn))
+            finally:
+                conn.close()
+
+    def _cached_spiders(self):
+        cache_dir = Path(data_path(self.settings["HTTPCACHE_DIR"]))
+        return sorted(path.stem for path in cache_dir.glob("*.sqlite"))
+
+    def _import(self, conn, name):
+        spider_dir = Path(data_path(self.settings["HTTPCACHE_DIR"])) / name
+        if not spider_dir.is_dir():
+            raise UsageError(f"Pas de cache FilesystemCacheStorage dans {spider_dir}")
+        codec = Codec(
+            self.settings.get("HTTPCACHE_SQLITE_COMPRESSION", "zlib"),
+            self.settings.getint("HTTPCACHE_SQLITE_COMPRESSION_LEVEL", 6)
+        )
+        count = import_filesystem_cache(
+            conn, spider_dir, codec, use_gzip=self.settings.getbool("HTTPCACHE_GZIP")
+        )
+        print(f"{name} : {count} entrées importées depuis {spider_dir}")
+
+    @staticmethod
+    def _print_stats(name, path, stats):
+        ratio = stats["stored_bytes"] / stats["body_bytes"] if stats["body_bytes"] else 0
+        print(f"{name} : {path}")
+        print(f"  entrées          : {stats['entries']}")
+        print(f"  corps (brut)     : {_mb(stats['body_bytes'])}")
+        print(f"  stocké (compressé) : {_mb(stats['stored_bytes'])} ({ratio:.0%})")
+        print(f"  fichier          : {_mb(stats['file_bytes'])} dont {_mb(stats['free_bytes'])} libres")
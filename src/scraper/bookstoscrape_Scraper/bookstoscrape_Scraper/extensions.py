@@ -0,0 +1,291 @@
+"""Extensions Scrapy du projet.
+
+``StatsExport`` écrit les statistiques finales du crawl dans un fichier JSON
+(``STATS_EXPORT_PATH``) ; ``scrapy crawl_parallel`` s'en sert pour agréger
+les statistiques de ses workers.
+
+``AdaptiveThrottle`` remplace le couple fixe ``DOWNLOAD_DELAY`` /
+``CONCURRENT_REQUESTS_PER_DOMAIN`` par un contrôleur AIMD (additive
+increase, multiplicative decrease) par slot de téléchargement :
+
+- fenêtre saine (peu d'erreurs, latence proche de la référence) : le délai
+  est divisé par deux jusqu'au plancher, puis la concurrence augmente de 1 ;
+  jusqu'au premier signal de congestion (démarrage lent, comme TCP), le
+  délai est divisé par quatre et la concurrence doublée ;
+- latence moyenne de la fenêtre qui dépasse la référence
+  (``ADAPTIVE_THROTTLE_LATENCY_TOLERANCE`` fois) ou taux d'erreurs
+  (5xx, échecs réseau) au-dessus de ``ADAPTIVE_THROTTLE_ERROR_RATE`` :
+  la concurrence est divisée par deux ;
+- 429 / 503 : recul immédiat, concurrence divisée par deux et délai doublé ;
+  le slot est suspendu pendant ``Retry-After`` s'il est fourni, et le délai
+  en vigueur (+20 %) devient un plancher pour le reste du crawl : le
+  contrôleur ne revient pas sonder un débit que le serveur a refusé.
+
+La fenêtre compte ``max(4, concurrence)`` réponses ; après une baisse, les
+réponses des requêtes déjà parties sont ignorées (une seule baisse par
+« aller-retour », comme TCP). Le plafond de politesse est strict :
+jamais plus de ``ADAPTIVE_THROTTLE_MAX_CONCURRENCY`` requêtes simultanées
+ni moins de ``ADAPTIVE_THROTTLE_MIN_DELAY`` secondes entre deux envois.
+``RANDOMIZE_DOWNLOAD_DELAY`` est donc ignoré sur les slots gérés : le tirage
+entre 0,5 et 1,5 fois le délai descendrait sous ce plancher.
+``DOWNLOAD_DELAY`` et ``CONCURRENT_REQUESTS_PER_DOMAIN`` ne sont plus que
+les valeurs de départ.
+
+Statistiques : ``adaptive_throttle/increase``, ``adaptive_throttle/delay_decrease``,
+``adaptive_throttle/ceiling``, ``adaptive_throttle/decrease/<raison>``
+(``latency``, ``errors``, ``429``, ``503``), ``adaptive_throttle/retry_after``,
+``adaptive_throttle/max_concurrency`` et, à la fermeture,
+``adaptive_throttle/<slot>/concurrency`` et ``adaptive_throttle/<slot>/delay``.
+"""
+import json
+import logging
+from time import time
+from typing import Dict, Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class _SlotState:
+    """Fenêtre de mesure et latence de référence d'un slot."""
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.baseline: Optional[float] = None
+        self.skip = 0
+        self.slow_start = True
+        self.delay_floor = 0.0
+        self.reset_window()
+
+    def reset_window(self):
+        self.responses = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_count = 0
+
+
+class AdaptiveThrottle:
+    """Contrôleur AIMD de la concurrence et du délai par slot."""
+
+    THROTTLE_CODES = (429, 503)
+    MIN_WINDOW = 4
+    # Écart de latence absolu toléré : évite de réagir à la gigue sur des
+    # réponses de quelques millisecondes
+    LATENCY_SLACK = 0.1
+    # Premier palier de délai lors d'un recul depuis un délai nul
+    BACKOFF_DELAY = 0.1
+
+    def __init__(self, settings, stats):
+        self.stats = stats
+        self.max_concurrency = max(1, settings.getint('ADAPTIVE_THROTTLE_MAX_CONCURRENCY', 8))
+        self.min_delay = settings.getfloat('ADAPTIVE_THROTTLE_MIN_DELAY', 0.1)
+        self.max_delay = settings.getfloat('ADAPTIVE_THROTTLE_MAX_DELAY', 60.0)
+        self.latency_tolerance = settings.getfloat('ADAPTIVE_THROTTLE_LATENCY_TOLERANCE', 2.0)
+        self.max_error_rate = settings.getfloat('ADAPTIVE_THROTTLE_ERROR_RATE', 0.1)
+        self.debug = settings.getbool('ADAPTIVE_THROTTLE_DEBUG')
+        self.crawler = None
+        self.slots: Dict[str, _SlotState] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        if settings.getbool('AUTOTHROTTLE_ENABLED'):
+            raise NotConfigured("AdaptiveThrottle et AutoThrottle ne peuvent pas être activés ensemble")
+
+        s = cls(settings, crawler.stats)
+        s.crawler = crawler
+        crawler.signals.connect(s.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(s.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(s.request_left_downloader, signal=signals.request_left_downloader)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def _get_slot(self, request):
+        key = request.meta.get('download_slot')
+        if key is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def request_reached_downloader(self, request, spider):
+        key, slot = self._get_slot(request)
+        if slot is not None:
+            self.state(key, slot)
+
+    def response_downloaded(self, response, request, spider):
+        # Marque la requête : request_left_downloader la comptera comme réussie
+        request.meta['_adaptive_throttle_seen'] = True
+        key, slot = self._get_slot(request)
+        if slot is None:
+            return
+        retry_after = None
+        if response.status in self.THROTTLE_CODES:
+            retry_after = self._retry_after(response)
+        self.record(key, slot, spider, response.status, request.meta.get('download_latency'), retry_after)
+
+    def request_left_downloader(self, request, spider):
+        if request.meta.pop('_adaptive_throttle_seen', False):
+            return
+        # Aucune réponse : échec du téléchargement (timeout, connexion refusée...)
+        key, slot = self._get_slot(request)
+        if slot is not None:
+            self.record(key, slot, spider)
+
+    def spider_closed(self, spider):
+        for key, state in self.slots.items():
+            self.stats.set_value(f'adaptive_throttle/{key}/concurrency', state.slot.concurrency, spider=spider)
+            self.stats.set_value(f'adaptive_throttle/{key}/delay', round(state.slot.delay, 3), spider=spider)
+
+    def state(self, key: str, slot) -> _SlotState:
+        """État du slot ; un slot recréé par le downloader repart des valeurs de départ."""
+        state = self.slots.get(key)
+        if state is None or state.slot is not slot:
+            slot.concurrency = min(max(1, slot.concurrency), self.max_concurrency)
+            slot.delay = min(max(slot.delay, self.min_delay), self.max_delay)
+            # Délai exact : un délai tiré au hasard passerait sous min_delay
+            slot.randomize_delay = False
+            state = self.slots[key] = _SlotState(slot)
+        return state
+
+    def record(
+        self,
+        key: str,
+        slot,
+        spider,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None
+    ):
+        """Enregistre une réponse (``status=None`` : échec de téléchargement)."""
+        state = self.state(key, slot)
+        if state.skip > 0:
+            # Requête partie avant la dernière baisse : elle ne dit rien du nouveau réglage
+            state.skip -= 1
+            return
+
+        if status in self.THROTTLE_CODES:
+            self.throttled(key, state, spider, status, retry_after)
+            return
+
+        state.responses += 1
+        if status is None or status >= 500:
+            state.errors += 1
+        elif latency is not None:
+            state.latency_total += latency
+            state.latency_count += 1
+
+        if state.responses >= max(self.MIN_WINDOW, slot.concurrency):
+            self.decide(key, state, spider)
+
+    def decide(self, key: str, state: _SlotState, spider):
+        """Fin de fenêtre : augmentation additive ou baisse multiplicative."""
+        slot = state.slot
+        error_rate = state.errors / state.responses
+        mean = state.latency_total / state.latency_count if state.latency_count else None
+        baseline = state.baseline
+        state.reset_window()
+
+        if mean is not None:
+            # Référence : descend immédiatement, remonte lentement (serveur durablement plus lent)
+            if baseline is None or mean < baseline:
+                state.baseline = mean
+            else:
+                state.baseline = baseline + (mean - baseline) * 0.1
+
+        if error_rate > self.max_error_rate:
+            self.decrease(key, state, spider, 'errors', backoff=slot.concurrency == 1)
+        elif mean is not None and baseline is not None and mean > max(
+            baseline * self.latency_tolerance, baseline + self.LATENCY_SLACK
+        ):
+            self.decrease(key, state, spider, 'latency')
+        elif slot.delay > max(self.min_delay, state.delay_floor):
+            slot.delay = max(self.min_delay, state.delay_floor, slot.delay / (4 if state.slow_start else 2))
+            self._log(key, slot, spider, 'delay_decrease')
+        elif slot.concurrency < self.max_concurrency:
+            slot.concurrency = min(
+                self.max_concurrency,
+                slot.concurrency * 2 if state.slow_start else slot.concurrency + 1
+            )
+            self.stats.max_value('adaptive_throttle/max_concurrency', slot.concurrency, spider=spider)
+            self._log(key, slot, spider, 'increase')
+        else:
+            self.stats.inc_value('adaptive_throttle/ceiling', spider=spider)
+
+    def throttled(self, key: str, state: _SlotState, spider, status: int, retry_after: Optional[float]):
+        """429 / 503 : le débit actuel est refusé, il devient la limite basse du délai."""
+        state.delay_floor = min(max(state.delay_floor, state.slot.delay * 1.2), self.max_delay)
+        self.decrease(key, state, spider, str(status), backoff=True, retry_after=retry_after)
+
+    def decrease(
+        self,
+        key: str,
+        state: _SlotState,
+        spider,
+        reason: str,
+        backoff: bool = False,
+        retry_after: Optional[float] = None
+    ):
+        """Divise la concurrence par deux ; ``backoff`` double aussi le délai.
+
+        ``retry_after`` suspend le slot : le downloader n'envoie rien avant
+        ``lastseen + delay``, reporté ici à ``maintenant + retry_after``.
+        """
+        slot = state.slot
+        slot.concurrency = max(1, slot.concurrency // 2)
+        if backoff:
+            slot.delay = min(max(slot.delay * 2, self.BACKOFF_DELAY), self.max_delay)
+        if retry_after is not None:
+            pause = min(retry_after, self.max_delay)
+            slot.lastseen = max(slot.lastseen, time() + pause - slot.delay)
+            self.stats.inc_value('adaptive_throttle/retry_after', spider=spider)
+        state.skip = len(slot.transferring)
+        state.slow_start = False
+        state.reset_window()
+        self._log(key, slot, spider, f'decrease/{reason}')
+
+    def _log(self, key: str, slot, spider, decision: str):
+        self.stats.inc_value(f'adaptive_throttle/{decision}', spider=spider)
+        logger.log(
+            logging.INFO if self.debug else logging.DEBUG,
+            "%(slot)s : %(decision)s -> concurrence %(concurrency)d, délai %(delay).2f s",
+            {'slot': key, 'decision': decision, 'concurrency': slot.concurrency, 'delay': slot.delay},
+            extra={'spider': spider}
+        )
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """``Retry-After`` en secondes (la forme date HTTP est ignorée)."""
+        value = response.headers.get(b'Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+
+class StatsExport:
+    """Écrit les statistiques du crawl en JSON à la fermeture du spider."""
+
+    def __init__(self, path: str, stats):
+        self.path = path
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get('STATS_EXPORT_PATH')
+        if not path:
+            raise NotConfigured
+        s = cls(path, crawler.stats)
+        # Connecté après CoreStats : finish_time et elapsed_time_seconds sont déjà posés
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_closed(self, spider, reason):
+        stats = dict(self.stats.get_stats(spider))
+        stats.setdefault('finish_reason', reason)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, default=str, indent=2, sort_keys=True)
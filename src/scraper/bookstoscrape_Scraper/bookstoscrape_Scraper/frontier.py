@@ -0,0 +1,409 @@
+"""Frontière de crawl persistante et reprenable (``JOBDIR``).
+
+Avec ``-s JOBDIR=crawls/<job>``, Scrapy garde déjà l'état d'un job, mais :
+
+- ``RFPDupeFilter`` recharge tout ``requests.seen`` dans un ``set`` ;
+- les files disque (queuelib) et ``active.json`` ne sont cohérents
+  qu'après un arrêt propre : un processus tué repart de zéro.
+
+Ici, la file des requêtes, les empreintes déjà vues et les UPC déjà
+enregistrés (``DuplicatesPipeline``) vivent dans un seul fichier SQLite,
+``<JOBDIR>/frontier.sqlite``, partagé par une seule connexion. Les
+opérations sont validées au plus toutes les ``COMMIT_INTERVAL`` secondes,
+et à la fermeture. Un job tué reprend au dernier commit : une empreinte
+n'est jamais validée sans la requête en file qui lui correspond, et une
+requête ne quitte la file qu'une fois ses requêtes filles planifiées et
+ses items écrits en base (``FrontierMiddleware``). La mémoire reste
+bornée par le cache de pages SQLite, quelle que soit la taille de la
+frontière.
+
+Sans ``JOBDIR``, ``ResumableScheduler`` et ``SQLiteDupeFilter`` se
+comportent comme le scheduler et le filtre par défaut de Scrapy, et
+``FrontierMiddleware`` est désactivé.
+"""
+import logging
+import pickle
+import sqlite3
+from pathlib import Path
+from time import monotonic
+from typing import Dict, Optional
+
+from scrapy import signals
+from scrapy.core.scheduler import Scheduler
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Request
+from scrapy.utils.job import job_dir
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+class FrontierStore:
+    """Connexion SQLite d'un job, partagée par le scheduler, le filtre et les pipelines.
+
+    ``open`` renvoie la même instance pour un même ``JOBDIR`` (compteur de
+    références) : une seule connexion, donc une seule transaction ouverte.
+
+    Une clé ajoutée pour le compte d'une requête en cours (UPC d'un item
+    pas encore écrit) est notée dans ``owned_keys`` (``own``) et oubliée
+    avec la requête. Au redémarrage, les clés encore notées sont retirées :
+    la requête rejouée ne voit pas son item écarté comme doublon.
+    """
+
+    FILENAME = "frontier.sqlite"
+    COMMIT_INTERVAL = 1.0
+
+    _stores: Dict[str, "FrontierStore"] = {}
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS owned_keys (request_id INTEGER NOT NULL, tbl TEXT NOT NULL, key BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_owned_keys_request ON owned_keys(request_id)")
+        self._forget_owned_keys()
+        self.conn.commit()
+        self.refs = 0
+        self.last_commit = monotonic()
+        # Requêtes en cours -> requêtes filles et items pas encore traités
+        self.pending: Dict[int, int] = {}
+        # Items en cours (id de l'objet) -> requête qui les a produits
+        self.items: Dict[int, int] = {}
+        # Vrai si un pipeline de stockage signale l'écriture des items (``item_done``)
+        self.tracks_commits = False
+
+    @classmethod
+    def open(cls, jobdir: str) -> "FrontierStore":
+        path = Path(jobdir, cls.FILENAME).resolve()
+        store = cls._stores.get(str(path))
+        if store is None:
+            store = cls._stores[str(path)] = cls(path)
+        store.refs += 1
+        return store
+
+    def changed(self):
+        """À appeler après chaque écriture : commit au plus toutes les ``COMMIT_INTERVAL`` s."""
+        if monotonic() - self.last_commit >= self.COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.last_commit = monotonic()
+
+    def _forget_owned_keys(self):
+        """Retire les clés des requêtes qui n'ont pas abouti avant l'arrêt."""
+        tables = [table for (table,) in self.conn.execute("SELECT DISTINCT tbl FROM owned_keys")]
+        for table in tables:
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE key IN (SELECT key FROM owned_keys WHERE tbl = ?)", (table,)
+            )
+        self.conn.execute("DELETE FROM owned_keys")
+
+    def own(self, table: str, key, request_id: int):
+        """Note que ``key`` a été ajoutée à ``table`` pour la requête en cours ``request_id``."""
+        self.conn.execute(
+            "INSERT INTO owned_keys (request_id, tbl, key) VALUES (?, ?, ?)", (request_id, table, key)
+        )
+        self.changed()
+
+    def settle(self, request_id: int, delta: int):
+        """Ajuste le nombre de requêtes filles et d'items encore à traiter
+        pour une requête en cours ; à zéro, elle quitte définitivement la file."""
+        remaining = self.pending.get(request_id, 0) + delta
+        if remaining:
+            self.pending[request_id] = remaining
+            return
+        self.pending.pop(request_id, None)
+        self.conn.execute("DELETE FROM requests_queue WHERE id = ?", (request_id,))
+        self.conn.execute("DELETE FROM owned_keys WHERE request_id = ?", (request_id,))
+        self.changed()
+
+    def hold(self, item, request_id: int):
+        """Item produit par une requête en cours, compté jusqu'à ``item_done``."""
+        self.items[id(item)] = request_id
+
+    def parent_of(self, item) -> Optional[int]:
+        return self.items.get(id(item))
+
+    def item_done(self, item):
+        """Item écrit en base (ou écarté) : décompté de sa requête."""
+        request_id = self.items.pop(id(item), None)
+        if request_id is not None:
+            self.settle(request_id, -1)
+
+    def forget(self, item):
+        """Item en erreur : sa requête reste en cours et sera rejouée à la reprise."""
+        self.items.pop(id(item), None)
+
+    def release(self):
+        """Libère une référence ; la dernière valide et ferme la connexion."""
+        self.refs -= 1
+        if self.refs > 0:
+            return
+        self.commit()
+        self.conn.close()
+        self._stores.pop(str(self.path), None)
+
+
+class SQLiteSeenSet:
+    """Ensemble persistant de clés (table SQLite à clé primaire)."""
+
+    def __init__(self, store: FrontierStore, table: str):
+        self.store = store
+        self.table = table
+        store.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        store.commit()
+
+    def add(self, key) -> bool:
+        """Ajoute ``key`` ; ``True`` si elle n'y était pas."""
+        added = self.store.conn.execute(
+            f"INSERT OR IGNORE INTO {self.table} (key) VALUES (?)", (key,)
+        ).rowcount == 1
+        if added:
+            self.store.changed()
+        return added
+
+    def __contains__(self, key) -> bool:
+        return self.store.conn.execute(
+            f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        for (key,) in self.store.conn.execute(f"SELECT key FROM {self.table}"):
+            yield key
+
+    def __len__(self) -> int:
+        return self.store.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class SQLiteRequestQueue:
+    """File de requêtes par priorité, LIFO à priorité égale (comme ``PickleLifoDiskQueue``).
+
+    ``pop`` ne supprime pas la ligne : il la marque « en cours » et pose son
+    identifiant dans ``request.meta``. Elle n'est supprimée qu'une fois son
+    callback terminé et toutes ses requêtes filles passées au scheduler
+    (``FrontierMiddleware``), ou quand la requête revient dans la file
+    (retry, redirection). Au redémarrage, les requêtes encore en cours sont
+    remises en file : un arrêt brutal ne perd pas la page de liste qui
+    portait la suite de la pagination.
+    """
+
+    META_KEY = "_frontier_id"
+    PARENT_KEY = "_frontier_parent"
+
+    def __init__(self, store: FrontierStore, spider):
+        self.store = store
+        self.spider = spider
+        conn = store.conn
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests_queue (
+                id INTEGER PRIMARY KEY,
+                priority INTEGER NOT NULL,
+                request BLOB NOT NULL,
+                leased INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_requests_queue_order ON requests_queue(leased, priority, id)"
+        )
+        conn.execute("UPDATE requests_queue SET leased = 0 WHERE leased = 1")
+        store.commit()
+        self.size = conn.execute("SELECT COUNT(*) FROM requests_queue").fetchone()[0]
+
+    def push(self, request):
+        """Ajoute une requête ; ``ValueError`` si elle n'est pas sérialisable
+        (le scheduler la garde alors en mémoire)."""
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError(str(e)) from e
+        conn = self.store.conn
+        conn.execute("INSERT INTO requests_queue (priority, request) VALUES (?, ?)", (request.priority, data))
+        previous = request.meta.get(self.META_KEY)
+        if previous is not None:
+            # Retry ou redirection : la nouvelle requête remplace celle en cours
+            conn.execute("DELETE FROM requests_queue WHERE id = ?", (previous,))
+        self.size += 1
+        self.store.changed()
+
+    def _next(self):
+        return self.store.conn.execute(
+            "SELECT id, request FROM requests_queue WHERE leased = 0 ORDER BY priority DESC, id DESC LIMIT 1"
+        ).fetchone()
+
+    def _request(self, row):
+        request = request_from_dict(pickle.loads(row[1]), spider=self.spider)
+        request.meta[self.META_KEY] = row[0]
+        return request
+
+    def pop(self):
+        row = self._next()
+        if row is None:
+            return None
+        self.store.conn.execute("UPDATE requests_queue SET leased = 1 WHERE id = ?", (row[0],))
+        self.size -= 1
+        self.store.changed()
+        return self._request(row)
+
+    def peek(self):
+        row = self._next()
+        return self._request(row) if row else None
+
+    def close(self):
+        self.store.commit()
+        return []
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class FrontierMiddleware:
+    """Middleware spider : retire une requête de la file une fois traitée.
+
+    Avec le reactor asyncio, les requêtes produites par un callback sont
+    planifiées après l'épuisement du callback : le middleware compte donc
+    les requêtes filles (marquées dans ``meta``) et ``ResumableScheduler``
+    les décompte à leur arrivée. Les items sont comptés de la même façon et
+    décomptés une fois écrits en base : le pipeline de stockage appelle
+    ``FrontierStore.item_done`` après le commit de leur lot (sans pipeline
+    de stockage, au signal ``item_scraped``). Un item écarté (``DropItem``)
+    est décompté aussi. Les requêtes en échec (téléchargement, exception du
+    callback, item en erreur) restent en cours et sont rejouées à la reprise.
+    """
+
+    def __init__(self, jobdir: str):
+        self.jobdir = jobdir
+        self.store: Optional[FrontierStore] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        jobdir = job_dir(crawler.settings)
+        if not jobdir:
+            raise NotConfigured
+        s = cls(jobdir)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(s.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(s.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(s.item_error, signal=signals.item_error)
+        return s
+
+    def spider_opened(self, spider):
+        self.store = FrontierStore.open(self.jobdir)
+
+    def spider_closed(self, spider):
+        if self.store is not None:
+            self.store.release()
+            self.store = None
+
+    def item_scraped(self, item, spider):
+        if self.store is not None and not self.store.tracks_commits:
+            self.store.item_done(item)
+
+    def item_dropped(self, item, spider):
+        if self.store is not None:
+            self.store.item_done(item)
+
+    def item_error(self, item, spider):
+        if self.store is not None:
+            self.store.forget(item)
+
+    def process_spider_output(self, response, result, spider):
+        parent = response.meta.get(SQLiteRequestQueue.META_KEY)
+        children = 0
+        for r in result:
+            if parent is not None and self._track(r, parent):
+                children += 1
+            yield r
+        self._done(parent, children)
+
+    async def process_spider_output_async(self, response, result, spider):
+        parent = response.meta.get(SQLiteRequestQueue.META_KEY)
+        children = 0
+        async for r in result:
+            if parent is not None and self._track(r, parent):
+                children += 1
+            yield r
+        self._done(parent, children)
+
+    def _track(self, output, parent: int) -> bool:
+        """Rattache une requête fille ou un item à la requête en cours."""
+        if isinstance(output, Request):
+            output.meta[SQLiteRequestQueue.PARENT_KEY] = parent
+            return True
+        if output is not None and self.store is not None:
+            self.store.hold(output, parent)
+            return True
+        return False
+
+    def _done(self, parent: Optional[int], children: int):
+        if parent is not None and self.store is not None:
+            self.store.settle(parent, children)
+
+
+class SQLiteDupeFilter(RFPDupeFilter):
+    """``DUPEFILTER_CLASS`` : empreintes des requêtes dans ``frontier.sqlite``.
+
+    Sans ``JOBDIR``, filtre en mémoire identique à ``RFPDupeFilter``.
+    """
+
+    def __init__(self, path: Optional[str] = None, debug: bool = False, *, fingerprinter=None):
+        super().__init__(None, debug, fingerprinter=fingerprinter)
+        self.store = FrontierStore.open(path) if path else None
+        self.seen = SQLiteSeenSet(self.store, "seen_requests") if self.store else None
+        if self.seen is not None:
+            logger.info("Frontière %s : %d requêtes déjà vues", self.store.path, len(self.seen))
+
+    def request_seen(self, request) -> bool:
+        if self.seen is None:
+            return super().request_seen(request)
+        return not self.seen.add(self.fingerprinter.fingerprint(request))
+
+    def close(self, reason):
+        super().close(reason)
+        if self.store is not None:
+            self.store.release()
+            self.store = None
+
+
+class ResumableScheduler(Scheduler):
+    """``SCHEDULER`` : file disque ``SQLiteRequestQueue`` au lieu des files queuelib.
+
+    La file est reprise telle quelle au redémarrage, même après un arrêt
+    brutal (pas d'``active.json``).
+    """
+
+    def _dqdir(self, jobdir: Optional[str]) -> Optional[str]:
+        if jobdir:
+            Path(jobdir).mkdir(parents=True, exist_ok=True)
+        return jobdir
+
+    def _dq(self):
+        self.store = FrontierStore.open(self.dqdir)
+        queue = SQLiteRequestQueue(self.store, self.spider)
+        if queue:
+            logger.info(
+                "Reprise du crawl (%(queuesize)d requêtes en file)",
+                {"queuesize": len(queue)},
+                extra={"spider": self.spider}
+            )
+        return queue
+
+    def enqueue_request(self, request) -> bool:
+        parent = request.meta.pop(SQLiteRequestQueue.PARENT_KEY, None)
+        enqueued = super().enqueue_request(request)
+        if parent is not None and self.dqs is not None:
+            # Filtrée ou non, la requête fille est passée par le scheduler
+            self.store.settle(parent, -1)
+        return enqueued
+
+    def close(self, reason):
+        if self.dqs is not None:
+            self.dqs.close()
+            self.store.release()
+        return self.df.close(reason)
@@ -0,0 +1,298 @@
+"""Stockage du cache HTTP dans un seul fichier SQLite.
+
+``FilesystemCacheStorage`` écrit six fichiers par requête dans un arbre de
+répertoires ; ``SQLiteCacheStorage`` range chaque réponse dans une ligne
+d'une table indexée par l'empreinte de la requête, avec le corps et les
+en-têtes compressés (zlib par défaut, zstd si le module ``zstandard`` est
+installé). Un fichier par spider : ``<HTTPCACHE_DIR>/<spider>.sqlite``.
+
+Settings :
+
+- ``HTTPCACHE_STORAGE = "bookstoscrape_Scraper.httpcache.SQLiteCacheStorage"``
+- ``HTTPCACHE_SQLITE_COMPRESSION`` : ``zlib`` (défaut), ``zstd`` ou ``none``
+- ``HTTPCACHE_SQLITE_COMPRESSION_LEVEL`` : niveau de compression (défaut 6)
+- ``HTTPCACHE_EXPIRATION_SECS`` : respecté comme par le stockage d'origine
+
+Compaction et éviction : ``scrapy httpcache`` (voir ``commands/httpcache.py``).
+"""
+import gzip
+import pickle
+import sqlite3
+import zlib
+from pathlib import Path
+from time import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from scrapy.http import Headers, Request
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from scrapy.utils.request import RequestFingerprinter
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+try:
+    import zstandard
+except ImportError:  # dépendance optionnelle
+    zstandard = None
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        fingerprint BLOB PRIMARY KEY,
+        url TEXT NOT NULL,
+        method TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        response_url TEXT NOT NULL,
+        codec TEXT NOT NULL,
+        headers BLOB NOT NULL,
+        body BLOB NOT NULL,
+        body_size INTEGER NOT NULL,
+        stored_at REAL NOT NULL
+    )
+"""
+
+
+class Codec:
+    """Compression des corps et en-têtes ; le nom est stocké avec chaque ligne."""
+
+    NAMES = ('zlib', 'zstd', 'none')
+
+    def __init__(self, name: str = 'zlib', level: int = 6):
+        if name not in self.NAMES:
+            raise ValueError(f"HTTPCACHE_SQLITE_COMPRESSION invalide: {name} ({', '.join(self.NAMES)})")
+        if name == 'zstd' and zstandard is None:
+            raise ValueError("HTTPCACHE_SQLITE_COMPRESSION = 'zstd' nécessite le module zstandard")
+        self.name = name
+        self.level = level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if name == 'zstd' else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == 'zlib':
+            return zlib.compress(data, self.level)
+        if self.name == 'zstd':
+            return self._zstd_compressor.compress(data)
+        return data
+
+    def decompress(self, codec: str, data: bytes) -> bytes:
+        """Décompresse une donnée écrite avec ``codec`` (pas forcément le codec courant)."""
+        if codec == 'zlib':
+            return zlib.decompress(data)
+        if codec == 'zstd':
+            if self._zstd_decompressor is None:
+                raise ValueError("Entrée du cache compressée en zstd : installer zstandard")
+            return self._zstd_decompressor.decompress(data)
+        return data
+
+
+def cache_db_path(settings, spider_name: str) -> Path:
+    """Fichier SQLite du cache d'un spider."""
+    return Path(data_path(settings['HTTPCACHE_DIR'])) / f"{spider_name}.sqlite"
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Ouvre (et crée si besoin) un fichier de cache."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(SCHEMA)
+    return conn
+
+
+class SQLiteCacheStorage:
+    """Stockage ``HTTPCACHE_STORAGE`` à fichier unique, corps compressés."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.codec = Codec(
+            settings.get('HTTPCACHE_SQLITE_COMPRESSION', 'zlib'),
+            settings.getint('HTTPCACHE_SQLITE_COMPRESSION_LEVEL', 6)
+        )
+        self.conn: Optional[sqlite3.Connection] = None
+        self._fingerprinter = None
+
+    def open_spider(self, spider):
+        self.path = cache_db_path(self.settings, spider.name)
+        self.conn = connect(self.path)
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        spider.logger.debug(f"Cache HTTP SQLite : {self.path} (compression {self.codec.name})")
+
+    def close_spider(self, spider):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def retrieve_response(self, spider, request):
+        """Réponse en cache pour ``request``, ou ``None`` (absente ou expirée)."""
+        row = self.conn.execute(
+            "SELECT status, response_url, codec, headers, body, stored_at FROM responses WHERE fingerprint = ?",
+            (self._fingerprinter.fingerprint(request),)
+        ).fetchone()
+        if row is None:
+            return None
+        status, url, codec, raw_headers, raw_body, stored_at = row
+        if 0 < self.expiration_secs < time() - stored_at:
+            return None
+
+        headers = Headers(headers_raw_to_dict(self.codec.decompress(codec, raw_headers)))
+        body = self.codec.decompress(codec, raw_body)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        """Enregistre (ou remplace) la réponse de ``request``."""
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO responses
+            (fingerprint, url, method, status, response_url, codec, headers, body, body_size, stored_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                self._fingerprinter.fingerprint(request),
+                request.url,
+                request.method,
+                response.status,
+                response.url,
+                self.codec.name,
+                self.codec.compress(headers_dict_to_raw(response.headers)),
+                self.codec.compress(response.body),
+                len(response.body),
+                time(),
+            )
+        )
+
+
+def cached_body(settings, spider_name: str, url: str) -> Optional[bytes]:
+    """Corps en cache d'un GET sur ``url`` (expiration respectée), ou ``None``.
+
+    Lecture seule, hors crawl : sert aux commandes du projet qui ont besoin
+    d'une page (``crawl_parallel`` et la liste des catégories).
+    """
+    path = cache_db_path(settings, spider_name)
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute(
+            "SELECT codec, body, stored_at FROM responses WHERE fingerprint = ? AND status = 200",
+            (RequestFingerprinter().fingerprint(Request(url)),)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    codec, body, stored_at = row
+    expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+    if 0 < expiration_secs < time() - stored_at:
+        return None
+    return Codec('none').decompress(codec, body)
+
+
+def cache_stats(conn: sqlite3.Connection) -> Dict:
+    """Nombre d'entrées, tailles brute et compressée, taille du fichier."""
+    entries, raw_size, stored_size, oldest = conn.execute(
+        "SELECT COUNT(*), TOTAL(body_size), TOTAL(LENGTH(body) + LENGTH(headers)), MIN(stored_at) FROM responses"
+    ).fetchone()
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {
+        "entries": entries,
+        "body_bytes": int(raw_size),
+        "stored_bytes": int(stored_size),
+        "file_bytes": page_size * page_count,
+        "free_bytes": page_size * free_pages,
+        "oldest": oldest,
+    }
+
+
+def evict(conn: sqlite3.Connection, max_age: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+    """Supprime les entrées plus vieilles que ``max_age`` secondes, puis les
+    plus anciennes jusqu'à ce que les données stockées tiennent dans ``max_bytes``.
+
+    Retourne le nombre d'entrées supprimées ; l'espace libéré n'est rendu
+    au système qu'après ``compact``.
+    """
+    removed = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if max_age is not None:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time() - max_age,)
+            ).rowcount
+        if max_bytes is not None:
+            # Somme cumulée du plus récent au plus ancien : tout ce qui dépasse part
+            removed += conn.execute("""
+                DELETE FROM responses WHERE fingerprint IN (
+                    SELECT fingerprint FROM (
+                        SELECT fingerprint,
+                               SUM(LENGTH(body) + LENGTH(headers)) OVER (
+                                   ORDER BY stored_at DESC, fingerprint
+                               ) AS cumulated
+                        FROM responses
+                    ) WHERE cumulated > ?
+                )
+            """, (max_bytes,)).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return removed
+
+
+def compact(conn: sqlite3.Connection):
+    """Réécrit le fichier (VACUUM) et tronque le journal WAL."""
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def iter_filesystem_cache(spider_dir: Path, use_gzip: bool = False) -> Iterator[Tuple[bytes, Dict, bytes, bytes]]:
+    """Parcourt un cache ``FilesystemCacheStorage``.
+
+    Produit ``(empreinte, métadonnées, en-têtes bruts, corps)`` par entrée ;
+    ``use_gzip`` correspond au setting ``HTTPCACHE_GZIP`` du cache d'origine.
+    """
+    opener = gzip.open if use_gzip else open
+    for meta_path in spider_dir.glob("*/*/pickled_meta"):
+        entry = meta_path.parent
+        with opener(meta_path, "rb") as f:
+            metadata = pickle.load(f)  # noqa: S301 (cache écrit par Scrapy)
+        metadata["timestamp"] = meta_path.stat().st_mtime
+        with opener(entry / "response_headers", "rb") as f:
+            headers = f.read()
+        with opener(entry / "response_body", "rb") as f:
+            body = f.read()
+        yield bytes.fromhex(entry.name), metadata, headers, body
+
+
+def import_filesystem_cache(
+    conn: sqlite3.Connection,
+    spider_dir: Path,
+    codec: Codec,
+    use_gzip: bool = False
+) -> int:
+    """Copie un cache ``FilesystemCacheStorage`` dans le fichier SQLite."""
+    count = 0
+    conn.execute("BEGIN")
+    try:
+        for fingerprint, metadata, headers, body in iter_filesystem_cache(spider_dir, use_gzip):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (fingerprint, url, method, status, response_url, codec, headers, body, body_size, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint, metadata["url"], metadata["method"], metadata["status"],
+                    metadata["response_url"], codec.name, codec.compress(headers),
+                    codec.compress(body), len(body), metadata["timestamp"],
+                )
+            )
+            count += 1
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
@@ -26,4 +26,12 @@ class BookItem(scrapy.Item):
     # Métadonnées
     url = scrapy.Field()
     image = scrapy.Field()
-    date_scraping = scrapy.Field()
\ No newline at end of file
+    date_scraping = scrapy.Field()
+
+    # Mode incrémental : livre vu sur la page de liste, sans changement
+    # (seuls upc, url et date_scraping sont renseignés)
+    inchange = scrapy.Field()
+
+    # Mode fast : item construit depuis la page de liste (prix, note,
+    # disponibilité en stock / épuisé) pour un livre déjà en base
+    partiel = scrapy.Field()
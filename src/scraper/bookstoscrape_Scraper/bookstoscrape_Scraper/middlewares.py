@@ -4,6 +4,9 @@
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
 from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.settings import Settings
+from scrapy.utils.misc import load_object
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
@@ -54,47 +57,107 @@ class BookstoscrapeScraperSpiderMiddleware:
 
 
 class BookstoscrapeScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    """Revalidation HTTP conditionnelle (ETag / Last-Modified).
+
+    Quand l'entrée du cache HTTP a expiré, la requête part avec
+    ``If-None-Match`` / ``If-Modified-Since`` tirés de la réponse en cache.
+    Un ``304 Not Modified`` est remplacé par le corps en cache (marqué
+    ``revalidated``), que ``HttpCacheMiddleware`` enregistre à nouveau :
+    l'entrée repart pour une période d'expiration sans téléchargement.
+
+    Les validateurs sont ceux de la réponse stockée par le cache HTTP ; le
+    middleware lit le stockage configuré (``HTTPCACHE_STORAGE``) sans tenir
+    compte de l'expiration. Il doit être placé après ``HttpCacheMiddleware``
+    (priorité > 900).
+
+    Statistiques : ``revalidation/requests``, ``revalidation/not_modified``,
+    ``revalidation/modified``, ``revalidation/bytes_saved``,
+    ``revalidation/bytes_downloaded`` et ``revalidation/not_modified_ratio``.
+    """
+
+    # En-têtes d'un 304 qui remplacent ceux de la réponse en cache (RFC 9111 §4.3.4)
+    UPDATED_HEADERS = (b'Date', b'ETag', b'Last-Modified', b'Cache-Control', b'Expires')
+
+    def __init__(self, storage, stats):
+        self.storage = storage
+        self.stats = stats
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        settings = crawler.settings
+        if not settings.getbool('HTTPCACHE_ENABLED') or not settings.getbool('HTTPCACHE_REVALIDATE', True):
+            raise NotConfigured
+
+        # Même stockage que HttpCacheMiddleware, sans expiration : une entrée
+        # périmée reste lisible pour ses validateurs et son corps
+        storage_settings = Settings(settings.copy_to_dict())
+        storage_settings.set('HTTPCACHE_EXPIRATION_SECS', 0)
+        storage = load_object(settings['HTTPCACHE_STORAGE'])(storage_settings)
+
+        s = cls(storage, crawler.stats)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        if request.method != 'GET' or request.meta.get('dont_cache'):
+            return None
+        if b'If-None-Match' in request.headers or b'If-Modified-Since' in request.headers:
+            return None
+
+        cached = self.storage.retrieve_response(spider, request)
+        if cached is None or cached.status != 200:
+            return None
+
+        etag = cached.headers.get(b'ETag')
+        last_modified = cached.headers.get(b'Last-Modified')
+        if not etag and not last_modified:
+            return None
+
+        if etag:
+            request.headers[b'If-None-Match'] = etag
+        if last_modified:
+            request.headers[b'If-Modified-Since'] = last_modified
+        request.meta['_revalidation_cached'] = cached
+        self.stats.inc_value('revalidation/requests', spider=spider)
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
-
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
-        return response
+        cached = request.meta.pop('_revalidation_cached', None)
+        if cached is None:
+            return response
+
+        if response.status != 304:
+            self.stats.inc_value('revalidation/modified', spider=spider)
+            self.stats.inc_value('revalidation/bytes_downloaded', len(response.body), spider=spider)
+            return response
+
+        self.stats.inc_value('revalidation/not_modified', spider=spider)
+        self.stats.inc_value('revalidation/bytes_saved', len(cached.body), spider=spider)
+        headers = cached.headers.copy()
+        for name in self.UPDATED_HEADERS:
+            if name in response.headers:
+                headers[name] = response.headers[name]
+        return cached.replace(
+            headers=headers,
+            request=request,
+            flags=cached.flags + ['revalidated']
+        )
 
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
-
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+        request.meta.pop('_revalidation_cached', None)
+        return None
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        self.storage.open_spider(spider)
+
+    def spider_closed(self, spider):
+        self.storage.close_spider(spider)
+        not_modified = self.stats.get_value('revalidation/not_modified', 0, spider=spider)
+        revalidated = not_modified + self.stats.get_value('revalidation/modified', 0, spider=spider)
+        if revalidated:
+            self.stats.set_value(
+                'revalidation/not_modified_ratio',
+                round(not_modified / revalidated, 4),
+                spider=spider
+            )
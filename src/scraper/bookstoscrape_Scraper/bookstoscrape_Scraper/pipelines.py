@@ -5,12 +5,38 @@
 
 
 # useful for handling different item types with a single interface
+import queue
 import re
+import shutil
 import sqlite3
 import os
-from typing import Optional
+import sys
+import tempfile
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
 from itemadapter import ItemAdapter
 from scrapy.exceptions import DropItem
+from scrapy.utils.job import job_dir
+from scrapy.utils.log import failure_to_exc_info
+from twisted.internet import task, threads
+from twisted.internet.defer import Deferred, fail
+from twisted.python.failure import Failure
+
+# Racine du projet : donne accès au module partagé src.database
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.database.aggregates import refresh_category_stats
+from src.database.data_version import bump_data_version
+from src.database.migrations import apply_migrations
+from src.database.price_summary import refresh_price_summary
+from src.database.snapshots import FORMATS as SNAPSHOT_FORMATS, export_snapshot, require_pyarrow
+
+from bookstoscrape_Scraper.bloom import BloomSeenSet, ScalableBloomFilter
+from bookstoscrape_Scraper.frontier import FrontierStore, SQLiteSeenSet
 
 
 class CleanPricePipeline:
@@ -18,6 +44,8 @@ class CleanPricePipeline:
     
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
+        if adapter.get('inchange'):
+            return item  # rien à normaliser (mode incrémental)
         prix_text = adapter.get('prix_original')
         
         if prix_text:
@@ -47,6 +75,8 @@ class ConvertRatingPipeline:
     
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
+        if adapter.get('inchange'):
+            return item  # rien à normaliser (mode incrémental)
         rating_text = adapter.get('notation_originale')
         
         if rating_text:
@@ -65,6 +95,8 @@ class ExtractAvailabilityPipeline:
     
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
+        if adapter.get('inchange'):
+            return item  # rien à normaliser (mode incrémental)
         availability_text = adapter.get('disponibilite_texte')
         
         if availability_text:
@@ -82,128 +114,746 @@ class ExtractAvailabilityPipeline:
         return item
 
 
+# Expressions des pipelines 1 et 3, compilées une fois pour NormalizePipeline
+PRICE_JUNK_RE = re.compile(r'[^\d.]')
+DIGITS_RE = re.compile(r'\d+')
+
+
+class NormalizePipeline:
+    """Pipelines 1 à 3 fusionnés : prix, note et disponibilité en un seul passage.
+
+    Mêmes valeurs et mêmes avertissements que ``CleanPricePipeline``,
+    ``ConvertRatingPipeline`` et ``ExtractAvailabilityPipeline`` enchaînés,
+    avec un seul ``ItemAdapter`` et des expressions précompilées.
+    """
+
+    RATING_MAP = ConvertRatingPipeline.RATING_MAP
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        if adapter.get('inchange'):
+            return item  # rien à normaliser (mode incrémental)
+
+        prix = None
+        prix_text = adapter.get('prix_original')
+        if prix_text:
+            try:
+                prix = float(PRICE_JUNK_RE.sub('', prix_text))
+            except ValueError:
+                spider.logger.warning(f"Impossible de convertir le prix: {prix_text}")
+        adapter['prix'] = prix
+
+        notation = None
+        rating_text = adapter.get('notation_originale')
+        if rating_text:
+            notation = self.RATING_MAP.get(rating_text)
+            if notation is None:
+                spider.logger.warning(f"Note inconnue: {rating_text}")
+        adapter['notation'] = notation
+
+        disponibilite = 0
+        availability_text = adapter.get('disponibilite_texte')
+        if availability_text:
+            match = DIGITS_RE.search(availability_text)
+            if match:
+                disponibilite = int(match.group())
+            elif 'in stock' in availability_text.lower():
+                disponibilite = 1
+        adapter['disponibilite'] = disponibilite
+
+        return item
+
+
 class DuplicatesPipeline:
-    """Pipeline 4 : Détecte les doublons basés sur l'UPC."""
+    """Pipeline 4 : Détecte les doublons basés sur l'UPC.
+
+    Les UPC vus passent par un filtre de Bloom en mémoire, borné par
+    ``DUPLICATES_MEMORY_LIMIT`` octets (taux de faux positifs visé :
+    ``DUPLICATES_ERROR_RATE``). Une réponse positive du filtre est vérifiée
+    dans la table ``seen_upcs`` de ``frontier.sqlite`` : un item n'est
+    jamais écarté à tort. Avec ``JOBDIR``, cette table est celle du job et
+    survit à la reprise ; sinon, elle vit dans un répertoire temporaire
+    supprimé en fin de crawl. L'UPC d'un item pas encore écrit en base est
+    rattaché à sa requête (``FrontierStore.own``) : si le job est tué avant
+    l'écriture, il est oublié et l'item rejoué n'est pas pris pour un doublon.
+    """
     
-    def __init__(self):
-        self.upcs_seen = set()
+    def __init__(
+        self,
+        jobdir: Optional[str] = None,
+        memory_limit: int = 8 * 1024 * 1024,
+        error_rate: float = 0.001,
+        stats=None
+    ):
+        self.jobdir = jobdir
+        self.memory_limit = memory_limit
+        self.error_rate = error_rate
+        self.stats = stats
+        self.tmpdir: Optional[str] = None
+        self.store = None
+        self.upcs_seen: Optional[BloomSeenSet] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            jobdir=job_dir(settings),
+            memory_limit=settings.getint('DUPLICATES_MEMORY_LIMIT', 8 * 1024 * 1024),
+            error_rate=settings.getfloat('DUPLICATES_ERROR_RATE', 0.001),
+            stats=crawler.stats
+        )
+
+    def open_spider(self, spider):
+        directory = self.jobdir
+        if not directory:
+            directory = self.tmpdir = tempfile.mkdtemp(prefix='duplicates-')
+        self.store = FrontierStore.open(directory)
+        exact = SQLiteSeenSet(self.store, 'seen_upcs')
+        bloom = ScalableBloomFilter(error_rate=self.error_rate, max_bytes=self.memory_limit)
+        self.upcs_seen = BloomSeenSet(bloom, exact)
+        self.upcs_seen.load(exact)
+
+    def close_spider(self, spider):
+        if self.stats is not None and self.upcs_seen is not None:
+            bloom = self.upcs_seen.bloom
+            self.stats.set_value('duplicates/bloom_bytes', bloom.nbytes)
+            self.stats.set_value('duplicates/bloom_filters', len(bloom.filters))
+            self.stats.set_value('duplicates/bloom_saturated', bloom.saturated)
+            self.stats.set_value('duplicates/upcs', len(bloom))
+            self.stats.set_value('duplicates/bloom_hits', self.upcs_seen.hits)
+            self.stats.set_value('duplicates/false_positives', self.upcs_seen.false_positives)
+        if self.store is not None:
+            self.store.release()
+            self.store = None
+        if self.tmpdir is not None:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
     
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
         upc = adapter.get('upc')
         
         if upc:
-            if upc in self.upcs_seen:
+            if not self.upcs_seen.add(upc):
+                if self.stats is not None:
+                    self.stats.inc_value('duplicates/dropped')
                 spider.logger.warning(f"Doublon détecté: {upc}")
                 raise DropItem(f"Doublon: {upc}")
-            else:
-                self.upcs_seen.add(upc)
+            parent = self.store.parent_of(item)
+            if parent is not None:
+                self.store.own('seen_upcs', upc, parent)
         
         return item
 
 
 class SaveToSQLitePipeline:
-    """Pipeline 5 : Sauvegarde les données dans SQLite avec historique."""
-    
-    def __init__(self):
+    """Pipeline 5 : Sauvegarde les données dans SQLite avec historique.
+
+    Les écritures sont bufferisées puis envoyées par lots (``executemany``)
+    dans une seule transaction. Un lot part dès que ``SQLITE_BATCH_SIZE``
+    items sont en attente ou que ``SQLITE_FLUSH_INTERVAL`` secondes se sont
+    écoulées depuis le dernier envoi ; ce délai est tenu par un minuteur du
+    reactor (``LoopingCall``), même si plus aucun item n'arrive. Le reste
+    est écrit à la fermeture.
+
+    L'historique ne garde que les changements : une ligne ``price_history``
+    n'est ajoutée que si le prix, la note ou la disponibilité diffère de la
+    dernière ligne du livre. Titres et catégories sont stockés une fois
+    (tables ``titles`` et ``categories``) et chaque passage du pipeline est
+    un ``crawl_runs``, ouvert au premier lot et daté par son premier item.
+    Avec ``SQLITE_RUN_ID`` (workers de ``crawl_parallel``), le run est celui
+    ouvert par le coordinateur : chaque lot le réutilise et y note la date
+    de sa dernière écriture, le coordinateur le clôt.
+
+    Avec ``JOBDIR``, chaque item commité est signalé à la frontière
+    (``FrontierStore.item_done``) : la requête qui l'a produit ne quitte la
+    file qu'une fois tous ses items en base. Un item perdu (lot en erreur,
+    job tué avant l'écriture) fait rejouer sa requête à la reprise.
+    """
+
+    JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+    SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+    BOOKS_SQL = '''
+        INSERT OR REPLACE INTO books
+        (titre, prix, notation, disponibilite, description, upc, category, url, image, date_scraping)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    # Ligne d'historique seulement si l'état diffère du dernier enregistré :
+    # (upc, titre, prix, notation, disponibilite, category, date_scraping, run_id)
+    HISTORY_SQL = '''
+        INSERT INTO price_history
+        (upc, run_id, titre_id, category_id, prix, notation, disponibilite, date_scraping)
+        SELECT
+            ?1, ?8,
+            (SELECT id FROM titles WHERE titre = ?2),
+            (SELECT id FROM categories WHERE category = ?6),
+            ?3, ?4, ?5, ?7
+        WHERE NOT EXISTS (
+            SELECT 1 FROM price_history
+            WHERE id = (SELECT MAX(id) FROM price_history WHERE upc = ?1)
+              AND prix IS ?3 AND notation IS ?4 AND disponibilite IS ?5
+        )
+    '''
+
+    TITLES_SQL = "INSERT OR IGNORE INTO titles (titre) VALUES (?)"
+    CATEGORIES_SQL = "INSERT OR IGNORE INTO categories (category) VALUES (?)"
+
+    # Items « inchange » (mode incrémental) : l'état connu reste valable,
+    # seule la date de dernière observation du livre avance. Aucune ligne
+    # d'historique : elle recopierait le dernier état du livre, et un passage
+    # incrémental écrirait autant d'historique qu'un crawl complet. Le passage
+    # lui-même reste daté par son crawl_runs.
+    SEEN_BOOKS_SQL = "UPDATE books SET date_scraping = ? WHERE upc = ?"
+
+    # Items « partiel » (mode fast) : prix, note et disponibilité lus sur la
+    # page de liste. Celle-ci n'indique que « In stock » : le nombre
+    # d'exemplaires connu est conservé tant que le livre reste en stock.
+    # L'état mis à jour est ensuite comparé au dernier historique (PARTIAL_HISTORY_SQL).
+    PARTIAL_BOOKS_SQL = '''
+        UPDATE books SET
+            prix = COALESCE(?, prix),
+            notation = COALESCE(?, notation),
+            disponibilite = CASE WHEN ? = 0 THEN 0 WHEN disponibilite > 0 THEN disponibilite ELSE 1 END,
+            date_scraping = ?
+        WHERE upc = ?
+    '''
+
+    # (date_scraping, upc, run_id)
+    PARTIAL_HISTORY_SQL = '''
+        INSERT INTO price_history
+        (upc, run_id, titre_id, category_id, prix, notation, disponibilite, date_scraping)
+        SELECT
+            b.upc, ?3,
+            (SELECT id FROM titles WHERE titre = b.titre),
+            (SELECT id FROM categories WHERE category = b.category),
+            b.prix, b.notation, b.disponibilite, ?1
+        FROM books b
+        WHERE b.upc = ?2 AND NOT EXISTS (
+            SELECT 1 FROM price_history h
+            WHERE h.id = (SELECT MAX(id) FROM price_history WHERE upc = b.upc)
+              AND h.prix IS b.prix AND h.notation IS b.notation AND h.disponibilite IS b.disponibilite
+        )
+    '''
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        journal_mode: str = 'WAL',
+        synchronous: str = 'NORMAL',
+        busy_timeout: float = 30.0,
+        finalize: bool = True,
+        snapshot_dir: Optional[str] = None,
+        snapshot_format: str = 'parquet',
+        jobdir: Optional[str] = None,
+        run_id: Optional[int] = None
+    ):
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in self.JOURNAL_MODES:
+            raise ValueError(f"SQLITE_JOURNAL_MODE invalide: {journal_mode}")
+        if synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"SQLITE_SYNCHRONOUS invalide: {synchronous}")
+        if snapshot_dir:
+            require_pyarrow()
+            if snapshot_format not in SNAPSHOT_FORMATS:
+                raise ValueError(f"SNAPSHOT_FORMAT invalide: {snapshot_format}")
+
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        # Plusieurs crawlers peuvent écrire dans la même base (crawl_parallel) :
+        # un lot attend le verrou d'écriture au lieu d'échouer
+        self.busy_timeout = busy_timeout
+        self.finalize = finalize
+        # Export colonnaire en fin de crawl (désactivé sans SNAPSHOT_DIR)
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_format = snapshot_format
+        self.jobdir = jobdir
+        # Run ouvert par le coordinateur de crawl_parallel, partagé par les workers
+        self.shared_run_id = run_id
+
         self.conn: Optional[sqlite3.Connection] = None
-        self.cursor: Optional[sqlite3.Cursor] = None
-    
+        self.frontier: Optional[FrontierStore] = None
+        self.run_id: Optional[int] = None
+        self.buffer: List[Tuple[str, Optional[tuple], tuple]] = []
+        # Items du lot en attente, signalés à la frontière après le commit
+        self.buffer_items: List = []
+        # Minuteur des lots incomplets ; horloge du reactor sauf si remplacée
+        self.flush_loop: Optional[task.LoopingCall] = None
+        self.clock = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(**cls._settings_kwargs(crawler.settings))
+
+    @staticmethod
+    def _settings_kwargs(settings) -> Dict:
+        """Paramètres du constructeur lus depuis les settings Scrapy."""
+        return {
+            'db_path': settings.get('SQLITE_DB_PATH'),
+            'batch_size': settings.getint('SQLITE_BATCH_SIZE', 100),
+            'flush_interval': settings.getfloat('SQLITE_FLUSH_INTERVAL', 5.0),
+            'journal_mode': settings.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            'synchronous': settings.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': settings.getfloat('SQLITE_BUSY_TIMEOUT', 30.0),
+            'finalize': settings.getbool('SQLITE_FINALIZE', True),
+            'snapshot_dir': settings.get('SNAPSHOT_DIR'),
+            'snapshot_format': settings.get('SNAPSHOT_FORMAT', 'parquet'),
+            'jobdir': job_dir(settings),
+            'run_id': settings.getint('SQLITE_RUN_ID') or None
+        }
+
     def open_spider(self, spider):
         """Appelé quand le spider démarre."""
-        current_file = os.path.abspath(__file__)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(current_file)))))
-        data_dir = os.path.join(project_root, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        db_path = os.path.join(data_dir, 'books.db')
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
-        
-        # Table principale : état actuel des livres
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                titre TEXT,
-                prix REAL,
-                notation INTEGER,
-                disponibilite INTEGER,
-                description TEXT,
-                upc TEXT UNIQUE,
-                category TEXT,
-                url TEXT,
-                image TEXT,
-                date_scraping TEXT
-            )
-        ''')
-        
-        # Table historique : trace de chaque scraping
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scraping_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                upc TEXT,
-                titre TEXT,
-                prix REAL,
-                notation INTEGER,
-                disponibilite INTEGER,
-                category TEXT,
-                date_scraping TEXT,
-                FOREIGN KEY (upc) REFERENCES books(upc)
-            )
-        ''')
-        
-        self.conn.commit()
-        spider.logger.info(f"✅ Base de données avec historique initialisée: {db_path}")
-    
+        self.conn = self._connect()
+        self._create_tables(self.conn)
+        self.run_id = self.shared_run_id
+        self._open_frontier()
+        self._start_flush_loop(spider)
+        spider.logger.info(f"✅ Base de données avec historique initialisée: {self.db_path}")
+
     def close_spider(self, spider):
         """Appelé quand le spider se termine."""
+        self._stop_flush_loop()
         if self.conn:
+            self._flush(spider)
+            self._close_run(self.conn, spider)
+            self._finalize(self.conn, spider)
             self.conn.close()
+        self._release_frontier()
         spider.logger.info("✅ Connexion à la base fermée")
-    
+
+    def _start_flush_loop(self, spider):
+        """Écrit le lot en attente toutes les ``flush_interval`` secondes."""
+        if self.flush_interval <= 0:
+            return
+        self.flush_loop = task.LoopingCall(self._flush, spider)
+        if self.clock is not None:
+            self.flush_loop.clock = self.clock
+        self.flush_loop.start(self.flush_interval, now=False)
+
+    def _stop_flush_loop(self):
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.flush_loop = None
+
+    def _open_frontier(self):
+        if self.jobdir:
+            self.frontier = FrontierStore.open(self.jobdir)
+            self.frontier.tracks_commits = True
+
+    def _release_frontier(self):
+        if self.frontier is not None:
+            self.frontier.release()
+            self.frontier = None
+
+    def _item_committed(self, item):
+        """Item écrit en base : décompté de la requête qui l'a produit."""
+        if self.frontier is not None:
+            self.frontier.item_done(item)
+        return item
+
     def process_item(self, item, spider):
-        adapter = ItemAdapter(item)
-        
-        if not self.cursor or not self.conn:
+        if not self.conn:
             spider.logger.error("❌ Connexion à la base non initialisée")
             return item
-        
+
+        self.buffer.append(self._item_rows(ItemAdapter(item)))
+        if self.frontier is not None:
+            self.buffer_items.append(item)
+
+        if len(self.buffer) >= self.batch_size or self.flush_interval <= 0:
+            self._flush(spider)
+            # Lot plein : le minuteur repart de zéro
+            if self.flush_loop is not None and self.flush_loop.running:
+                self.flush_loop.reset()
+
+        return item
+
+    def _flush(self, spider):
+        """Écrit le lot en attente dans une seule transaction."""
+        if not self.buffer:
+            return
+
+        batch, self.buffer = self.buffer, []
+        items, self.buffer_items = self.buffer_items, []
         try:
-            # 1. Mettre à jour la table books (état actuel)
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO books 
-                (titre, prix, notation, disponibilite, description, upc, category, url, image, date_scraping)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                adapter.get('titre'),
-                adapter.get('prix'),
-                adapter.get('notation'),
-                adapter.get('disponibilite'),
-                adapter.get('description'),
-                adapter.get('upc'),
-                adapter.get('category'),
-                adapter.get('url'),
-                adapter.get('image'),
-                adapter.get('date_scraping')
-            ))
-            
-            # 2. Insérer dans l'historique (jamais d'écrasement)
-            self.cursor.execute('''
-                INSERT INTO scraping_history 
-                (upc, titre, prix, notation, disponibilite, category, date_scraping)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                adapter.get('upc'),
-                adapter.get('titre'),
+            self._write_batch(self.conn, batch)
+        except sqlite3.Error as e:
+            spider.logger.error(f"❌ Erreur SQLite (lot de {len(batch)} items perdu): {e}")
+        else:
+            spider.logger.debug(f"💾 Lot de {len(batch)} items écrit")
+            for item in items:
+                self._item_committed(item)
+
+    def _close_run(self, conn: sqlite3.Connection, spider):
+        """Date de fin du run (toujours, même sans finalisation)."""
+        if self.run_id is None or self.shared_run_id is not None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE crawl_runs SET finished_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), self.run_id)
+                )
+        except sqlite3.Error as e:
+            spider.logger.error(f"❌ Erreur SQLite en fin de run: {e}")
+
+    def _finalize(self, conn: sqlite3.Connection, spider):
+        """Fin de crawl : recalcule les tables dérivées et publie la nouvelle version.
+
+        Avec ``SNAPSHOT_DIR``, exporte ensuite le crawl et le catalogue
+        courant en fichiers colonnaires (``src/database/snapshots.py``).
+        Désactivé par ``SQLITE_FINALIZE = False`` (workers de ``crawl_parallel`` :
+        le coordinateur finalise une seule fois, après le dernier worker).
+        """
+        if not self.finalize:
+            return
+        try:
+            refresh_category_stats(conn)
+            refresh_price_summary(conn)
+            bump_data_version(conn)
+        except sqlite3.Error as e:
+            spider.logger.error(f"❌ Erreur SQLite en fin de crawl: {e}")
+        if self.snapshot_dir:
+            try:
+                result = export_snapshot(conn, self.snapshot_dir, self.snapshot_format)
+            except (sqlite3.Error, OSError) as e:
+                spider.logger.error(f"❌ Export colonnaire impossible: {e}")
+            else:
+                spider.logger.info(
+                    f"📦 Instantané {self.snapshot_format} : {result['runs']} crawl(s), "
+                    f"{result['books']} livres dans {self.snapshot_dir}"
+                )
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Ouvre la base et applique les réglages de durabilité."""
+        if self.db_path is None:
+            self.db_path = os.path.join(PROJECT_ROOT, 'data', 'books.db')
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=check_same_thread)
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        # INSERT OR REPLACE doit déclencher les triggers de suppression
+        # (synchronisation de l'index plein texte books_fts)
+        conn.execute("PRAGMA recursive_triggers = ON")
+        return conn
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection):
+        """Crée ou met à jour le schéma (tables, index) via les migrations."""
+        apply_migrations(conn)
+
+    @staticmethod
+    def _item_rows(adapter: ItemAdapter) -> Tuple[str, Optional[tuple], tuple]:
+        """Lignes à écrire pour un item : (type, books, scraping_history).
+
+        Le type vaut ``scraped`` (item complet), ``seen`` (item ``inchange``,
+        pas de ligne books) ou ``partial`` (item ``partiel``, ligne pour
+        ``PARTIAL_BOOKS_SQL``). Pour ces deux derniers, la ligne d'historique
+        ne contient que (date_scraping, upc) : l'état vient de ``books``.
+        """
+        if adapter.get('inchange'):
+            return 'seen', None, (adapter.get('date_scraping'), adapter.get('upc'))
+
+        if adapter.get('partiel'):
+            partial_row = (
                 adapter.get('prix'),
                 adapter.get('notation'),
                 adapter.get('disponibilite'),
-                adapter.get('category'),
-                adapter.get('date_scraping')
-            ))
-            
-            self.conn.commit()
-        except sqlite3.Error as e:
-            spider.logger.error(f"❌ Erreur SQLite: {e}")
-        
-        return item
\ No newline at end of file
+                adapter.get('date_scraping'),
+                adapter.get('upc')
+            )
+            return 'partial', partial_row, (adapter.get('date_scraping'), adapter.get('upc'))
+
+        # 1. État actuel du livre (table books)
+        book_row = (
+            adapter.get('titre'),
+            adapter.get('prix'),
+            adapter.get('notation'),
+            adapter.get('disponibilite'),
+            adapter.get('description'),
+            adapter.get('upc'),
+            adapter.get('category'),
+            adapter.get('url'),
+            adapter.get('image'),
+            adapter.get('date_scraping')
+        )
+
+        # 2. Ligne d'historique (écrite seulement si l'état a changé)
+        history_row = (
+            adapter.get('upc'),
+            adapter.get('titre'),
+            adapter.get('prix'),
+            adapter.get('notation'),
+            adapter.get('disponibilite'),
+            adapter.get('category'),
+            adapter.get('date_scraping')
+        )
+
+        return 'scraped', book_row, history_row
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, Optional[tuple], tuple]]):
+        """Écrit un lot de lignes dans une seule transaction."""
+        scraped = [(book_row, history_row) for kind, book_row, history_row in batch if kind == 'scraped']
+        partial = [(book_row, history_row) for kind, book_row, history_row in batch if kind == 'partial']
+        seen = [history_row for kind, _, history_row in batch if kind == 'seen']
+        with conn:
+            run_id = self.run_id
+            if run_id is None:
+                kind, _, history_row = batch[0]
+                started_at = history_row[6] if kind == 'scraped' else history_row[0]
+                run_id = conn.execute(
+                    "INSERT INTO crawl_runs (started_at) VALUES (?)", (started_at,)
+                ).lastrowid
+            conn.executemany(self.TITLES_SQL, {(h[1],) for _, h in scraped if h[1] is not None})
+            conn.executemany(self.CATEGORIES_SQL, {(h[5],) for _, h in scraped if h[5] is not None})
+            conn.executemany(self.BOOKS_SQL, [book_row for book_row, _ in scraped])
+            conn.executemany(self.HISTORY_SQL, [(*history_row, run_id) for _, history_row in scraped])
+            conn.executemany(self.PARTIAL_BOOKS_SQL, [book_row for book_row, _ in partial])
+            conn.executemany(self.PARTIAL_HISTORY_SQL, [(*history_row, run_id) for _, history_row in partial])
+            conn.executemany(self.SEEN_BOOKS_SQL, seen)
+            if self.shared_run_id is not None:
+                # Run partagé : sa date de fin marque qu'au moins un lot a été écrit
+                conn.execute(
+                    "UPDATE crawl_runs SET finished_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), run_id)
+                )
+        # Le run n'existe qu'une fois son premier lot commité
+        self.run_id = run_id
+
+
+class AsyncSQLitePipeline(SaveToSQLitePipeline):
+    """Pipeline 5 (variante) : écritures SQLite hors du thread du reactor.
+
+    Un thread dédié possède la connexion et vide une file bornée
+    (``SQLITE_WRITER_QUEUE_SIZE``) : tout ce qui est en attente part dans
+    la même transaction. ``process_item`` renvoie un Deferred déclenché une
+    fois l'item commité (en erreur si son lot n'a pas pu être écrit).
+
+    Quand la file est pleine, les items attendent côté reactor ; dès que
+    ``queue_size`` items attendent, le moteur Scrapy est mis en pause (plus
+    aucune nouvelle requête) jusqu'à ce que le thread d'écriture les ait
+    repris. Seuls les items des réponses déjà en cours s'ajoutent alors à
+    l'attente.
+
+    Si le thread d'écriture s'arrête sur une erreur inattendue (ouverture
+    de la base, bug), tous les items en file ou en attente passent en
+    erreur, les suivants aussi, et le spider est fermé
+    (``sqlite_writer_failed``).
+    """
+
+    def __init__(self, queue_size: int = 1000, stats=None, crawler=None, **kwargs):
+        super().__init__(**kwargs)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.waiting: Deque[Tuple[Tuple[str, Optional[tuple], tuple], Deferred]] = deque()
+        self.stats = stats
+        self.crawler = crawler
+        self.paused = False
+        self.failure: Optional[Failure] = None
+        self.writer: Optional[threading.Thread] = None
+        self.spider = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        kwargs = cls._settings_kwargs(crawler.settings)
+        kwargs['queue_size'] = crawler.settings.getint('SQLITE_WRITER_QUEUE_SIZE', 1000)
+        return cls(stats=crawler.stats, crawler=crawler, **kwargs)
+
+    def open_spider(self, spider):
+        """Crée les tables puis démarre le thread d'écriture."""
+        conn = self._connect()
+        self._create_tables(conn)
+        conn.close()
+        self.run_id = self.shared_run_id
+        self._open_frontier()
+
+        self.spider = spider
+        self.writer = threading.Thread(target=self._run_writer, name='sqlite-writer', daemon=True)
+        self.writer.start()
+        spider.logger.info(f"✅ Base de données avec historique initialisée: {self.db_path} (écriture asynchrone)")
+
+    def close_spider(self, spider):
+        """Vide la file puis attend la fin du thread d'écriture."""
+        if not self.writer:
+            return None
+        d = threads.deferToThread(self._stop_writer)
+        d.addBoth(self._writer_stopped)
+        d.addCallback(lambda _: spider.logger.info("✅ Connexion à la base fermée"))
+        return d
+
+    def _writer_stopped(self, result):
+        # Les derniers _batch_done sont passés au reactor avant la fin du thread
+        self._release_frontier()
+        return result
+
+    def _stop_writer(self):
+        """Hors reactor : fin de file, puis attente du thread (lots restants et finalisation)."""
+        # Un thread arrêté sur erreur ne vide plus la file : ne jamais bloquer dessus
+        while self.writer.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.writer.join()
+
+    def process_item(self, item, spider):
+        if self.failure is not None:
+            return fail(self.failure)
+
+        entry = (self._item_rows(ItemAdapter(item)), Deferred())
+        d = entry[1]
+        d.addCallback(lambda _: item)
+        d.addCallback(self._item_committed)
+
+        if self.waiting:
+            self.waiting.append(entry)
+        else:
+            try:
+                self.queue.put_nowait(entry)
+            except queue.Full:
+                self.waiting.append(entry)
+
+        if self.waiting:
+            self._inc_stat('sqlite_writer/backpressure')
+            if len(self.waiting) >= self.queue.maxsize:
+                self._pause()
+        self._record_queue_depth()
+        return d
+
+    def _pause(self):
+        """Plus de nouvelles requêtes tant que les items en attente ne sont pas repris."""
+        if self.paused or self.crawler is None or self.crawler.engine is None:
+            return
+        self.crawler.engine.pause()
+        self.paused = True
+        self._inc_stat('sqlite_writer/paused')
+        self.spider.logger.info(f"⏸️ Écriture SQLite en retard ({len(self.waiting)} items en attente) : crawl en pause")
+
+    def _resume(self):
+        if not self.paused:
+            return
+        self.crawler.engine.unpause()
+        self.paused = False
+
+    def _to_reactor(self, func, *args):
+        """Depuis le thread d'écriture : exécute ``func`` dans le thread du reactor."""
+        from twisted.internet import reactor
+        reactor.callFromThread(func, *args)
+
+    def _run_writer(self):
+        """Boucle du thread d'écriture : un lot par passage."""
+        try:
+            conn = self._connect(check_same_thread=False)
+        except Exception:
+            self._to_reactor(self._writer_failed, Failure(), [])
+            return
+
+        stopping = False
+        try:
+            while not stopping:
+                entry = self.queue.get()
+                if entry is None:
+                    break
+                batch = [entry]
+                while len(batch) < self.batch_size:
+                    try:
+                        entry = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        stopping = True
+                        break
+                    batch.append(entry)
+
+                deferreds = [d for _, d in batch]
+                try:
+                    self._write_batch(conn, [rows for rows, _ in batch])
+                except sqlite3.Error:
+                    # Lot perdu, le crawl continue (comme SaveToSQLitePipeline)
+                    self._to_reactor(self._batch_done, deferreds, Failure())
+                except Exception:
+                    self._to_reactor(self._writer_failed, Failure(), deferreds)
+                    return
+                else:
+                    self._to_reactor(self._batch_done, deferreds, None)
+            self._close_run(conn, self.spider)
+            self._finalize(conn, self.spider)
+        except Exception:
+            # Tous les items sont déjà libérés : l'erreur est seulement signalée
+            self._to_reactor(self._writer_failed, Failure(), [])
+        finally:
+            conn.close()
+
+    def _batch_done(self, deferreds: List[Deferred], error: Optional[Failure]):
+        """Côté reactor : libère les items écrits et remplit la file."""
+        if error is not None:
+            self.spider.logger.error(
+                f"❌ Erreur SQLite (lot de {len(deferreds)} items perdu): {error.getErrorMessage()}"
+            )
+            self._inc_stat('sqlite_writer/failed_batches')
+        else:
+            self._inc_stat('sqlite_writer/batches')
+            self._inc_stat('sqlite_writer/items', len(deferreds))
+
+        while self.waiting:
+            try:
+                self.queue.put_nowait(self.waiting[0])
+            except queue.Full:
+                break
+            self.waiting.popleft()
+        if not self.waiting:
+            self._resume()
+        self._record_queue_depth()
+
+        for d in deferreds:
+            if error is not None:
+                d.errback(error)
+            else:
+                d.callback(None)
+
+    def _writer_failed(self, failure: Failure, deferreds: List[Deferred]):
+        """Côté reactor : le thread d'écriture est arrêté, plus aucun item ne sera écrit."""
+        self.failure = failure
+        self.spider.logger.error(
+            "❌ Thread d'écriture SQLite arrêté", exc_info=failure_to_exc_info(failure)
+        )
+        self._inc_stat('sqlite_writer/writer_failed')
+
+        pending = list(deferreds)
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                pending.append(entry[1])
+        pending.extend(d for _, d in self.waiting)
+        self.waiting.clear()
+        self._record_queue_depth()
+
+        self._resume()
+        # Sans effet si le spider est déjà en train de se fermer
+        if self.crawler is not None and self.crawler.crawling and self.crawler.engine is not None:
+            self.crawler.engine.close_spider(self.spider, 'sqlite_writer_failed')
+        for d in pending:
+            d.errback(failure)
+
+    def _record_queue_depth(self):
+        if self.stats is None:
+            return
+        depth = self.queue.qsize() + len(self.waiting)
+        self.stats.set_value('sqlite_writer/queue_depth', depth)
+        self.stats.max_value('sqlite_writer/queue_depth_max', depth)
+
+    def _inc_stat(self, key: str, count: int = 1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
@@ -11,6 +11,7 @@ BOT_NAME = "bookstoscrape_Scraper"
 
 SPIDER_MODULES = ["bookstoscrape_Scraper.spiders"]
 NEWSPIDER_MODULE = "bookstoscrape_Scraper.spiders"
+COMMANDS_MODULE = "bookstoscrape_Scraper.commands"
 
 ADDONS = {}
 
@@ -22,6 +23,8 @@ ADDONS = {}
 ROBOTSTXT_OBEY = True
 
 # Concurrency and throttling settings
+# With AdaptiveThrottle enabled these are only the starting values of each
+# download slot (see ADAPTIVE_THROTTLE_* below).
 #CONCURRENT_REQUESTS = 16
 CONCURRENT_REQUESTS_PER_DOMAIN = 1
 DOWNLOAD_DELAY = 1
@@ -40,33 +43,102 @@ DOWNLOAD_DELAY = 1
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    "bookstoscrape_Scraper.middlewares.BookstoscrapeScraperSpiderMiddleware": 543,
-#}
+SPIDER_MIDDLEWARES = {
+    #"bookstoscrape_Scraper.middlewares.BookstoscrapeScraperSpiderMiddleware": 543,
+    # Closest to the engine: a request leaves the JOBDIR frontier once its
+    # child requests are scheduled and its items committed by the storage pipeline
+    "bookstoscrape_Scraper.frontier.FrontierMiddleware": 50,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "bookstoscrape_Scraper.middlewares.BookstoscrapeScraperDownloaderMiddleware": 543,
-#}
+# Conditional revalidation (If-None-Match / If-Modified-Since) of expired
+# HTTP cache entries; must run after HttpCacheMiddleware (900).
+DOWNLOADER_MIDDLEWARES = {
+    "bookstoscrape_Scraper.middlewares.BookstoscrapeScraperDownloaderMiddleware": 950,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    "bookstoscrape_Scraper.extensions.AdaptiveThrottle": 500,
+    "bookstoscrape_Scraper.extensions.StatsExport": 510,
+}
+
+# AIMD per-slot controller (see extensions.py): halves the delay then adds one
+# concurrent request per healthy window, halves concurrency on latency or error
+# spikes, and backs off (delay doubled, Retry-After honoured) on 429/503.
+# Hard politeness ceiling: MAX_CONCURRENCY requests in flight and at least
+# MIN_DELAY seconds between two requests to the same domain (managed slots
+# ignore RANDOMIZE_DOWNLOAD_DELAY, which would go down to 0.5 x the delay).
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 8
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.1
+ADAPTIVE_THROTTLE_MAX_DELAY = 60
+ADAPTIVE_THROTTLE_LATENCY_TOLERANCE = 2.0  # window mean latency vs. baseline
+ADAPTIVE_THROTTLE_ERROR_RATE = 0.1  # 5xx and network failures per window
+#ADAPTIVE_THROTTLE_DEBUG = False  # log every decision at INFO level
+
+# Final crawl stats written as JSON at spider close (used by
+# `scrapy crawl_parallel` to combine worker stats); disabled when unset.
+#STATS_EXPORT_PATH = None
+
+# Resumable crawls: with JOBDIR set, the request queue, the request
+# fingerprints and the UPCs already stored live in JOBDIR/frontier.sqlite
+# (see frontier.py). A stopped or killed job resumes where it left off when
+# restarted with the same JOBDIR. Without JOBDIR, both classes behave like
+# Scrapy's defaults and FrontierMiddleware is disabled.
+SCHEDULER = "bookstoscrape_Scraper.frontier.ResumableScheduler"
+DUPEFILTER_CLASS = "bookstoscrape_Scraper.frontier.SQLiteDupeFilter"
+#JOBDIR = "crawls/booktoscrape-1"
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
-    'bookstoscrape_Scraper.pipelines.CleanPricePipeline': 100,
-    'bookstoscrape_Scraper.pipelines.ConvertRatingPipeline': 200,
-    'bookstoscrape_Scraper.pipelines.ExtractAvailabilityPipeline': 300,
+    # Price, rating and availability in one pass (replaces CleanPricePipeline,
+    # ConvertRatingPipeline and ExtractAvailabilityPipeline, kept in pipelines.py)
+    'bookstoscrape_Scraper.pipelines.NormalizePipeline': 100,
     'bookstoscrape_Scraper.pipelines.DuplicatesPipeline': 400,
-    'bookstoscrape_Scraper.pipelines.SaveToSQLitePipeline': 500,
+    'bookstoscrape_Scraper.pipelines.AsyncSQLitePipeline': 500,
 }
 
-# Enable and configure the AutoThrottle extension (disabled by default)
+# SQLite storage (SaveToSQLitePipeline)
+# Items are buffered and written with executemany in a single transaction,
+# flushed every SQLITE_BATCH_SIZE items or SQLITE_FLUSH_INTERVAL seconds
+# (reactor timer: a partial batch is written even when no item arrives).
+# SQLITE_BATCH_SIZE = 1 restores the previous one-commit-per-item behaviour.
+#SQLITE_DB_PATH = None  # defaults to <project root>/data/books.db
+SQLITE_BATCH_SIZE = 500
+SQLITE_FLUSH_INTERVAL = 5.0
+SQLITE_JOURNAL_MODE = "WAL"
+SQLITE_SYNCHRONOUS = "NORMAL"
+# AsyncSQLitePipeline writes from a dedicated thread; when this many items are
+# queued, new items wait on the reactor side (backpressure). Swap it for
+# SaveToSQLitePipeline in ITEM_PIPELINES to write from the reactor thread.
+SQLITE_WRITER_QUEUE_SIZE = 1000
+# Seconds a batch waits for the write lock when several crawlers share the
+# database (scrapy crawl_parallel). SQLITE_FINALIZE = False skips the
+# end-of-crawl refresh (category stats, data version); the coordinator runs it once.
+SQLITE_BUSY_TIMEOUT = 30
+#SQLITE_FINALIZE = True
+# crawl_run shared by every crawl_parallel worker (set by the coordinator);
+# unset, each crawl opens its own run on its first batch.
+#SQLITE_RUN_ID = None
+# Columnar export at the end of each crawl (requires pyarrow): one file per
+# crawl under SNAPSHOT_DIR/history/crawl_date=YYYY-MM-DD/ plus a compacted
+# SNAPSHOT_DIR/current.<ext>; read them with src.database.snapshot_repository.
+#SNAPSHOT_DIR = None  # disabled; e.g. "<project root>/data/snapshots"
+#SNAPSHOT_FORMAT = "parquet"  # or "arrow" (Arrow IPC)
+
+# DuplicatesPipeline: UPCs go through an in-memory scalable bloom filter
+# capped at DUPLICATES_MEMORY_LIMIT bytes; positives are confirmed against
+# an exact on-disk set (JOBDIR/frontier.sqlite, or a temporary directory).
+# Past the cap, the false-positive rate grows (more disk lookups), memory does not.
+DUPLICATES_MEMORY_LIMIT = 8 * 1024 * 1024
+DUPLICATES_ERROR_RATE = 0.001
+
+# Enable and configure the AutoThrottle extension (disabled by default;
+# cannot be combined with ADAPTIVE_THROTTLE_ENABLED)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
 # The initial download delay
@@ -85,7 +157,14 @@ HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 3600
 HTTPCACHE_DIR = "httpcache"
 HTTPCACHE_IGNORE_HTTP_CODES = []
-HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# Single-file SQLite store with compressed bodies (one <spider>.sqlite per
+# spider in HTTPCACHE_DIR). Maintenance: `scrapy httpcache --help`; the old
+# directory tree can be imported with `scrapy httpcache --import-filesystem`.
+HTTPCACHE_STORAGE = "bookstoscrape_Scraper.httpcache.SQLiteCacheStorage"
+HTTPCACHE_SQLITE_COMPRESSION = "zlib"  # or "zstd" (requires zstandard), "none"
+# Expired entries are revalidated with their ETag / Last-Modified instead of
+# being downloaded again; a 304 reuses the cached body (see middlewares.py).
+HTTPCACHE_REVALIDATE = True
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
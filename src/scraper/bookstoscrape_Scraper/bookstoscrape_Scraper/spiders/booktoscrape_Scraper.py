@@ -1,12 +1,63 @@
+import os
+import re
 import scrapy
 from datetime import datetime
 from bookstoscrape_Scraper.items import BookItem
+from bookstoscrape_Scraper.pipelines import PROJECT_ROOT
+
+from src.database.known_books import listing_changed, load_known_books
 
 class BooktoscrapeScraperSpider(scrapy.Spider):
+    """Spider books.toscrape.com.
+
+    Modes (``scrapy crawl booktoscrape_Scraper -a mode=...``) :
+
+    - ``full`` (défaut) : visite toutes les pages produit ;
+    - ``incremental`` : compare le prix et la disponibilité affichés sur
+      les pages de liste avec ``books.db`` et ne visite que les livres
+      nouveaux ou modifiés. Les autres produisent un item ``inchange`` :
+      le pipeline avance seulement ``books.date_scraping``, sans ligne
+      d'historique ;
+    - ``fast`` : les livres déjà en base produisent un item ``partiel``
+      directement depuis la page de liste (titre, prix, note, en stock ou
+      non, image) ; seuls les livres inconnus sont visités pour la
+      description, l'UPC et la catégorie. ~50 requêtes par passage.
+
+    Quel que soit le mode, chaque passage ouvre un ``crawl_runs`` et
+    ``price_history`` ne reçoit une ligne que pour les livres dont le prix,
+    la note ou la disponibilité a changé depuis leur dernière ligne.
+
+    ``-a categories=URL1,URL2`` remplace la page d'accueil par les pages
+    de ces catégories (shards de ``scrapy crawl_parallel``) ; la pagination
+    de chaque catégorie est suivie de la même façon.
+
+    Dans tous les modes, une page produit revalidée par un 304 (voir
+    ``BookstoscrapeScraperDownloaderMiddleware``) n'est pas ré-analysée si
+    le livre est déjà en base : elle produit aussi un item ``inchange``.
+    """
     name = "booktoscrape_Scraper"
     allowed_domains = ["books.toscrape.com"]
     start_urls = ["https://books.toscrape.com"]
 
+    MODES = ('full', 'incremental', 'fast')
+
+    def __init__(self, mode='full', categories=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if mode not in self.MODES:
+            raise ValueError(f"Mode inconnu: {mode} (full, incremental ou fast)")
+        self.mode = mode
+        if categories:
+            self.start_urls = [url.strip() for url in categories.split(',') if url.strip()]
+        self.known_books = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        db_path = crawler.settings.get('SQLITE_DB_PATH') or os.path.join(PROJECT_ROOT, 'data', 'books.db')
+        spider.known_books = load_known_books(db_path)
+        spider.logger.info(f"Mode {spider.mode} : {len(spider.known_books)} livres connus dans {db_path}")
+        return spider
+
     def parse(self, response):
         """Parse la page de liste de livres"""
         products = response.css('article.product_pod')  # ✅ product_pod
@@ -14,16 +65,95 @@ class BooktoscrapeScraperSpider(scrapy.Spider):
         # Pour chaque livre on récupère le lien et on va sur la page détaillée
         for product in products:
             product_link = product.css("h3 a::attr(href)").get()
-            if product_link:
-                yield response.follow(product_link, callback=self.parse_product)
+            if not product_link:
+                continue
+            if self.mode == 'fast':
+                known = self.known_books.get(response.urljoin(product_link))
+                if known is not None:
+                    yield self.listing_item(response, product, known)
+                    continue
+                self.crawler.stats.inc_value('fast/detail_requests')
+            if self.mode == 'incremental':
+                seen = self.unchanged_item(product, response.urljoin(product_link))
+                if seen is not None:
+                    yield seen
+                    continue
+            yield response.follow(product_link, callback=self.parse_product)
             
         # Gestion de la pagination
         next_page = response.css("li.next a::attr(href)").get()
         if next_page:
             yield response.follow(next_page, callback=self.parse)
+
+    def unchanged_item(self, product, url):
+        """Item ``inchange`` si la liste montre le même prix et la même disponibilité.
+
+        Retourne ``None`` pour un livre nouveau ou modifié (page produit à visiter).
+        """
+        known = self.known_books.get(url)
+        prix_text = product.css('p.price_color::text').get()
+        prix_clean = re.sub(r'[^\d.]', '', prix_text or '')
+        prix = float(prix_clean) if prix_clean else None
+        availability = ' '.join(product.css('p.availability::text').getall()).lower()
+        en_stock = 'in stock' in availability
+
+        if listing_changed(known, prix, en_stock):
+            status = 'incremental/new' if known is None else 'incremental/changed'
+            self.crawler.stats.inc_value(status)
+            return None
+
+        self.crawler.stats.inc_value('incremental/unchanged')
+        return self.seen_item(known['upc'], url)
+
+    def listing_item(self, response, product, known):
+        """Item ``partiel`` construit depuis un ``article.product_pod``.
+
+        Données BRUTES comme dans ``parse_product`` (nettoyées par les
+        pipelines) ; l'UPC vient de la base, la liste ne l'affiche pas.
+        """
+        self.crawler.stats.inc_value('fast/listing_items')
+        item = BookItem()
+
+        prix_text = product.css('p.price_color::text').get()
+        rating_class = product.css('p.star-rating::attr(class)').get()
+        rating_original = rating_class.replace('star-rating ', '') if rating_class else None
+        availability_text = ' '.join(
+            text.strip() for text in product.css('p.availability::text').getall()
+        ).strip() or None
+        image_url = product.css('div.image_container img::attr(src)').get()
+        product_link = product.css('h3 a::attr(href)').get()
+
+        item['partiel'] = True
+        item['titre'] = product.css('h3 a::attr(title)').get()
+        item['prix_original'] = prix_text
+        item['prix'] = prix_text
+        item['notation_originale'] = rating_original
+        item['notation'] = rating_original
+        item['disponibilite_texte'] = availability_text
+        item['disponibilite'] = availability_text
+        item['upc'] = known['upc']
+        item['url'] = response.urljoin(product_link)
+        item['image'] = response.urljoin(image_url) if image_url else None
+        item['date_scraping'] = datetime.now().isoformat()
+        return item
+
+    def seen_item(self, upc, url):
+        """Item ``inchange`` : livre vu, état connu toujours valable."""
+        item = BookItem()
+        item['inchange'] = True
+        item['upc'] = upc
+        item['url'] = url
+        item['date_scraping'] = datetime.now().isoformat()
+        return item
             
     def parse_product(self, response):
         """Parse la page détaillée d'un livre"""
+        # Page identique à la version en cache (304) : l'état connu suffit
+        known = self.known_books.get(response.url)
+        if 'revalidated' in response.flags and known is not None:
+            self.crawler.stats.inc_value('revalidation/parse_skipped')
+            yield self.seen_item(known['upc'], response.url)
+            return
         
         # Créer une instance de BookItem
         item = BookItem()
@@ -0,0 +1,30 @@
+"""Configuration pytest commune.
+
+Les tests qui ouvrent la base par défaut (``BookRepository()``) utilisent
+un petit catalogue synthétique, généré une fois par session : ils ne
+dépendent plus d'un ``data/books.db`` produit par un crawl. Une variable
+``BOOKS_DB_PATH`` déjà définie est respectée.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import build_catalogue
+
+
+@pytest.fixture(scope='session', autouse=True)
+def books_db(tmp_path_factory):
+    """Chemin de la base utilisée par défaut pendant la session."""
+    if os.environ.get('BOOKS_DB_PATH'):
+        yield os.environ['BOOKS_DB_PATH']
+        return
+    db_path = str(tmp_path_factory.mktemp('data') / 'books.db')
+    build_catalogue(db_path, n_books=500, n_crawls=3)
+    os.environ['BOOKS_DB_PATH'] = db_path
+    yield db_path
+    del os.environ['BOOKS_DB_PATH']
@@ -0,0 +1,80 @@
+"""Tests des agrégats par catégorie et de leur mise à jour incrémentale."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.aggregates import refresh_category_stats
+from src.database.book_repository import BookRepository
+from src.database.migrations import apply_migrations
+
+STATS_SQL = "SELECT category, nb_livres, prix_total, prix_min, prix_max, stock_total FROM category_stats ORDER BY category"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    # Comme les connexions du pipeline : INSERT OR REPLACE déclenche AFTER DELETE
+    conn.execute("PRAGMA recursive_triggers = ON")
+    apply_migrations(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO books (upc, titre, category, prix, notation, disponibilite) VALUES (?, ?, ?, ?, ?, ?)",
+            [('a', 'A', 'Poetry', 10.0, 1, 3), ('b', 'B', 'Poetry', 20.0, 3, 0),
+             ('c', 'C', 'Travel', 30.0, 5, 2)]
+        )
+    yield conn
+    conn.close()
+
+
+def test_refresh_only_touches_modified_categories(conn):
+    """Premier calcul complet, puis seulement les catégories dont un livre a changé."""
+    assert refresh_category_stats(conn) == 2
+    assert conn.execute(STATS_SQL).fetchall() == [
+        ('Poetry', 2, 30.0, 10.0, 20.0, 3), ('Travel', 1, 30.0, 30.0, 30.0, 2),
+    ]
+    assert refresh_category_stats(conn) == 0
+
+    # Livre revu sans changement (mode incrémental) ou prix réécrit à l'identique (mode fast)
+    with conn:
+        conn.execute("UPDATE books SET date_scraping = '2025-01-02' WHERE upc = 'c'")
+        conn.execute("UPDATE books SET prix = 30.0, notation = 5 WHERE upc = 'c'")
+    assert refresh_category_stats(conn) == 0
+
+    travel_updated_at = conn.execute("SELECT updated_at FROM category_stats WHERE category = 'Travel'").fetchone()
+    with conn:
+        conn.execute("UPDATE books SET prix = 40.0 WHERE upc = 'a'")
+    assert refresh_category_stats(conn) == 1
+    assert conn.execute(STATS_SQL).fetchall()[0] == ('Poetry', 2, 60.0, 20.0, 40.0, 3)
+    assert conn.execute(
+        "SELECT updated_at FROM category_stats WHERE category = 'Travel'"
+    ).fetchone() == travel_updated_at
+
+
+def test_category_change_refreshes_both_categories(conn):
+    """Un livre qui change de catégorie (INSERT OR REPLACE) met à jour l'ancienne et la nouvelle."""
+    refresh_category_stats(conn)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO books (upc, titre, category, prix, notation, disponibilite)"
+            " VALUES ('c', 'C', 'Poetry', 30.0, 5, 2)"
+        )
+    assert refresh_category_stats(conn) == 2
+    # Travel n'a plus de livre : sa ligne disparaît
+    assert conn.execute(STATS_SQL).fetchall() == [('Poetry', 3, 60.0, 10.0, 30.0, 5)]
+
+
+def test_repository_reads_category_stats(conn, tmp_path):
+    """Statistiques globales et par catégorie lues dans le résumé."""
+    refresh_category_stats(conn)
+    repo = BookRepository(str(tmp_path / 'books.db'))
+
+    stats = repo.get_statistics()
+    assert (stats['total_livres'], stats['nb_categories'], stats['prix_moyen'], stats['stock_total']) == \
+        (3, 2, 20.0, 5)
+    assert repo.get_all_categories() == ['Poetry', 'Travel']
+    assert repo.get_top_categories(1) == [{'category': 'Poetry', 'nb_livres': 2}]
@@ -0,0 +1,181 @@
+"""Tests du pipeline SQLite asynchrone (thread d'écriture dédié)."""
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from twisted.python.failure import Failure
+
+from bookstoscrape_Scraper.pipelines import AsyncSQLitePipeline
+from tests.test_extensions import FakeStats
+from tests.test_pipelines import count_rows, make_item
+
+
+class FakeEngine:
+    def __init__(self):
+        self.paused = False
+        self.pauses = 0
+        self.closed = None
+
+    def pause(self):
+        self.paused = True
+        self.pauses += 1
+
+    def unpause(self):
+        self.paused = False
+
+    def close_spider(self, spider, reason='cancelled'):
+        self.closed = reason
+
+
+class FakeCrawler:
+    def __init__(self):
+        self.engine = FakeEngine()
+        self.crawling = True
+
+
+class Reactor:
+    """Remplace ``reactor.callFromThread`` : le test exécute les appels du thread d'écriture."""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def __call__(self, func, *args):
+        self.calls.put((func, args))
+
+    def run_until(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "condition jamais remplie"
+            try:
+                func, args = self.calls.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            func(*args)
+
+    def stop(self, pipeline):
+        """``close_spider`` sans reactor : arrêt du thread, appels exécutés au fil de l'eau."""
+        stopper = threading.Thread(target=pipeline._stop_writer)
+        stopper.start()
+        self.run_until(lambda: not stopper.is_alive() and self.calls.empty())
+        stopper.join()
+
+
+@pytest.fixture
+def spider():
+    return scrapy.Spider(name='test')
+
+
+def make_pipeline(tmp_path, spider, **kwargs):
+    pipeline = AsyncSQLitePipeline(
+        db_path=str(tmp_path / 'books.db'), stats=FakeStats(), crawler=FakeCrawler(), **kwargs
+    )
+    pipeline._to_reactor = Reactor()
+    pipeline.spider = spider
+    return pipeline
+
+
+def process(pipeline, spider, items):
+    """Envoie les items ; retourne la liste (remplie au fil des Deferreds) de leurs résultats."""
+    results = []
+    for item in items:
+        pipeline.process_item(item, spider).addBoth(results.append)
+    return results
+
+
+def test_deferreds_fire_once_items_are_committed(tmp_path, spider):
+    """Chaque Deferred rend son item après le commit de son lot."""
+    pipeline = make_pipeline(tmp_path, spider, batch_size=10)
+    pipeline.open_spider(spider)
+    items = [make_item(i) for i in range(25)]
+    committed = []
+    for item in items:
+        pipeline.process_item(item, spider).addCallback(
+            lambda result: committed.append((result, count_rows(pipeline.db_path, 'books')))
+        )
+
+    pipeline._to_reactor.run_until(lambda: len(committed) == 25)
+    assert [result for result, _ in committed] == items
+    # Livre déjà lisible par une autre connexion quand son Deferred se déclenche
+    assert all(rows >= i + 1 for i, (_, rows) in enumerate(committed))
+
+    pipeline._to_reactor.stop(pipeline)
+    assert pipeline.stats['sqlite_writer/items'] == 25
+    assert not pipeline.writer.is_alive()
+
+
+def test_full_queue_applies_backpressure(tmp_path, spider):
+    """File pleine : les items attendent, le moteur est mis en pause puis relancé."""
+    pipeline = make_pipeline(tmp_path, spider, queue_size=2, batch_size=1)
+    # Thread d'écriture pas encore démarré : la file ne se vide pas
+    results = process(pipeline, spider, [make_item(i) for i in range(6)])
+
+    assert pipeline.queue.qsize() == 2 and len(pipeline.waiting) == 4
+    assert pipeline.stats['sqlite_writer/backpressure'] == 4
+    assert pipeline.stats['sqlite_writer/queue_depth_max'] == 6
+    assert pipeline.crawler.engine.paused and pipeline.stats['sqlite_writer/paused'] == 1
+
+    pipeline.open_spider(spider)
+    pipeline._to_reactor.run_until(lambda: len(results) == 6)
+    assert not pipeline.crawler.engine.paused
+    assert pipeline.stats['sqlite_writer/batches'] == 6
+    assert pipeline.stats['sqlite_writer/queue_depth'] == 0
+    pipeline._to_reactor.stop(pipeline)
+    assert count_rows(pipeline.db_path, 'books') == 6
+
+
+def test_close_flushes_pending_items(tmp_path, spider):
+    """close_spider écrit tout ce qui est en file, ferme le run et finalise."""
+    pipeline = make_pipeline(tmp_path, spider, batch_size=100)
+    results = process(pipeline, spider, [make_item(i) for i in range(5)])
+    pipeline.open_spider(spider)
+    pipeline._to_reactor.stop(pipeline)
+
+    assert len(results) == 5 and not any(isinstance(r, Failure) for r in results)
+    assert count_rows(pipeline.db_path, 'books') == 5
+    conn = sqlite3.connect(pipeline.db_path)
+    finished = conn.execute("SELECT finished_at FROM crawl_runs").fetchall()
+    stats = conn.execute("SELECT nb_livres FROM category_stats").fetchall()
+    conn.close()
+    assert len(finished) == 1 and finished[0][0] is not None
+    assert stats == [(5,)]
+
+
+@pytest.mark.parametrize('stage', ['connect', 'write'])
+def test_writer_failure_fails_every_pending_item(tmp_path, spider, monkeypatch, stage):
+    """Thread d'écriture arrêté : items en file et en attente en erreur, spider fermé, rien ne bloque."""
+    pipeline = make_pipeline(tmp_path, spider, queue_size=1, batch_size=1)
+    if stage == 'connect':
+        connect = pipeline._connect
+
+        def failing_connect(check_same_thread=True):
+            if not check_same_thread:  # connexion du thread d'écriture
+                raise OSError("disque indisponible")
+            return connect(check_same_thread)
+        monkeypatch.setattr(pipeline, '_connect', failing_connect)
+    else:
+        def failing_write(conn, batch):
+            raise RuntimeError("bug d'écriture")
+        monkeypatch.setattr(pipeline, '_write_batch', failing_write)
+
+    results = process(pipeline, spider, [make_item(i) for i in range(3)])
+    pipeline.open_spider(spider)
+    pipeline._to_reactor.run_until(lambda: len(results) == 3)
+
+    assert all(isinstance(r, Failure) for r in results)
+    assert pipeline.crawler.engine.closed == 'sqlite_writer_failed'
+    assert not pipeline.crawler.engine.paused
+    assert pipeline.stats['sqlite_writer/writer_failed'] == 1
+    # Les items suivants échouent immédiatement
+    assert isinstance(process(pipeline, spider, [make_item(9)])[0], Failure)
+
+    pipeline._to_reactor.stop(pipeline)
+    assert not pipeline.writer.is_alive()
@@ -0,0 +1,55 @@
+"""Tests unitaires du repository asynchrone."""
+import asyncio
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.async_repository import AsyncBookRepository, run_inline
+from src.database.migrations import apply_migrations
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Petite base avec un livre."""
+    path = str(tmp_path / 'books.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO books (titre, category) VALUES ('Livre', 'Travel')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_queries_run_in_executor(db_path):
+    """Les lectures s'exécutent hors de la boucle, dans le pool dédié."""
+    repository = AsyncBookRepository(db_path)
+    threads = []
+    original = repository.repository.get_book_by_id
+
+    def spy(book_id):
+        threads.append(threading.current_thread().name)
+        return original(book_id)
+
+    repository.repository.get_book_by_id = spy
+    book = asyncio.run(repository.get_book_by_id(1))
+    repository.close()
+
+    assert book['titre'] == 'Livre'
+    assert threads[0].startswith('sqlite-read')
+
+
+def test_inline_mode(db_path):
+    """En mode inline, la coroutine se déroule sans boucle d'événements."""
+    repository = AsyncBookRepository(db_path, inline=True)
+
+    books = run_inline(repository.get_books_by_category('Travel'))
+    assert [book['titre'] for book in books] == ['Livre']
+
+    with pytest.raises(RuntimeError):
+        run_inline(asyncio.sleep(0))
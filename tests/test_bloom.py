@@ -0,0 +1,67 @@
+"""Tests des filtres de Bloom et de la détection de doublons à mémoire bornée."""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from scrapy.exceptions import DropItem
+
+from bookstoscrape_Scraper.bloom import ScalableBloomFilter
+from bookstoscrape_Scraper.items import BookItem
+from bookstoscrape_Scraper.pipelines import DuplicatesPipeline
+
+
+class FakeStats(dict):
+    """Collecteur de statistiques minimal."""
+
+    def inc_value(self, key, count=1, start=0, spider=None):
+        self[key] = self.get(key, start) + count
+
+    def set_value(self, key, value, spider=None):
+        self[key] = value
+
+
+def test_scalable_bloom_filter_grows_within_memory_limit():
+    """Le filtre grandit par paliers sans dépasser son plafond, sans faux négatif."""
+    bloom = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01, max_bytes=8 * 1024)
+    keys = [f"{i:016x}" for i in range(20000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert len(bloom.filters) > 1
+    assert bloom.saturated
+    assert bloom.nbytes <= 8 * 1024
+    assert all(key in bloom for key in keys)
+
+    # Sous la capacité, le taux de faux positifs reste proche de la cible
+    small = ScalableBloomFilter(initial_capacity=5000, error_rate=0.01)
+    for key in keys[:5000]:
+        small.add(key)
+    false_positives = sum(1 for key in keys[10000:] if key in small)
+    assert false_positives / 10000 < 0.02
+
+
+def test_duplicates_pipeline_is_exact_when_filter_saturates():
+    """Filtre minuscule : les faux positifs sont vérifiés sur disque, seul le vrai doublon est écarté."""
+    spider = scrapy.Spider(name='test')
+    stats = FakeStats()
+    pipeline = DuplicatesPipeline(memory_limit=64, error_rate=0.01, stats=stats)
+    pipeline.open_spider(spider)
+    tmpdir = pipeline.tmpdir
+
+    for i in range(2000):
+        pipeline.process_item(BookItem(upc=f"{i:016x}"), spider)
+    with pytest.raises(DropItem):
+        pipeline.process_item(BookItem(upc=f"{42:016x}"), spider)
+    pipeline.close_spider(spider)
+
+    assert stats['duplicates/dropped'] == 1
+    assert stats['duplicates/upcs'] > 0
+    assert stats['duplicates/false_positives'] > 0
+    assert stats['duplicates/bloom_hits'] == stats['duplicates/false_positives'] + 1
+    assert not os.path.exists(tmpdir)
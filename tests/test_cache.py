@@ -0,0 +1,71 @@
+"""Tests unitaires du cache de réponses de l'API."""
+import sys
+from pathlib import Path
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.api.cache import ResponseCache, VersionPoller, make_etag, make_key, not_modified
+from src.database.async_repository import run_inline
+
+
+def test_lru_eviction():
+    """Au-delà de max_entries, l'entrée la moins récente est évincée."""
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', 1, b'A')
+    cache.set('b', 1, b'B')
+    cache.get('a', 1)
+    cache.set('c', 1, b'C')
+
+    assert cache.get('a', 1) == b'A'
+    assert cache.get('b', 1) is None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_new_data_version_invalidates():
+    """Une nouvelle version des données vide le cache."""
+    cache = ResponseCache()
+    cache.set('a', 1, b'A')
+
+    assert cache.get('a', 2) is None
+    # Une réponse calculée sur l'ancienne version n'est plus acceptée
+    cache.set('a', 1, b'A')
+    assert cache.get('a', 2) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_ttl_expiry():
+    """Une entrée plus vieille que le TTL est ignorée."""
+    cache = ResponseCache(ttl=0)
+    cache.set('a', 1, b'A')
+
+    assert cache.get('a', 1) is None
+
+
+def test_conditional_requests():
+    """If-None-Match prime sur If-Modified-Since."""
+    key = make_key('list_books', {'limit': 50, 'offset': 0})
+    etag = make_etag(key, 3)
+    last_modified = "Sat, 01 Mar 2025 10:00:00 GMT"
+
+    assert not_modified({'if-none-match': etag}, etag, last_modified)
+    assert not not_modified({'if-none-match': make_etag(key, 4)}, etag, last_modified)
+    assert not_modified({'if-modified-since': last_modified}, etag, last_modified)
+    assert not not_modified({'if-modified-since': "Fri, 28 Feb 2025 10:00:00 GMT"}, etag, last_modified)
+
+
+def test_version_is_polled_once_per_interval():
+    """La version n'est relue qu'à l'expiration de l'intervalle ; 0 relit à chaque appel."""
+    reads = []
+
+    async def get_version():
+        reads.append(1)
+        return {'version': len(reads), 'updated_at': None}
+
+    poller = VersionPoller(get_version, interval=60)
+    assert [run_inline(poller())['version'] for _ in range(5)] == [1] * 5
+    assert poller.stats()['polls'] == 1
+
+    poller.interval = 0
+    assert run_inline(poller())['version'] == 2
+    assert run_inline(poller())['version'] == 3
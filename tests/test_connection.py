@@ -0,0 +1,110 @@
+"""Tests unitaires du pool de connexions."""
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.connection import ConnectionPool, DatabaseConnection
+from src.database.migrations import LATEST_VERSION, SchemaOutdatedError, apply_migrations
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Petite base avec une table books."""
+    path = str(tmp_path / 'books.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO books (titre) VALUES ('Livre')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_connections_are_reused(db_path):
+    """Une connexion rendue au pool est réutilisée."""
+    db = DatabaseConnection(db_path)
+
+    for _ in range(5):
+        with db.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 1
+
+    metrics = db.pool_metrics()
+    assert metrics['opened'] == 1
+    assert metrics['acquired'] == 5
+    assert metrics['hits'] == 4
+
+
+def test_connections_are_read_only(db_path):
+    """Les connexions du pool refusent les écritures."""
+    pool = ConnectionPool(db_path)
+
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO books (titre) VALUES ('Autre')")
+
+
+def test_pool_waits_when_exhausted(db_path):
+    """Au-delà de max_size, les emprunteurs attendent une connexion libre."""
+    pool = ConnectionPool(db_path, max_size=1, timeout=5)
+    conn = pool.acquire()
+    results = []
+
+    def borrow():
+        with pool.connection() as other:
+            results.append(other.execute("SELECT titre FROM books").fetchone()[0])
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    while pool.metrics()['waits'] == 0:
+        pass
+    pool.release(conn)
+    thread.join()
+
+    assert results == ['Livre']
+    assert pool.metrics()['opened'] == 1
+
+
+def test_migrations_are_opt_in(tmp_path):
+    """Ouvrir la base en lecture ne touche pas au schéma, sauf avec migrate=True."""
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, target=1)
+    conn.close()
+
+    def schema_version():
+        check = sqlite3.connect(path)
+        try:
+            return check.execute("SELECT MAX(version) FROM schema_migrations").fetchone()[0]
+        finally:
+            check.close()
+
+    DatabaseConnection(path)
+    assert schema_version() == 1
+    DatabaseConnection(path, migrate=True)
+    assert schema_version() > 1
+
+
+def test_check_schema_refuses_outdated_database(tmp_path):
+    """Base antérieure aux migrations : erreur explicite, sans toucher au schéma."""
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    # Tables d'origine (migration 1), sans table schema_migrations
+    apply_migrations(conn, target=1)
+    conn.execute("DROP TABLE schema_migrations")
+    conn.close()
+
+    db = DatabaseConnection(path)
+    with pytest.raises(SchemaOutdatedError, match="python -m src.database.migrations"):
+        db.check_schema()
+    assert db.schema_version() == 0
+
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.close()
+    db.check_schema()
+    assert db.schema_version() == LATEST_VERSION
@@ -0,0 +1,133 @@
+"""Tests unitaires du coordinateur scrapy crawl_parallel."""
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+import scrapy
+from scrapy.exceptions import UsageError
+from scrapy.settings import Settings
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+from bookstoscrape_Scraper.commands.crawl_parallel import (
+    DEFAULT_WORKERS,
+    Command,
+    assign_categories,
+    combine_stats,
+    concurrency_ceiling,
+    parse_categories,
+)
+from bookstoscrape_Scraper.pipelines import SaveToSQLitePipeline
+from src.database.migrations import apply_migrations
+from tests.test_pipelines import make_item
+
+HOMEPAGE = """
+<div class="side_categories"><ul class="nav nav-list"><li>
+  <a href="catalogue/category/books_1/index.html">Books</a>
+  <ul>
+    <li><a href="catalogue/category/books/travel_2/index.html">
+        Travel
+    </a></li>
+    <li><a href="catalogue/category/books/mystery_3/index.html">Mystery</a></li>
+    <li><a href="catalogue/category/books/poetry_23/index.html">Poetry</a></li>
+  </ul>
+</li></ul></div>
+"""
+
+
+def test_categories_are_balanced_by_size():
+    """Barre latérale lue une fois ; la plus grosse catégorie a son propre worker."""
+    categories = parse_categories(HOMEPAGE)
+    assert categories[0] == ("Travel", "https://books.toscrape.com/catalogue/category/books/travel_2/index.html")
+    assert [name for name, _ in categories] == ["Travel", "Mystery", "Poetry"]
+
+    shards = assign_categories(categories, 2, {"Travel": 11, "Mystery": 32, "Poetry": 19})
+    assert [[name for name, _ in shard] for shard in shards] == [["Mystery"], ["Poetry", "Travel"]]
+    # Plus de workers que de catégories : les workers vides sont retirés
+    assert len(assign_categories(categories, 8)) == 3
+
+
+def test_worker_stats_are_combined():
+    """Compteurs additionnés, maxima et durées gardés au plus haut."""
+    combined = combine_stats([
+        {"item_scraped_count": 300, "elapsed_time_seconds": 40.0, "adaptive_throttle/max_concurrency": 2,
+         "revalidation/not_modified": 3, "revalidation/modified": 1, "finish_reason": "finished",
+         "start_time": "2025-01-01 10:00:01"},
+        {"item_scraped_count": 382, "elapsed_time_seconds": 45.5, "adaptive_throttle/max_concurrency": 4,
+         "revalidation/not_modified": 1, "finish_reason": "finished",
+         "start_time": "2025-01-01 10:00:00"},
+    ])
+    assert combined["item_scraped_count"] == 682
+    assert combined["elapsed_time_seconds"] == 45.5
+    assert combined["adaptive_throttle/max_concurrency"] == 4
+    assert combined["revalidation/not_modified_ratio"] == 0.8
+    assert combined["finish_reason"] == "finished"
+    assert combined["start_time"] == "2025-01-01 10:00:00"
+
+
+def test_workers_never_exceed_the_politeness_ceiling():
+    """Au-delà du plafond de concurrence, --workers est refusé ; en deçà, la somme le respecte."""
+    settings = Settings({"ADAPTIVE_THROTTLE_ENABLED": True, "ADAPTIVE_THROTTLE_MAX_CONCURRENCY": 8,
+                         "CONCURRENT_REQUESTS_PER_DOMAIN": 1})
+    assert concurrency_ceiling(settings) == 8
+
+    command = Command()
+    command.settings = settings
+    parser = argparse.ArgumentParser()
+    command.add_options(parser)
+    opts = parser.parse_args([])
+    command.process_options([], opts)
+    assert opts.workers == DEFAULT_WORKERS
+    with pytest.raises(UsageError):
+        command.process_options([], parser.parse_args(["--workers", "12"]))
+
+    for workers in range(1, 9):
+        per_worker = command._worker_settings(workers, "books.db", Path("run"), 0)
+        assert per_worker["ADAPTIVE_THROTTLE_MAX_CONCURRENCY"] * workers <= 8
+
+
+def test_default_workers_fit_a_low_ceiling():
+    """Sans throttle adaptatif, le défaut est ramené au plafond ; seul -w explicite est refusé."""
+    command = Command()
+    command.settings = Settings({"ADAPTIVE_THROTTLE_ENABLED": False, "CONCURRENT_REQUESTS_PER_DOMAIN": 1})
+    parser = argparse.ArgumentParser()
+    command.add_options(parser)
+
+    opts = parser.parse_args([])
+    command.process_options([], opts)
+    assert opts.workers == 1
+    with pytest.raises(UsageError):
+        command.process_options([], parser.parse_args(["-w", "2"]))
+
+
+def test_workers_share_the_coordinator_run(tmp_path):
+    """Un seul crawl_runs pour tous les workers ; supprimé si aucun lot n'a été écrit."""
+    db_path = str(tmp_path / 'books.db')
+    conn = sqlite3.connect(db_path)
+    apply_migrations(conn)
+    conn.close()
+    spider = scrapy.Spider(name='test')
+
+    run_id = Command._open_run(db_path)
+    command = Command()
+    command.settings = Settings()
+    assert command._worker_settings(2, db_path, Path("run"), 0, run_id)["SQLITE_RUN_ID"] == run_id
+    for worker in range(2):
+        pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=1, finalize=False, run_id=run_id)
+        pipeline.open_spider(spider)
+        pipeline.process_item(make_item(worker), spider)
+        pipeline.close_spider(spider)
+    assert Command._close_run(db_path, run_id)
+
+    empty = Command._open_run(db_path)
+    assert not Command._close_run(db_path, empty)
+
+    conn = sqlite3.connect(db_path)
+    runs = conn.execute("SELECT id, finished_at IS NOT NULL FROM crawl_runs").fetchall()
+    history_runs = conn.execute("SELECT DISTINCT run_id FROM price_history").fetchall()
+    conn.close()
+    assert runs == [(run_id, 1)]
+    assert history_runs == [(run_id,)]
@@ -0,0 +1,102 @@
+"""Tests des endpoints d'export en flux (/export/books, /export/history)."""
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.api.export import csv_chunks, stream
+from src.database.book_repository import BookRepository
+
+
+@pytest.fixture
+def api(books_db, monkeypatch):
+    """Module de l'API (importé après ``BOOKS_DB_PATH``), lots de 7 lignes."""
+    from src.api import main
+    monkeypatch.setattr(main, 'EXPORT_BATCH_SIZE', 7)
+    return main
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+    return TestClient(api.app)
+
+
+def count(db_path, query):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(query).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_csv_header_without_rows():
+    """L'en-tête vient de la liste des colonnes : écrit même sans ligne, lots vides ignorés."""
+    assert b''.join(csv_chunks([], ['id', 'titre'])) == b'id,titre\r\n'
+    chunks = list(csv_chunks([[], [{'id': 1, 'titre': 'A'}], []], ['id', 'titre']))
+    assert b''.join(chunks) == b'id,titre\r\n1,A\r\n'
+
+
+def test_export_books_ndjson_streams_all_batches(client, books_db):
+    """Tous les livres, lus par lots de 7, dans l'ordre des ID."""
+    with client.stream('GET', '/export/books') as response:
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        chunks = [chunk for chunk in response.iter_bytes() if chunk]
+    rows = [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+
+    assert len(rows) == count(books_db, "SELECT COUNT(*) FROM books")
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+    assert list(rows[0]) == BookRepository.BOOK_EXPORT_COLUMNS
+
+    # Un morceau par lot : la réponse n'est jamais construite en mémoire
+    batches = list(BookRepository().iter_books(batch_size=7))
+    assert len(batches) > 1 and max(len(batch) for batch in batches) == 7
+    assert len(list(stream(iter(batches), 'ndjson', BookRepository.BOOK_EXPORT_COLUMNS))) == len(batches)
+
+
+def test_suspended_export_does_not_hold_a_pool_connection(books_db):
+    """Entre deux lots, l'export rend sa connexion : le pool reste disponible."""
+    repository = BookRepository()
+    repository.db.pool.max_size = 1
+    repository.db.pool.timeout = 0.1
+    batches = repository.iter_history(batch_size=5)
+    first = next(batches)
+
+    # Client lent : le générateur est suspendu, une autre requête passe quand même
+    assert len(repository.get_all_categories()) == count(books_db, "SELECT COUNT(DISTINCT category) FROM books")
+    rows = first + [row for batch in batches for row in batch]
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+    assert len({row['id'] for row in rows}) == count(books_db, "SELECT COUNT(*) FROM scraping_history")
+
+
+def test_export_history_csv_gzip(client, books_db):
+    """CSV compressé : en-tête connu puis une ligne par changement."""
+    with client.stream('GET', '/export/history', params={'format': 'csv', 'gzip': True}) as response:
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['content-type'] == 'text/csv; charset=utf-8'
+        # Octets reçus, avant la décompression automatique du client
+        body = b''.join(response.iter_raw())
+
+    reader = csv.reader(io.StringIO(gzip.decompress(body).decode('utf-8')))
+    header, *rows = list(reader)
+    assert header == BookRepository.HISTORY_EXPORT_COLUMNS
+    assert len(rows) == count(books_db, "SELECT COUNT(*) FROM scraping_history")
+
+
+@pytest.mark.parametrize('fmt, expected', [
+    ('csv', (','.join(BookRepository.BOOK_EXPORT_COLUMNS) + '\r\n').encode('utf-8')),
+    ('ndjson', b''),
+])
+def test_export_empty_result(client, fmt, expected):
+    """Aucun livre : un CSV garde son en-tête, un NDJSON est vide."""
+    response = client.get('/export/books', params={'format': fmt, 'category': 'Inexistante'})
+    assert response.status_code == 200
+    assert response.content == expected
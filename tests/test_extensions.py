@@ -0,0 +1,91 @@
+"""Tests unitaires du contrôleur AdaptiveThrottle."""
+import sys
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from scrapy.core.downloader import Slot
+from scrapy.settings import Settings
+
+from bookstoscrape_Scraper.extensions import AdaptiveThrottle
+
+
+class FakeStats(dict):
+    """Collecteur de statistiques minimal."""
+
+    def inc_value(self, key, count=1, start=0, spider=None):
+        self[key] = self.get(key, start) + count
+
+    def get_value(self, key, default=None, spider=None):
+        return self.get(key, default)
+
+    def set_value(self, key, value, spider=None):
+        self[key] = value
+
+    def max_value(self, key, value, spider=None):
+        self[key] = max(self.get(key, value), value)
+
+
+def make_throttle(**settings):
+    stats = FakeStats()
+    throttle = AdaptiveThrottle(Settings({
+        'ADAPTIVE_THROTTLE_MAX_CONCURRENCY': 8,
+        'ADAPTIVE_THROTTLE_MIN_DELAY': 0.1,
+        **settings
+    }), stats)
+    return throttle, stats, Slot(concurrency=1, delay=1.0, randomize_delay=False), scrapy.Spider(name='test')
+
+
+def test_healthy_slot_ramps_up_to_ceiling():
+    """Réponses rapides : délai au plancher, puis concurrence jusqu'au plafond, sans le dépasser."""
+    throttle, stats, slot, spider = make_throttle()
+    for _ in range(200):
+        throttle.record('books.toscrape.com', slot, spider, 200, 0.2)
+
+    assert slot.delay == 0.1
+    assert slot.concurrency == 8
+    assert stats.get_value('adaptive_throttle/max_concurrency') == 8
+    assert stats.get_value('adaptive_throttle/ceiling') > 0
+
+
+def test_managed_slot_never_waits_less_than_min_delay():
+    """RANDOMIZE_DOWNLOAD_DELAY (vrai par défaut) ignoré : le délai effectif reste au plancher."""
+    throttle, stats, _, spider = make_throttle()
+    slot = Slot(concurrency=1, delay=0.0, randomize_delay=True)
+    for _ in range(200):
+        throttle.record('books.toscrape.com', slot, spider, 200, 0.2)
+
+    assert not slot.randomize_delay
+    assert min(slot.download_delay() for _ in range(1000)) >= 0.1
+
+
+def test_throttled_response_backs_off():
+    """Un 429 divise la concurrence, double le délai, suspend le slot et fixe un plancher."""
+    throttle, stats, slot, spider = make_throttle()
+    for _ in range(200):
+        throttle.record('books.toscrape.com', slot, spider, 200, 0.2)
+
+    throttle.record('books.toscrape.com', slot, spider, 429, 0.01, retry_after=5)
+    assert slot.concurrency == 4
+    assert slot.delay == 0.2
+    assert slot.lastseen > 0
+    assert stats.get_value('adaptive_throttle/decrease/429') == 1
+    assert stats.get_value('adaptive_throttle/retry_after') == 1
+
+    for _ in range(200):
+        throttle.record('books.toscrape.com', slot, spider, 200, 0.2)
+    assert slot.delay == 0.12
+
+
+def test_latency_spike_halves_concurrency():
+    """Une latence très au-dessus de la référence divise la concurrence par deux."""
+    throttle, stats, slot, spider = make_throttle()
+    for _ in range(200):
+        throttle.record('books.toscrape.com', slot, spider, 200, 0.2)
+    while not stats.get_value('adaptive_throttle/decrease/latency'):
+        throttle.record('books.toscrape.com', slot, spider, 200, 2.0)
+
+    assert slot.concurrency == 4
+    assert stats.get_value('adaptive_throttle/decrease/latency') == 1
@@ -0,0 +1,133 @@
+"""Tests de la frontière de crawl persistante (JOBDIR)."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from scrapy.exceptions import DropItem
+from scrapy.http import HtmlResponse
+
+from bookstoscrape_Scraper.frontier import FrontierMiddleware, FrontierStore, SQLiteRequestQueue
+from bookstoscrape_Scraper.items import BookItem
+from bookstoscrape_Scraper.pipelines import DuplicatesPipeline, SaveToSQLitePipeline
+from tests.test_pipelines import make_item
+
+
+class BooksSpider(scrapy.Spider):
+    name = 'test'
+
+    def parse_product(self, response):
+        pass
+
+
+def test_queue_resumes_pending_and_in_progress_requests(tmp_path):
+    """Après un arrêt brutal, la file reprend les requêtes en attente et celles en cours."""
+    spider = BooksSpider()
+    store = FrontierStore.open(str(tmp_path))
+    queue = SQLiteRequestQueue(store, spider)
+    queue.push(scrapy.Request('https://books.toscrape.com/a.html', callback=spider.parse_product))
+    queue.push(scrapy.Request('https://books.toscrape.com/b.html'))
+    queue.push(scrapy.Request('https://books.toscrape.com/c.html', priority=5))
+
+    # Priorité d'abord, puis LIFO
+    first = queue.pop()
+    assert first.url.endswith('c.html')
+    second = queue.pop()
+    assert second.url.endswith('b.html')
+    # c.html traitée sans requête fille : elle quitte la file ; b.html reste en cours
+    store.settle(first.meta[SQLiteRequestQueue.META_KEY], 0)
+    assert len(queue) == 1
+    store.commit()
+    # Processus tué : pas de close(), la connexion est abandonnée
+    FrontierStore._stores.clear()
+
+    store = FrontierStore.open(str(tmp_path))
+    queue = SQLiteRequestQueue(store, spider)
+    assert len(queue) == 2
+    assert queue.pop().url.endswith('b.html')
+    resumed = queue.pop()
+    assert resumed.url.endswith('a.html')
+    assert resumed.callback == spider.parse_product
+    assert queue.pop() is None
+    store.release()
+
+
+def test_duplicates_pipeline_remembers_upcs_across_runs(tmp_path):
+    """Avec JOBDIR, un UPC enregistré avant la reprise reste un doublon."""
+    spider = BooksSpider()
+    pipeline = DuplicatesPipeline(jobdir=str(tmp_path))
+    pipeline.open_spider(spider)
+    pipeline.process_item(BookItem(upc='a897fe39b1053632'), spider)
+    pipeline.close_spider(spider)
+
+    pipeline = DuplicatesPipeline(jobdir=str(tmp_path))
+    pipeline.open_spider(spider)
+    with pytest.raises(DropItem):
+        pipeline.process_item(BookItem(upc='a897fe39b1053632'), spider)
+    assert pipeline.process_item(BookItem(upc='90fa61229261140a'), spider)
+    pipeline.close_spider(spider)
+
+
+def crawl_products(jobdir, db_path, spider, kill_after=None):
+    """Traite les pages produit en file comme le moteur (callback, middleware,
+    pipelines) ; ``kill_after`` pages traitées, le processus est tué."""
+    store = FrontierStore.open(jobdir)
+    queue = SQLiteRequestQueue(store, spider)
+    middleware = FrontierMiddleware(jobdir)
+    middleware.spider_opened(spider)
+    duplicates = DuplicatesPipeline(jobdir=jobdir)
+    duplicates.open_spider(spider)
+    storage = SaveToSQLitePipeline(db_path=db_path, batch_size=4, flush_interval=3600, jobdir=jobdir)
+    storage.open_spider(spider)
+
+    processed = 0
+    while (request := queue.pop()) is not None:
+        if processed == kill_after:
+            # Pas de close_spider : le lot en attente du pipeline est perdu
+            FrontierStore._stores.clear()
+            return
+        response = HtmlResponse(request.url, request=request, body=b'')
+        book = make_item(int(request.url.rsplit('=', 1)[1]))
+        for item in middleware.process_spider_output(response, [book], spider):
+            try:
+                storage.process_item(duplicates.process_item(item, spider), spider)
+            except DropItem:
+                middleware.item_dropped(item, spider)
+        processed += 1
+
+    storage.close_spider(spider)
+    duplicates.close_spider(spider)
+    middleware.spider_closed(spider)
+    assert len(queue) == 0
+    queue.close()
+    store.release()
+
+
+def test_killed_crawl_resumes_without_losing_books(tmp_path, monkeypatch):
+    """Une page produit ne quitte la file qu'une fois son livre commité :
+    après un kill, les livres encore dans le lot du pipeline sont rejoués."""
+    monkeypatch.setattr(FrontierStore, 'COMMIT_INTERVAL', 0)
+    jobdir, db_path = str(tmp_path / 'job'), str(tmp_path / 'books.db')
+    spider = BooksSpider()
+    store = FrontierStore.open(jobdir)
+    queue = SQLiteRequestQueue(store, spider)
+    # Le livre 3 a deux URL : la seconde est un doublon
+    for i in [*range(10), 3]:
+        queue.push(scrapy.Request(f'https://books.toscrape.com/catalogue/?book={i}', callback=spider.parse_product))
+    store.release()
+
+    crawl_products(jobdir, db_path, spider, kill_after=7)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 4
+    conn.close()
+
+    crawl_products(jobdir, db_path, spider)
+    conn = sqlite3.connect(db_path)
+    upcs = [upc for (upc,) in conn.execute("SELECT upc FROM books ORDER BY upc")]
+    conn.close()
+    assert upcs == [make_item(i)['upc'] for i in range(10)]
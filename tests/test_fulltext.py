@@ -0,0 +1,19 @@
+"""Tests de la construction des requêtes plein texte."""
+import sys
+from pathlib import Path
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.fulltext import fts_query
+
+
+def test_fts_query_prefix_terms():
+    """Chaque mot devient un terme entre guillemets, cherché par préfixe."""
+    assert fts_query("harry pot") == '"harry"* "pot"*'
+
+
+def test_fts_query_neutralizes_syntax():
+    """La syntaxe FTS5 saisie par l'utilisateur n'est pas interprétée."""
+    assert fts_query('"love" OR (war*') == '"love"* "OR"* "war"*'
+    assert fts_query('*"()') is None
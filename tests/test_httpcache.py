@@ -0,0 +1,61 @@
+"""Tests unitaires du cache HTTP SQLite."""
+import logging
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+from scrapy.utils.request import RequestFingerprinter
+
+from bookstoscrape_Scraper.httpcache import SQLiteCacheStorage, cache_stats, evict
+
+
+def open_storage(tmp_path, **settings):
+    settings = Settings({'HTTPCACHE_DIR': str(tmp_path), **settings})
+    spider = SimpleNamespace(
+        name='test',
+        crawler=SimpleNamespace(request_fingerprinter=RequestFingerprinter()),
+        logger=logging.getLogger('test')
+    )
+    storage = SQLiteCacheStorage(settings)
+    storage.open_spider(spider)
+    return storage, spider
+
+
+def test_store_and_retrieve(tmp_path):
+    """Une réponse stockée est relue à l'identique, corps compressé sur disque."""
+    storage, spider = open_storage(tmp_path)
+    request = Request("https://books.toscrape.com/index.html")
+    body = b"<html>" + b"catalogue " * 1000 + b"</html>"
+    storage.store_response(spider, request, HtmlResponse(request.url, body=body, headers={'ETag': '"v1"'}))
+
+    response = storage.retrieve_response(spider, request)
+    assert response.body == body
+    assert response.headers[b'ETag'] == b'"v1"'
+    assert storage.retrieve_response(spider, Request("https://books.toscrape.com/other.html")) is None
+
+    stats = cache_stats(storage.conn)
+    assert stats['entries'] == 1
+    assert stats['stored_bytes'] < len(body) / 10
+    storage.close_spider(spider)
+
+
+def test_expiration_and_eviction(tmp_path):
+    """Les entrées expirées sont ignorées ; l'éviction garde les plus récentes."""
+    storage, spider = open_storage(tmp_path, HTTPCACHE_EXPIRATION_SECS=60)
+    requests = [Request(f"https://books.toscrape.com/{i}.html") for i in range(3)]
+    for request in requests:
+        storage.store_response(spider, request, HtmlResponse(request.url, body=b"x" * 100))
+    storage.conn.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (time.time() - 3600, requests[0].url))
+
+    assert storage.retrieve_response(spider, requests[0]) is None
+    assert evict(storage.conn, max_age=600) == 1
+    entry_size = cache_stats(storage.conn)['stored_bytes'] / 2
+    assert evict(storage.conn, max_bytes=int(entry_size)) == 1
+    assert cache_stats(storage.conn)['entries'] == 1
+    storage.close_spider(spider)
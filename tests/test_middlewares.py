@@ -0,0 +1,76 @@
+"""Tests unitaires du middleware de revalidation HTTP."""
+import sys
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from scrapy.http import HtmlResponse, Request, Response
+
+from bookstoscrape_Scraper.middlewares import BookstoscrapeScraperDownloaderMiddleware
+
+URL = "https://books.toscrape.com/catalogue/page-2.html"
+
+
+class FakeStorage:
+    """Stockage de cache réduit à une réponse par URL."""
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    def retrieve_response(self, spider, request):
+        return self.responses.get(request.url)
+
+
+class FakeStats(dict):
+    """Collecteur de statistiques minimal."""
+
+    def inc_value(self, key, count=1, start=0, spider=None):
+        self[key] = self.get(key, start) + count
+
+    def get_value(self, key, default=None, spider=None):
+        return self.get(key, default)
+
+
+def make_middleware():
+    cached = HtmlResponse(
+        URL,
+        headers={'ETag': '"abc"', 'Last-Modified': 'Sat, 01 Mar 2025 10:00:00 GMT'},
+        body=b'<html>catalogue</html>'
+    )
+    stats = FakeStats()
+    middleware = BookstoscrapeScraperDownloaderMiddleware(FakeStorage({URL: cached}), stats)
+    return middleware, stats, scrapy.Spider(name='test')
+
+
+def test_not_modified_reuses_cached_body():
+    """Un 304 est remplacé par le corps en cache, marqué revalidated."""
+    middleware, stats, spider = make_middleware()
+    request = Request(URL)
+    middleware.process_request(request, spider)
+
+    assert request.headers[b'If-None-Match'] == b'"abc"'
+    assert request.headers[b'If-Modified-Since'] == b'Sat, 01 Mar 2025 10:00:00 GMT'
+
+    response = middleware.process_response(
+        request, Response(URL, status=304, headers={'ETag': '"abc"'}), spider
+    )
+
+    assert response.status == 200
+    assert response.body == b'<html>catalogue</html>'
+    assert 'revalidated' in response.flags
+    assert stats.get_value('revalidation/not_modified') == 1
+    assert stats.get_value('revalidation/bytes_saved') == len(b'<html>catalogue</html>')
+
+
+def test_modified_response_passes_through():
+    """Une page modifiée (200) est transmise telle quelle."""
+    middleware, stats, spider = make_middleware()
+    request = Request(URL)
+    middleware.process_request(request, spider)
+
+    fresh = HtmlResponse(URL, body=b'<html>nouveau</html>')
+    assert middleware.process_response(request, fresh, spider) is fresh
+    assert stats.get_value('revalidation/modified') == 1
+    assert stats.get_value('revalidation/not_modified') is None
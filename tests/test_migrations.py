@@ -0,0 +1,110 @@
+"""Tests unitaires des migrations de schéma."""
+import sqlite3
+import sys
+from pathlib import Path
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.migrations import LATEST_VERSION, apply_migrations, get_schema_version
+
+
+def index_names(conn):
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    return {row[0] for row in rows}
+
+
+def test_fresh_database(tmp_path):
+    """Une base vierge est migrée jusqu'à la dernière version."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+
+    assert apply_migrations(conn) == LATEST_VERSION
+    assert 'idx_books_category_prix' in index_names(conn)
+    assert 'idx_price_history_upc' in index_names(conn)
+    # ANALYZE a été exécuté
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0] == 1
+
+
+def test_history_queries_use_price_history_indexes(tmp_path):
+    """Les index de l'ancien historique sont remplacés sur price_history."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn)
+
+    def plan(query):
+        return ' '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+
+    assert 'idx_price_history_upc_date' in plan(
+        "SELECT prix FROM scraping_history WHERE upc = 'abc' ORDER BY date_scraping")
+    assert 'idx_price_history_date' in plan(
+        "SELECT upc FROM scraping_history WHERE date_scraping >= '2025-01-01'")
+
+
+def test_migrations_are_idempotent(tmp_path):
+    """Relancer les migrations ne rejoue rien."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn)
+    apply_migrations(conn)
+
+    count = conn.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0]
+    assert count == LATEST_VERSION
+
+
+def test_existing_database_keeps_its_data(tmp_path):
+    """Une base créée avant les migrations est mise à niveau sans perte."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn, target=1)
+    conn.execute("DELETE FROM schema_migrations")
+    conn.execute("INSERT INTO books (titre, upc) VALUES ('Livre', 'abc')")
+    conn.commit()
+    assert get_schema_version(conn) == 0
+
+    apply_migrations(conn)
+
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert conn.execute("SELECT titre FROM books WHERE upc = 'abc'").fetchone()[0] == 'Livre'
+
+
+def test_history_is_converted_to_changes(tmp_path):
+    """L'ancien historique complet ne garde que les changements, lisibles par la vue."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn, target=6)
+    conn.executemany(
+        "INSERT INTO scraping_history (upc, titre, prix, notation, disponibilite, category, date_scraping)"
+        " VALUES ('abc', 'Livre', ?, 3, 5, 'Travel', ?)",
+        [(10.0, '2025-01-01T10:00:00'), (10.0, '2025-01-02T10:00:00'), (12.5, '2025-01-03T10:00:00')]
+    )
+    conn.commit()
+
+    apply_migrations(conn)
+
+    history = conn.execute(
+        "SELECT titre, prix, category, date_scraping FROM scraping_history ORDER BY id"
+    ).fetchall()
+    assert history == [
+        ('Livre', 10.0, 'Travel', '2025-01-01T10:00:00'),
+        ('Livre', 12.5, 'Travel', '2025-01-03T10:00:00'),
+    ]
+    assert conn.execute("SELECT COUNT(*) FROM crawl_runs").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0] == 1
+
+
+def test_same_day_crawls_stay_separate_runs(tmp_path):
+    """Deux crawls le même jour donnent deux runs ; les items d'un crawl restent groupés."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn, target=6)
+    conn.executemany(
+        "INSERT INTO scraping_history (upc, prix, date_scraping) VALUES (?, ?, ?)",
+        [('a', 10.0, '2025-01-01T08:00:00.100000'), ('b', 20.0, '2025-01-01T08:03:10.500000'),
+         ('a', 11.0, '2025-01-01T18:00:00.000000'), ('b', 20.0, '2025-01-01T18:02:00.000000')]
+    )
+    conn.commit()
+
+    apply_migrations(conn)
+
+    assert conn.execute("SELECT id, started_at, finished_at FROM crawl_runs ORDER BY id").fetchall() == [
+        (1, '2025-01-01T08:00:00.100000', '2025-01-01T08:03:10.500000'),
+        (2, '2025-01-01T18:00:00.000000', '2025-01-01T18:02:00.000000'),
+    ]
+    assert conn.execute("SELECT upc, run_id FROM price_history ORDER BY id").fetchall() == [
+        ('a', 1), ('b', 1), ('a', 2),
+    ]
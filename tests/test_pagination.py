@@ -0,0 +1,34 @@
+"""Tests unitaires de la pagination par curseur."""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.pagination import decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    """Un curseur encodé se décode en la même clé."""
+    assert decode_cursor(encode_cursor(id=42)) == {'id': 42}
+
+
+def test_invalid_cursor():
+    """Un jeton malformé lève ValueError."""
+    with pytest.raises(ValueError):
+        decode_cursor("pas-un-curseur")
+
+
+def test_paginate():
+    """La ligne en trop signale une page suivante."""
+    rows = [{'id': i} for i in range(1, 5)]
+
+    page, next_cursor = paginate(rows, 3)
+    assert [row['id'] for row in page] == [1, 2, 3]
+    assert decode_cursor(next_cursor) == {'id': 3}
+
+    page, next_cursor = paginate(rows, 4)
+    assert len(page) == 4
+    assert next_cursor is None
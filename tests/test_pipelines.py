@@ -0,0 +1,224 @@
+"""Tests unitaires des pipelines Scrapy."""
+import sqlite3
+import sys
+from pathlib import Path
+
+# Ajouter le projet Scrapy au path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+
+import scrapy
+from twisted.internet import task
+
+from bookstoscrape_Scraper.items import BookItem
+from bookstoscrape_Scraper.pipelines import (
+    CleanPricePipeline,
+    ConvertRatingPipeline,
+    ExtractAvailabilityPipeline,
+    NormalizePipeline,
+    SaveToSQLitePipeline,
+)
+
+
+def make_item(i):
+    """Construit un livre déjà nettoyé."""
+    item = BookItem()
+    item['titre'] = f"Livre {i}"
+    item['prix'] = 10.0 + i
+    item['notation'] = i % 6
+    item['disponibilite'] = i
+    item['description'] = "Description"
+    item['upc'] = f"upc{i:05d}"
+    item['category'] = "Fiction"
+    item['url'] = f"https://books.toscrape.com/catalogue/livre_{i}/index.html"
+    item['image'] = None
+    item['date_scraping'] = "2025-01-01T00:00:00"
+    return item
+
+
+def count_rows(db_path, table):
+    conn = sqlite3.connect(db_path)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_batched_writes(tmp_path):
+    """Les items sont écrits par lots puis au close_spider."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10, flush_interval=3600)
+    pipeline.open_spider(spider)
+
+    for i in range(25):
+        pipeline.process_item(make_item(i), spider)
+
+    # Deux lots complets écrits, cinq items encore en attente
+    assert count_rows(db_path, 'books') == 20
+    assert len(pipeline.buffer) == 5
+
+    pipeline.close_spider(spider)
+    assert count_rows(db_path, 'books') == 25
+    assert count_rows(db_path, 'scraping_history') == 25
+
+
+def test_partial_batch_flushed_by_timer(tmp_path):
+    """Lot incomplet écrit après SQLITE_FLUSH_INTERVAL, sans attendre un nouvel item."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10, flush_interval=5)
+    pipeline.clock = task.Clock()
+    pipeline.open_spider(spider)
+
+    for i in range(3):
+        pipeline.process_item(make_item(i), spider)
+    pipeline.clock.advance(4.9)
+    assert count_rows(db_path, 'books') == 0
+
+    pipeline.clock.advance(0.1)
+    assert count_rows(db_path, 'books') == 3 and not pipeline.buffer
+
+    # Lot plein : le minuteur repart de zéro
+    pipeline.clock.advance(2)
+    for i in range(3, 13):
+        pipeline.process_item(make_item(i), spider)
+    pipeline.process_item(make_item(13), spider)
+    pipeline.clock.advance(4.9)
+    assert count_rows(db_path, 'books') == 13
+
+    pipeline.close_spider(spider)
+    assert pipeline.flush_loop is None and not pipeline.clock.getDelayedCalls()
+    assert count_rows(db_path, 'books') == 14
+
+
+def test_durability_settings(tmp_path):
+    """Les PRAGMA de durabilité sont appliqués à la connexion."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, journal_mode='wal', synchronous='off')
+    pipeline.open_spider(spider)
+
+    assert pipeline.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert pipeline.conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+
+    pipeline.close_spider(spider)
+
+
+def test_fulltext_index_follows_replace(tmp_path):
+    """Un livre re-scrapé (INSERT OR REPLACE) remplace son entrée plein texte."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=1)
+    pipeline.open_spider(spider)
+
+    item = make_item(1)
+    item['titre'] = "Ancien titre"
+    pipeline.process_item(item, spider)
+    item['titre'] = "Nouveau titre"
+    pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+
+    conn = sqlite3.connect(db_path)
+    match = "SELECT rowid FROM books_fts WHERE books_fts MATCH ?"
+    assert conn.execute(match, ('ancien',)).fetchall() == []
+    assert conn.execute(match, ('nouveau',)).fetchall() == conn.execute("SELECT id FROM books").fetchall()
+    # Lève une erreur si l'index diverge de la table books
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('integrity-check')")
+    conn.close()
+
+
+def test_unchanged_items_add_no_history(tmp_path):
+    """Un item « inchange » n'ajoute pas de ligne d'historique, seulement un run."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10)
+    pipeline.open_spider(spider)
+    pipeline.process_item(make_item(1), spider)
+    pipeline.close_spider(spider)
+
+    seen = BookItem(inchange=True, upc="upc00001", date_scraping="2025-01-02T00:00:00")
+    for stage in (CleanPricePipeline(), ConvertRatingPipeline(), ExtractAvailabilityPipeline()):
+        seen = stage.process_item(seen, spider)
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10)
+    pipeline.open_spider(spider)
+    pipeline.process_item(seen, spider)
+    # Re-scrapé complet au même prix : toujours rien à ajouter
+    same = make_item(1)
+    same['date_scraping'] = "2025-01-02T00:00:00"
+    pipeline.process_item(same, spider)
+    pipeline.close_spider(spider)
+
+    conn = sqlite3.connect(db_path)
+    history = conn.execute(
+        "SELECT titre, prix, disponibilite, date_scraping FROM scraping_history ORDER BY id"
+    ).fetchall()
+    book = conn.execute("SELECT prix, date_scraping FROM books").fetchall()
+    runs = conn.execute("SELECT started_at FROM crawl_runs WHERE finished_at IS NOT NULL ORDER BY id").fetchall()
+    conn.close()
+
+    assert history == [("Livre 1", 11.0, 1, "2025-01-01T00:00:00")]
+    assert book == [(11.0, "2025-01-02T00:00:00")]
+    assert runs == [("2025-01-01T00:00:00",), ("2025-01-02T00:00:00",)]
+
+
+def test_partial_items_keep_stock_count(tmp_path):
+    """Un item « partiel » met à jour le prix sans perdre le nombre d'exemplaires."""
+    db_path = str(tmp_path / 'books.db')
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10)
+    pipeline.open_spider(spider)
+    pipeline.process_item(make_item(5), spider)
+    pipeline.process_item(make_item(6), spider)
+    pipeline.close_spider(spider)
+
+    listing = [("upc00005", "£12.50", "In stock"), ("upc00006", "£16.00", "Out of stock")]
+    pipeline = SaveToSQLitePipeline(db_path=db_path, batch_size=10)
+    pipeline.open_spider(spider)
+    for upc, prix, availability in listing:
+        item = BookItem(
+            partiel=True, upc=upc, titre="Titre de la liste",
+            prix_original=prix, notation_originale="Two",
+            disponibilite_texte=availability, date_scraping="2025-01-02T00:00:00"
+        )
+        for stage in (CleanPricePipeline(), ConvertRatingPipeline(), ExtractAvailabilityPipeline()):
+            item = stage.process_item(item, spider)
+        pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+
+    conn = sqlite3.connect(db_path)
+    books = conn.execute("SELECT titre, prix, notation, disponibilite, description FROM books ORDER BY upc").fetchall()
+    history = conn.execute(
+        "SELECT upc, prix, disponibilite FROM scraping_history WHERE date_scraping = '2025-01-02T00:00:00' ORDER BY upc"
+    ).fetchall()
+    conn.close()
+
+    assert books == [("Livre 5", 12.5, 2, 5, "Description"), ("Livre 6", 16.0, 2, 0, "Description")]
+    assert history == [("upc00005", 12.5, 5), ("upc00006", 16.0, 0)]
+
+
+def test_normalize_pipeline_matches_chain(caplog):
+    """NormalizePipeline donne les mêmes valeurs et avertissements que la chaîne des trois pipelines."""
+    spider = scrapy.Spider(name='test')
+    raw = [
+        ("£51.77", "Three", "In stock (22 available)"),
+        ("£0.00", "Five", "In stock"),
+        ("prix inconnu", "Six", "Out of stock"),
+        (None, None, None),
+        ("", "", ""),
+    ]
+
+    def run(stages):
+        caplog.clear()
+        results = []
+        for prix, notation, disponibilite in raw:
+            item = BookItem(prix_original=prix, notation_originale=notation, disponibilite_texte=disponibilite)
+            for stage in stages:
+                item = stage.process_item(item, spider)
+            results.append((item['prix'], item['notation'], item['disponibilite']))
+        return results, [r.getMessage() for r in caplog.records]
+
+    chain = run([CleanPricePipeline(), ConvertRatingPipeline(), ExtractAvailabilityPipeline()])
+    fused = run([NormalizePipeline()])
+
+    assert fused == chain
+    assert fused[0][:3] == [(51.77, 3, 22), (0.0, 5, 1), (None, None, 0)]
+    assert len(fused[1]) == 2
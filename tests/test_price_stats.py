@@ -0,0 +1,92 @@
+"""Tests du moteur de statistiques de distribution (nécessitent numpy)."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.book_repository import BookRepository
+from src.database.data_version import bump_data_version
+from src.database.migrations import apply_migrations
+from src.database.price_stats import grouped_histogram, grouped_summary
+
+
+def test_grouped_statistics_match_numpy():
+    """Quantiles, écart-type et histogrammes par groupe identiques à NumPy."""
+    rng = numpy.random.default_rng(0)
+    groups = rng.integers(0, 4, 2000)
+    values = rng.random(2000) * 50
+    weights = rng.integers(0, 6, 2000).astype(float)
+
+    summary = grouped_summary(groups, values, 5, (10, 90), weights)
+    edges = numpy.linspace(values.min(), values.max(), 11)
+    histograms = grouped_histogram(groups, values, 4, edges)
+    for g in range(4):
+        x, w = values[groups == g], weights[groups == g]
+        assert numpy.allclose([summary['p10'][g], summary['p50'][g], summary['p90'][g]],
+                              numpy.percentile(x, [10, 50, 90]))
+        assert summary['ecart_type'][g] == pytest.approx(x.std())
+        assert summary['moyenne_ponderee'][g] == pytest.approx(numpy.average(x, weights=w))
+        assert (histograms[g] == numpy.histogram(x, edges)[0]).all()
+    # Groupe vide
+    assert summary['nb'][4] == 0 and numpy.isnan(summary['p50'][4])
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'books.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO books (upc, titre, category, prix, notation) VALUES (?, ?, ?, ?, ?)",
+            [('a', 'A', 'Poetry', 10.0, 1), ('b', 'B', 'Poetry', 20.0, 3),
+             ('c', 'C', 'Poetry', 40.0, 1), ('d', 'D', 'Travel', 30.0, 5)]
+        )
+        run_1 = conn.execute("INSERT INTO crawl_runs (started_at) VALUES ('2025-01-01T08:00:00')").lastrowid
+        run_2 = conn.execute("INSERT INTO crawl_runs (started_at) VALUES ('2025-01-02T08:00:00')").lastrowid
+        # Changements seulement : « a » passe de 10 à 16 le 2 janvier
+        conn.executemany(
+            "INSERT INTO price_history (upc, run_id, prix, date_scraping) VALUES (?, ?, ?, ?)",
+            [('a', run_1, 10.0, '2025-01-01'), ('b', run_1, 20.0, '2025-01-01'),
+             ('a', run_2, 16.0, '2025-01-02')]
+        )
+    conn.close()
+    return path
+
+
+def test_distribution_and_reload_on_new_version(db_path):
+    """Médiane par catégorie, puis rechargement quand la version des données change."""
+    repo = BookRepository(db_path)
+    distribution = repo.get_price_distribution()
+    poetry = distribution['categories'][0]
+    assert (poetry['category'], poetry['nb_livres'], poetry['mediane']) == ('Poetry', 3, 20.0)
+    # (10×1 + 20×3 + 40×1) / 5
+    assert poetry['prix_moyen_pondere_note'] == 22.0
+    assert distribution['global']['nb_livres'] == 4
+
+    histogram = repo.get_price_histogram(bins=3, category='Travel')
+    assert histogram['bornes'] == [10.0, 20.0, 30.0, 40.0] and histogram['effectifs'] == [0, 0, 1]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE books SET prix = 100.0 WHERE upc = 'd'")
+    conn.commit()
+    # Même version : colonnes en mémoire inchangées
+    assert repo.get_price_distribution()['global']['prix_max'] == 40.0
+    bump_data_version(conn)
+    conn.close()
+    assert repo.get_price_distribution()['global']['prix_max'] == 100.0
+
+
+def test_distribution_history_carries_prices_forward(db_path):
+    """Un livre sans changement garde son dernier prix aux dates suivantes."""
+    history = BookRepository(db_path).get_price_distribution_history()
+    assert [(d['date'], d['nb_livres'], d['prix_min'], d['prix_max']) for d in history] == [
+        ('2025-01-01', 2, 10.0, 20.0),
+        ('2025-01-02', 2, 16.0, 20.0),
+    ]
@@ -0,0 +1,104 @@
+"""Tests du résumé des prix par livre et des fenêtres de /history/price-changes."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database.book_repository import BookRepository
+from src.database.migrations import apply_migrations
+from src.database.price_summary import refresh_price_summary
+
+
+def crawl(conn, date, prices):
+    """Simule un crawl : une ligne d'historique par livre dont l'état change."""
+    run_id = conn.execute("INSERT INTO crawl_runs (started_at) VALUES (?)", (date,)).lastrowid
+    for upc, prix in prices.items():
+        last = conn.execute(
+            "SELECT prix FROM price_history WHERE upc = ? ORDER BY id DESC LIMIT 1", (upc,)
+        ).fetchone()
+        if last is None or last[0] != prix:
+            conn.execute(
+                "INSERT INTO price_history (upc, run_id, prix, date_scraping) VALUES (?, ?, ?, ?)",
+                (upc, run_id, prix, date)
+            )
+    conn.commit()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'books.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    crawl(conn, '2025-01-01T08:00:00', {'a': 10.0, 'b': 20.0, 'c': 30.0})
+    crawl(conn, '2025-01-02T08:00:00', {'a': 16.0, 'b': 20.0, 'c': 30.0})
+    refresh_price_summary(conn)
+    crawl(conn, '2025-01-03T08:00:00', {'a': 16.0, 'b': 26.0, 'c': 30.0})
+    crawl(conn, '2025-01-04T08:00:00', {'a': 12.0, 'b': 26.0, 'c': 30.0})
+    conn.close()
+    return path
+
+
+def test_refresh_is_incremental(db_path):
+    """Seuls les livres modifiés depuis le dernier calcul sont recalculés."""
+    conn = sqlite3.connect(db_path)
+    assert refresh_price_summary(conn) == 2
+    assert refresh_price_summary(conn) == 0
+
+    rows = conn.execute("""
+        SELECT upc, prix_actuel, prix_precedent, prix_min, prix_max, nb_changements, dernier_changement
+        FROM price_summary ORDER BY upc
+    """).fetchall()
+    conn.close()
+    assert rows == [
+        ('a', 12.0, 16.0, 10.0, 16.0, 2, '2025-01-04T08:00:00'),
+        ('b', 26.0, 20.0, 20.0, 26.0, 1, '2025-01-03T08:00:00'),
+        ('c', 30.0, None, 30.0, 30.0, 0, None),
+    ]
+
+
+def test_price_changes_windows_and_sorting(db_path):
+    """Amplitude historique sans fenêtre, dernier changement avec since / until."""
+    conn = sqlite3.connect(db_path)
+    refresh_price_summary(conn)
+    conn.close()
+    repo = BookRepository(db_path)
+
+    all_time = repo.get_price_changes(5.0)
+    assert [(c['upc'], c['variation']) for c in all_time] == [('a', 6.0), ('b', 6.0)]
+
+    # Dernier changement de « a » : 16 → 12 le 4 janvier (-4 £, -25 %)
+    recent = repo.get_price_changes(0, since='2025-01-04')
+    assert [(c['upc'], c['derniere_variation'], c['derniere_variation_pct']) for c in recent] == [('a', -4.0, -25.0)]
+    assert repo.get_price_changes(5.0, since='2025-01-04') == []
+    window = repo.get_price_changes(0, min_percent=20, since='2025-01-01', until='2025-01-04')
+    assert [c['upc'] for c in window] == ['b']
+
+    by_date = repo.get_price_changes(0, sort='date', descending=False)
+    assert [c['upc'] for c in by_date] == ['c', 'b', 'a']
+    assert [c['upc'] for c in repo.get_price_changes(0, sort='changes', limit=1)] == ['a']
+    with pytest.raises(ValueError):
+        repo.get_price_changes(sort='titre')
+
+
+def test_migration_builds_same_summary_as_refresh(tmp_path):
+    """Le premier calcul de la migration 8 donne le même résumé que la mise à jour."""
+    conn = sqlite3.connect(str(tmp_path / 'books.db'))
+    apply_migrations(conn, target=7)
+    crawl(conn, '2025-01-01T08:00:00', {'a': 10.0, 'b': 20.0})
+    crawl(conn, '2025-01-02T08:00:00', {'a': 16.0, 'b': 20.0})
+    apply_migrations(conn)
+    query = "SELECT upc, prix_actuel, prix_precedent, prix_min, prix_max, nb_changements FROM price_summary ORDER BY upc"
+    migrated = conn.execute(query).fetchall()
+
+    conn.execute("DELETE FROM price_summary")
+    conn.execute("DELETE FROM metadata WHERE key = 'price_summary_history_id'")
+    conn.commit()
+    assert refresh_price_summary(conn) == 2
+    assert conn.execute(query).fetchall() == migrated == [
+        ('a', 16.0, 10.0, 10.0, 16.0, 1), ('b', 20.0, None, 20.0, 20.0, 0),
+    ]
+    conn.close()
@@ -18,7 +18,7 @@ def test_get_statistics():
     assert stats['total_livres'] > 0, "Il doit y avoir au moins un livre"
     assert stats['nb_categories'] > 0, "Il doit y avoir au moins une catégorie"
     
-    print(f"✓ {stats['total_livre  s']} livres trouvés")
+    print(f"✓ {stats['total_livres']} livres trouvés")
     print(f"✓ {stats['nb_categories']} catégories trouvées")
     print("✓ Test réussi")
 
@@ -51,11 +51,29 @@ def test_scraping_history():
     print("✓ Test réussi")
 
 
+def test_batch_lookups():
+    """Récupération groupée par IDs et par UPC, absents ignorés."""
+    repo = BookRepository()
+    books = repo.get_all_books(limit=3)
+    ids = [book['id'] for book in books]
+
+    found = repo.get_books_by_ids(ids + [ids[0], 10 ** 9])
+    assert sorted(found) == sorted(ids)
+    assert found[ids[0]] == repo.get_book_by_id(ids[0])
+
+    upcs = [book['upc'] for book in books]
+    evolutions = repo.get_price_evolutions(upcs + ['inconnu'])
+    assert sorted(evolutions) == sorted(upcs)
+    assert evolutions[upcs[0]] == repo.get_price_evolution(upcs[0])
+    assert repo.get_books_by_ids([]) == {} and repo.get_price_evolutions([]) == {}
+
+
 if __name__ == "__main__":
     try:
         test_get_statistics()
         test_get_all_books()
         test_scraping_history()
+        test_batch_lookups()
         print("\n" + "="*50)
         print("TOUS LES TESTS SONT PASSÉS ✓")
         print("="*50)
@@ -0,0 +1,74 @@
+"""Tests de l'export colonnaire et de sa relecture (nécessitent pyarrow)."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+# Ajouter le dossier racine au path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import build_catalogue
+from src.database.book_repository import BookRepository
+from src.database.snapshot_repository import SnapshotRepository
+from src.database.snapshots import export_snapshot
+
+
+@pytest.fixture(scope='module')
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('snapshots') / 'books.db')
+    build_catalogue(path, n_books=300, n_crawls=4)
+    return path
+
+
+@pytest.mark.parametrize('fmt, compression', [('parquet', 'zstd'), ('arrow', None)])
+def test_export_is_incremental_and_matches_sqlite(db_path, tmp_path, fmt, compression):
+    """Un fichier par crawl, jamais réécrit ; mêmes variations que SQLite."""
+    conn = sqlite3.connect(db_path)
+    first = export_snapshot(conn, str(tmp_path), fmt, compression)
+    second = export_snapshot(conn, str(tmp_path), fmt, compression)
+    history_rows = conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+    conn.close()
+
+    assert first == {'runs': 4, 'history_rows': history_rows, 'books': 300}
+    assert second == {'runs': 0, 'history_rows': 0, 'books': 300}
+
+    repo = SnapshotRepository(str(tmp_path))
+    dates = repo.get_crawl_dates()
+    assert len(dates) == 4
+    assert repo.get_current_books(['upc', 'prix']).num_rows == 300
+    assert repo.get_history().num_rows == history_rows
+    assert set(repo.get_history(since=dates[-1], columns=['run_id'])['run_id'].to_pylist()) == {4}
+
+    expected = BookRepository(db_path).get_price_changes(2.0)
+    changes = repo.get_price_changes(2.0)
+    assert [(c['upc'], c['variation'], c['prix_actuel']) for c in changes] == \
+        [(c['upc'], c['variation'], c['prix_actuel']) for c in expected]
+
+    series = repo.get_price_series(changes[0]['upc'])
+    assert series['run_id'].to_pylist() == sorted(series['run_id'].to_pylist())
+    assert series['prix'][-1].as_py() == changes[0]['prix_actuel']
+
+
+def test_pipeline_exports_at_end_of_crawl(tmp_path):
+    """Avec SNAPSHOT_DIR, le crawl terminé est exporté par la finalisation."""
+    sys.path.insert(0, str(Path(__file__).parent.parent / 'src' / 'scraper' / 'bookstoscrape_Scraper'))
+    import scrapy
+    from bookstoscrape_Scraper.pipelines import SaveToSQLitePipeline
+    from tests.test_pipelines import make_item
+
+    spider = scrapy.Spider(name='test')
+    pipeline = SaveToSQLitePipeline(
+        db_path=str(tmp_path / 'books.db'), snapshot_dir=str(tmp_path / 'snapshots')
+    )
+    pipeline.open_spider(spider)
+    for i in range(10):
+        pipeline.process_item(make_item(i), spider)
+    pipeline.close_spider(spider)
+
+    repo = SnapshotRepository(str(tmp_path / 'snapshots'))
+    assert repo.get_crawl_dates() == ['2025-01-01']
+    assert repo.get_history().num_rows == 10
+    assert repo.get_current_books().num_rows == 10